@@ -205,6 +205,79 @@ CORS_ALLOW_HEADERS = [
 # No local EnergyPlus installation needed - using nrel/energyplus Docker image
 SIMULATION_DOCKER_IMAGE = os.getenv('ENERGYPLUS_DOCKER_IMAGE', 'nrel/energyplus:23.2.0')
 SIMULATION_TIMEOUT = int(os.getenv('SIMULATION_TIMEOUT', '600'))  # 10 minutes default
+
+# EnergyPlus execution backend: 'docker' (nrel/energyplus image), 'native' (an
+# energyplus binary installed in the worker image) or 'fake' (canned outputs, for
+# load-testing the pipeline without EnergyPlus). See simulation/runners.py.
+SIMULATION_RUNNER = os.getenv('SIMULATION_RUNNER', 'docker').lower()
+ENERGYPLUS_EXECUTABLE = os.getenv('ENERGYPLUS_EXECUTABLE', 'energyplus')
+SIMULATION_FAKE_RUNNER_DELAY = float(os.getenv('SIMULATION_FAKE_RUNNER_DELAY', '0'))  # seconds per fake run
+
+# How input.idf / weather.epw are placed in each run directory: 'auto' tries
+# hardlink, then reflink, then copy; 'copy' always copies.
+SIMULATION_INPUT_STAGING = os.getenv('SIMULATION_INPUT_STAGING', 'auto').lower()
+
+# Default output retention profile (minimal / analysis / full, see simulation/retention.py);
+# requests can override it with output_retention.
+SIMULATION_OUTPUT_RETENTION = os.getenv('SIMULATION_OUTPUT_RETENTION', 'full').lower()
+
+# Intra-run progress: minimum seconds between WebSocket pushes per run, and seconds
+# without any EnergyPlus output after which a run is treated as stalled (0 disables).
+SIMULATION_PROGRESS_PUSH_INTERVAL = float(os.getenv('SIMULATION_PROGRESS_PUSH_INTERVAL', '2'))
+SIMULATION_STALL_TIMEOUT = int(os.getenv('SIMULATION_STALL_TIMEOUT', '300'))
+# Adaptive per-run timeout: multiple of the predicted runtime, clamped to [MIN, MAX] seconds
+SIMULATION_TIMEOUT_MULTIPLIER = float(os.getenv('SIMULATION_TIMEOUT_MULTIPLIER', '4'))
+SIMULATION_TIMEOUT_MIN = int(os.getenv('SIMULATION_TIMEOUT_MIN', '120'))
+SIMULATION_TIMEOUT_MAX = int(os.getenv('SIMULATION_TIMEOUT_MAX', '3000'))
+# Worker concurrency assumed for batch ETAs when no Celery worker answers inspect
+SIMULATION_DEFAULT_CONCURRENCY = int(os.getenv('SIMULATION_DEFAULT_CONCURRENCY', '4'))
+# Per-container limits and per-host slots (cores / RAM divided by the limits) for EnergyPlus runs
+SIMULATION_CONTAINER_CPUS = float(os.getenv('SIMULATION_CONTAINER_CPUS', '1'))
+SIMULATION_CONTAINER_MEMORY = os.getenv('SIMULATION_CONTAINER_MEMORY', '2g')
+SIMULATION_HOST_SLOTS_ENABLED = os.getenv('SIMULATION_HOST_SLOTS_ENABLED', 'True') == 'True'
+SIMULATION_HOST_SLOTS = int(os.getenv('SIMULATION_HOST_SLOTS', '0'))  # 0 = derive from cores and RAM
+SIMULATION_HOST_MEMORY_RESERVE = os.getenv('SIMULATION_HOST_MEMORY_RESERVE', '1g')
+SIMULATION_HOST_ID = os.getenv('SIMULATION_HOST_ID', '')
+SIMULATION_SLOT_WAIT_TIMEOUT = int(os.getenv('SIMULATION_SLOT_WAIT_TIMEOUT', '3600'))
+# Variants per Celery task in parametric batches (0 = derive from batch size and worker count)
+SIMULATION_VARIANT_CHUNK_SIZE = int(os.getenv('SIMULATION_VARIANT_CHUNK_SIZE', '0'))
+SIMULATION_VARIANT_CHUNK_MAX = int(os.getenv('SIMULATION_VARIANT_CHUNK_MAX', '25'))
+SIMULATION_CHUNKS_PER_WORKER = int(os.getenv('SIMULATION_CHUNKS_PER_WORKER', '4'))
+# Variants released per dispatch wave in parametric batches; 0 = one round of chunks per worker process
+SIMULATION_DISPATCH_WAVE_SIZE = int(os.getenv('SIMULATION_DISPATCH_WAVE_SIZE', '0'))
+# Render variant IDFs by splicing into the analysed base instead of editing a full model (see simulation/idf_template.py)
+SIMULATION_VARIANT_IDF_TEMPLATE = os.getenv('SIMULATION_VARIANT_IDF_TEMPLATE', 'True') == 'True'
+# Load each generated variant IDF through eppy before running it (edits themselves do not need eppy)
+SIMULATION_VARIANT_IDF_VALIDATE = os.getenv('SIMULATION_VARIANT_IDF_VALIDATE', 'False') == 'True'
+# Parsed base IDF models kept per worker process for variant generation (LRU by content hash)
+SIMULATION_IDF_MODEL_CACHE_SIZE = int(os.getenv('SIMULATION_IDF_MODEL_CACHE_SIZE', '16'))
+# Split variant chunks into a run stage and a post-process stage on its own queue (see simulation/pipeline.py)
+SIMULATION_PIPELINE_ENABLED = os.getenv('SIMULATION_PIPELINE_ENABLED', 'False') == 'True'
+SIMULATION_RUN_QUEUE = os.getenv('SIMULATION_RUN_QUEUE', 'celery')
+SIMULATION_POSTPROCESS_QUEUE = os.getenv('SIMULATION_POSTPROCESS_QUEUE', 'postprocess')
+# Add Output:SQLite to staged IDFs and read summary results from output.sql (HTML report as fallback)
+SIMULATION_SQL_RESULTS = os.getenv('SIMULATION_SQL_RESULTS', 'True') == 'True'
+# Rows per bulk INSERT when saving results (one transaction per worker chunk)
+SIMULATION_PERSIST_BATCH_SIZE = int(os.getenv('SIMULATION_PERSIST_BATCH_SIZE', '500'))
+# Stream chunks of at least this many results into Postgres with COPY (0 = always batched INSERTs)
+SIMULATION_PERSIST_COPY_MIN_RESULTS = int(os.getenv('SIMULATION_PERSIST_COPY_MIN_RESULTS', '200'))
+# Run ReadVarsESO after EnergyPlus to write output.csv (timeseries are parsed from the ESO regardless)
+SIMULATION_READVARS = os.getenv('SIMULATION_READVARS', 'True') == 'True'
+# Seconds downsampled timeseries responses stay in the Django cache
+SIMULATION_TIMESERIES_CACHE_TIMEOUT = int(os.getenv('SIMULATION_TIMESERIES_CACHE_TIMEOUT', '3600'))
+
+# Content-addressed result cache keyed by IDF bytes + EPW bytes + EnergyPlus version.
+# Individual requests can bypass it with use_cache=false.
+SIMULATION_RESULT_CACHE_ENABLED = os.getenv('SIMULATION_RESULT_CACHE_ENABLED', 'True') == 'True'
+SIMULATION_RESULT_CACHE_DIR = os.getenv('SIMULATION_RESULT_CACHE_DIR', os.path.join(MEDIA_ROOT, 'result_cache'))
+SIMULATION_RESULT_CACHE_MAX_BYTES = int(os.getenv('SIMULATION_RESULT_CACHE_MAX_BYTES', str(5 * 1024 ** 3)))  # 5 GB
+
+# Warm EnergyPlus container pool: keep long-lived containers per worker process and
+# feed them jobs via `docker exec` instead of `docker run --rm` per variant.
+EPLUS_CONTAINER_POOL_ENABLED = os.getenv('EPLUS_CONTAINER_POOL_ENABLED', 'False') == 'True'
+EPLUS_CONTAINER_POOL_SIZE = int(os.getenv('EPLUS_CONTAINER_POOL_SIZE', '1'))  # containers per worker process
+EPLUS_CONTAINER_POOL_MAX_RUNS = int(os.getenv('EPLUS_CONTAINER_POOL_MAX_RUNS', '200'))  # recycle after N runs
+EPLUS_CONTAINER_POOL_HEALTHCHECK_INTERVAL = int(os.getenv('EPLUS_CONTAINER_POOL_HEALTHCHECK_INTERVAL', '30'))  # seconds
 WEATHER_FILES_DIR = BASE_DIR / 'weather_files'
 SIMULATION_RESULTS_DIR = BASE_DIR / 'media/simulation_results'
 
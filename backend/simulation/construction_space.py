@@ -0,0 +1,108 @@
+"""
+Lazily indexed construction sets for scenario batches.
+
+`run_simulation` used to expand a scenario with
+`list(itertools.product(...))`, build a dict with layer lists for every
+combination, trim the list to the scenario's `total_simulations` and send all
+of it as one Celery argument, so memory and broker message size grew with the
+product of the option counts.
+
+`ConstructionSpace` keeps only the options of each element type and decodes
+construction set `k` on demand:
+
+- product spaces (combinatorial mode) treat `k + 1` as a mixed-radix number
+  with one digit per element type (digit 0: leave the type unchanged, the
+  last type varying fastest), which is the order `itertools.product` used,
+  with the all-unchanged combination skipped;
+- explicit spaces hold a list of sets (per_construction mode, or sets
+  dispatched by older callers).
+
+`to_dict` / `from_dict` give the JSON spec passed to the dispatch tasks,
+whose size depends on the number of options rather than on the number of
+combinations.
+"""
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+PRODUCT = 'product'
+EXPLICIT = 'explicit'
+
+
+def _option(option: Dict[str, Any]) -> Dict[str, Any]:
+    # Variants update their construction set in place; never hand out the shared option
+    return {
+        'id': option.get('id'),  # Include construction ID for GWP/cost lookups
+        'name': option['name'],
+        'layers': list(option.get('layers') or []),
+    }
+
+
+class ConstructionSpace:
+    """Construction sets of a scenario, decoded by index."""
+
+    def __init__(self, groups: Optional[Sequence[Tuple[str, List[Dict[str, Any]]]]] = None,
+                 sets: Optional[List[Dict[str, Any]]] = None, limit: Optional[int] = None):
+        if (groups is None) == (sets is None):
+            raise ValueError("ConstructionSpace needs either option groups or explicit sets")
+        self.mode = PRODUCT if groups is not None else EXPLICIT
+        self.groups = [(key, list(options)) for key, options in (groups or []) if options]
+        self.sets = list(sets) if sets is not None else None
+        self.limit = int(limit) if limit else None
+
+        if self.mode == PRODUCT:
+            combinations = 1
+            for _, options in self.groups:
+                combinations *= len(options) + 1
+            self.size = combinations - 1 if self.groups else 0
+        else:
+            self.size = len(self.sets)
+
+    @classmethod
+    def product(cls, groups: Sequence[Tuple[str, List[Dict[str, Any]]]], limit: Optional[int] = None):
+        """Every combination of at most one option per element type (at least one type changed)."""
+        return cls(groups=groups, limit=limit)
+
+    @classmethod
+    def explicit(cls, sets: List[Dict[str, Any]], limit: Optional[int] = None):
+        return cls(sets=sets, limit=limit)
+
+    def __len__(self) -> int:
+        return min(self.size, self.limit) if self.limit else self.size
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError(f"construction set {index} out of range ({length})")
+        if self.mode == EXPLICIT:
+            return {key: _option(value) if isinstance(value, dict) else value
+                    for key, value in self.sets[index].items()}
+
+        # Index 0 of itertools.product is the all-unchanged combination
+        remaining = index + 1
+        digits = []
+        for _, options in reversed(self.groups):
+            remaining, digit = divmod(remaining, len(options) + 1)
+            digits.append(digit)
+        digits.reverse()
+        return {key: _option(options[digit - 1])
+                for (key, options), digit in zip(self.groups, digits) if digit}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def to_dict(self) -> Dict[str, Any]:
+        spec: Dict[str, Any] = {'mode': self.mode, 'limit': self.limit}
+        if self.mode == PRODUCT:
+            spec['groups'] = [[key, options] for key, options in self.groups]
+        else:
+            spec['sets'] = self.sets
+        return spec
+
+    @classmethod
+    def from_dict(cls, spec: Dict[str, Any]) -> 'ConstructionSpace':
+        if spec.get('mode') == EXPLICIT:
+            return cls.explicit(spec.get('sets') or [], limit=spec.get('limit'))
+        return cls.product([(key, options) for key, options in spec.get('groups') or []],
+                           limit=spec.get('limit'))
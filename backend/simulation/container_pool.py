@@ -0,0 +1,246 @@
+"""
+Warm EnergyPlus container pool.
+
+Instead of paying for a `docker run --rm` (container create, start and
+teardown) for every IDF/variant, each worker process keeps a small pool of
+long-lived `nrel/energyplus` containers that idle on `sleep infinity` and
+receives jobs through `docker exec`.
+
+The pool containers bind-mount the whole `MEDIA_ROOT/simulation_results`
+tree, so any per-variant directory below it is visible inside the container
+without starting a new one. Containers are health-checked before use,
+recycled after a configurable number of runs, and force-removed when a run
+times out (killing the `docker exec` client does not stop the process inside
+the container). Callers fall back to the one-shot `docker run --rm` path when
+the pool raises `ContainerPoolError`.
+"""
+import atexit
+import os
+import socket
+import subprocess
+import threading
+import time
+from typing import Callable, List, Optional
+
+from django.conf import settings
+
+from .host_slots import docker_resource_args
+from .run_progress import stream_process
+
+
+# Mount point of MEDIA_ROOT/simulation_results inside pooled containers
+POOL_MOUNT_TARGET = '/var/simdata/results'
+
+
+class ContainerPoolError(RuntimeError):
+    """Raised when the pool cannot serve a job; callers should fall back to one-shot runs."""
+
+
+def host_path_for(path: str) -> str:
+    """Translate a container-side MEDIA_ROOT path to the path the Docker daemon sees.
+
+    When the backend runs inside Docker and talks to the host daemon, bind
+    mounts must use host paths. HOST_MEDIA_ROOT points at the host directory
+    that backs MEDIA_ROOT.
+    """
+    host_media_root = os.environ.get('HOST_MEDIA_ROOT')
+    if host_media_root and str(path).startswith(str(settings.MEDIA_ROOT)):
+        rel = os.path.relpath(str(path), str(settings.MEDIA_ROOT))
+        return os.path.join(host_media_root, rel)
+    return str(path)
+
+
+class PooledContainer:
+    """A single long-lived EnergyPlus container."""
+
+    def __init__(self, container_id: str, name: str):
+        self.container_id = container_id
+        self.name = name
+        self.runs = 0
+        self.started_at = time.time()
+        self.last_checked = time.time()
+
+    def is_running(self) -> bool:
+        try:
+            result = subprocess.run(
+                ['docker', 'inspect', '-f', '{{.State.Running}}', self.container_id],
+                capture_output=True, text=True, timeout=10
+            )
+            return result.returncode == 0 and result.stdout.strip() == 'true'
+        except Exception:
+            return False
+
+    def remove(self) -> None:
+        try:
+            subprocess.run(['docker', 'rm', '-f', self.container_id],
+                           capture_output=True, text=True, timeout=30)
+        except Exception:
+            pass
+
+
+class EnergyPlusContainerPool:
+    """Per-process pool of warm EnergyPlus containers fed via `docker exec`."""
+
+    def __init__(self, size: int = 1, max_runs: int = 200, healthcheck_interval: float = 30.0,
+                 image: Optional[str] = None, platform: Optional[str] = None):
+        self.size = max(1, int(size))
+        self.max_runs = max(1, int(max_runs))
+        self.healthcheck_interval = healthcheck_interval
+        self.image = image or getattr(settings, 'SIMULATION_DOCKER_IMAGE', 'nrel/energyplus:23.2.0')
+        self.platform = platform or os.environ.get('EPLUS_DOCKER_PLATFORM', 'linux/amd64')
+        self.mount_root = os.path.join(str(settings.MEDIA_ROOT), 'simulation_results')
+
+        self._idle: List[PooledContainer] = []
+        self._busy = 0
+        self._started = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+    # ------------------------------------------------------------------ paths
+    def container_path(self, path: str) -> Optional[str]:
+        """Return the in-container path for `path`, or None if it is outside the pool mount."""
+        path = os.path.abspath(str(path))
+        root = os.path.abspath(self.mount_root)
+        if path != root and not path.startswith(root + os.sep):
+            return None
+        rel = os.path.relpath(path, root)
+        return POOL_MOUNT_TARGET if rel == '.' else f"{POOL_MOUNT_TARGET}/{rel.replace(os.sep, '/')}"
+
+    # -------------------------------------------------------------- lifecycle
+    def _start_container(self) -> PooledContainer:
+        os.makedirs(self.mount_root, exist_ok=True)
+        self._started += 1
+        name = f"epsm-eplus-{socket.gethostname()}-{os.getpid()}-{self._started}"
+        command = [
+            'docker', 'run', '-d', '--rm',
+            '--name', name,
+            '--label', 'epsm.pool=energyplus',
+            '-v', f'{host_path_for(self.mount_root)}:{POOL_MOUNT_TARGET}',
+            '--platform', self.platform,
+        ] + docker_resource_args() + [
+            '--entrypoint', 'sleep',
+            self.image, 'infinity'
+        ]
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, timeout=120)
+        except Exception as e:
+            raise ContainerPoolError(f"Failed to start pooled EnergyPlus container: {e}")
+        if result.returncode != 0 or not result.stdout.strip():
+            raise ContainerPoolError(f"Failed to start pooled EnergyPlus container: {result.stderr.strip()}")
+        print(f"Started pooled EnergyPlus container {name}")
+        return PooledContainer(result.stdout.strip(), name)
+
+    def _checkout(self) -> PooledContainer:
+        with self._cond:
+            if self._closed:
+                raise ContainerPoolError('Container pool is shut down')
+            while not self._idle and self._busy >= self.size:
+                self._cond.wait()
+            container = self._idle.pop() if self._idle else None
+            self._busy += 1
+
+        try:
+            if container is not None and time.time() - container.last_checked >= self.healthcheck_interval:
+                if container.is_running():
+                    container.last_checked = time.time()
+                else:
+                    print(f"Pooled container {container.name} failed health check; replacing it")
+                    container.remove()
+                    container = None
+            if container is None:
+                container = self._start_container()
+            return container
+        except Exception:
+            self._release(None)
+            raise
+
+    def _release(self, container: Optional[PooledContainer]) -> None:
+        if container is not None and container.runs >= self.max_runs:
+            print(f"Recycling pooled container {container.name} after {container.runs} runs")
+            container.remove()
+            container = None
+        with self._cond:
+            self._busy -= 1
+            if container is not None and not self._closed:
+                self._idle.append(container)
+            elif container is not None:
+                container.remove()
+            self._cond.notify()
+
+    def shutdown(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for container in idle:
+            container.remove()
+
+    # -------------------------------------------------------------------- run
+    def run(self, energyplus_args: List[str], workdir: str, timeout: float,
+            on_line: Optional[Callable[[str], None]] = None,
+            stall_timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+        """Run `energyplus <args>` inside a pooled container with `workdir` as cwd.
+
+        stdout lines are streamed to `on_line`. Raises ContainerPoolError if no
+        container could be obtained or the exec itself could not be started. A
+        timeout or stall is propagated as subprocess.TimeoutExpired (or its
+        SimulationStalled subclass) after the offending container is removed.
+        """
+        container_workdir = self.container_path(workdir)
+        if container_workdir is None:
+            raise ContainerPoolError(f"{workdir} is outside the pool mount {self.mount_root}")
+
+        container = self._checkout()
+        command = ['docker', 'exec', '-w', container_workdir, container.container_id, 'energyplus'] + list(energyplus_args)
+        try:
+            process = stream_process(command, cwd=workdir, timeout=timeout, on_line=on_line,
+                                     stall_timeout=stall_timeout)
+        except subprocess.TimeoutExpired:
+            container.remove()
+            self._release(None)
+            raise
+        except Exception as e:
+            container.remove()
+            self._release(None)
+            raise ContainerPoolError(f"docker exec failed: {e}")
+
+        # Exit code 125/126/127 come from docker exec itself (container gone, binary missing)
+        if process.returncode in (125, 126, 127) and not container.is_running():
+            container.remove()
+            self._release(None)
+            raise ContainerPoolError(f"Pooled container {container.name} is not usable: {process.stderr.strip()}")
+
+        container.runs += 1
+        self._release(container)
+        process.args = command
+        return process
+
+
+_pool: Optional[EnergyPlusContainerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_container_pool() -> Optional[EnergyPlusContainerPool]:
+    """Return this process's container pool, or None when pooling is disabled."""
+    global _pool
+    if not getattr(settings, 'EPLUS_CONTAINER_POOL_ENABLED', False):
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = EnergyPlusContainerPool(
+                size=getattr(settings, 'EPLUS_CONTAINER_POOL_SIZE', 1),
+                max_runs=getattr(settings, 'EPLUS_CONTAINER_POOL_MAX_RUNS', 200),
+                healthcheck_interval=getattr(settings, 'EPLUS_CONTAINER_POOL_HEALTHCHECK_INTERVAL', 30),
+            )
+        return _pool
+
+
+def shutdown_container_pool() -> None:
+    """Remove this process's pooled containers (called on worker process exit)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+atexit.register(shutdown_container_pool)
@@ -0,0 +1,214 @@
+"""
+Streaming reader for EnergyPlus ESO/MTR output (eplusout.eso, eplusout.mtr).
+
+Both files share one text format: a data dictionary followed by data records.
+
+    Program Version,EnergyPlus, Version 23.2.0-7636e6b3e9, YMD=2024.01.01 00:00
+    1,5,Environment Title[],Latitude[deg],Longitude[deg],Time Zone[],Elevation[m]
+    2,8,Day of Simulation[],Month[],Day of Month[],DST Indicator[1=yes 0=no],Hour[],StartMinute[],EndMinute[],DayType
+    ...
+    7,1,Environment,Site Outdoor Air Drybulb Temperature [C] !Hourly
+    13,1,Electricity:Facility [J] !Hourly
+    End of Data Dictionary
+    1,RUN PERIOD 1,  57.70,  11.97,   1.00,  12.00
+    2,1, 1, 1, 0, 1, 0.00,60.00,Sunday
+    7,-2.1
+    13,1234.5
+    ...
+    End of Data
+
+Codes 1-6 are control records (environment, timestep/hourly, daily, monthly,
+run period and annual stamps); every other code is a report variable or
+meter declared in the dictionary.
+
+`iter_eso` is a generator over typed records, so a file is never held in
+memory as text. `read_eso_table` consumes it and writes each variable
+straight into a float column, giving the same `ReadVarsTable` the ReadVars
+CSV reader produces without running ReadVarsESO: rows are the timestep/hourly
+stamps of the longest environment (the run period rather than sizing days),
+and daily/monthly/run period values land on the last row of their period as
+they do in the CSV.
+"""
+from array import array
+from typing import Dict, Iterator, List, NamedTuple, Optional, Union
+
+import numpy as np
+
+from .readvars import ReadVarsTable, parse_time_index
+
+
+ENVIRONMENT_CODE = '1'
+TIMESTEP_CODE = '2'
+# Daily, monthly, run period and annual stamps: their values share the current row
+PERIOD_CODES = {'3', '4', '5', '6'}
+CONTROL_CODES = {ENVIRONMENT_CODE, TIMESTEP_CODE} | PERIOD_CODES
+
+END_OF_DICTIONARY = 'End of Data Dictionary'
+END_OF_DATA = 'End of Data'
+
+
+class EsoVariable(NamedTuple):
+    """A report variable or meter declared in the data dictionary."""
+    report_id: str
+    key: str
+    name: str
+    units: str
+    frequency: str
+
+    @property
+    def label(self) -> str:
+        """Column header ReadVarsESO writes for this variable."""
+        prefix = f'{self.key}:' if self.key else ''
+        return f'{prefix}{self.name} [{self.units}]({self.frequency})'
+
+
+class EsoEnvironment(NamedTuple):
+    title: str
+
+
+class EsoTimestamp(NamedTuple):
+    """End of a timestep/hourly interval."""
+    month: int
+    day: int
+    hour: int
+    end_minute: float
+
+    @property
+    def stamp(self) -> str:
+        """` MM/DD  hh:mm:ss` stamp as written by ReadVarsESO (24:00:00 closes a day)."""
+        minutes = (self.hour - 1) * 60 + int(round(self.end_minute))
+        return f' {self.month:02d}/{self.day:02d}  {minutes // 60:02d}:{minutes % 60:02d}:00'
+
+
+class EsoValue(NamedTuple):
+    report_id: str
+    value: float
+
+
+EsoRecord = Union[EsoVariable, EsoEnvironment, EsoTimestamp, EsoValue]
+
+# Builds EsoValue without the NamedTuple constructor's argument handling (about
+# twice as fast, and there is one EsoValue per report value)
+_new_tuple = tuple.__new__
+
+
+def parse_dictionary_line(line: str) -> Optional[EsoVariable]:
+    """Parse a dictionary entry; None for control records and malformed lines."""
+    report_id, _, rest = line.partition(',')
+    if report_id in CONTROL_CODES or '!' not in rest:
+        return None
+    _, _, rest = rest.partition(',')  # number of values per record
+    declaration, _, frequency = rest.rpartition('!')
+    # Min/max variables append "[Value,Min,Hour,Minute,Max,Hour,Minute]" to the frequency
+    frequency = frequency.split('[')[0].strip()
+    key, _, name = declaration.strip().rpartition(',')
+    units = ''
+    if name.endswith(']') and '[' in name:
+        name, _, units = name[:-1].rpartition('[')
+    return EsoVariable(report_id, key.strip(), name.strip(), units.strip(), frequency)
+
+
+def iter_eso(path) -> Iterator[EsoRecord]:
+    """Yield the dictionary's EsoVariables, then environments, timestamps and values in file order."""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.strip()
+            if line == END_OF_DICTIONARY:
+                break
+            variable = parse_dictionary_line(line)
+            if variable is not None:
+                yield variable
+
+        for line in f:
+            code, _, rest = line.partition(',')
+            if code == TIMESTEP_CODE:
+                fields = rest.split(',')
+                try:
+                    yield EsoTimestamp(int(fields[1]), int(fields[2]), int(fields[4]), float(fields[6]))
+                except (IndexError, ValueError):
+                    continue
+            elif code in PERIOD_CODES:
+                continue
+            elif code == ENVIRONMENT_CODE:
+                yield EsoEnvironment(rest.split(',')[0].strip())
+            elif rest:
+                # Min/max records carry extra fields after the value
+                value, _, _ = rest.partition(',')
+                try:
+                    number = float(value)
+                except ValueError:
+                    continue
+                yield _new_tuple(EsoValue, (code, number))
+            elif line.startswith(END_OF_DATA):
+                break
+
+
+class _Environment:
+    """Columns of one environment while it is being read."""
+
+    def __init__(self, title: str):
+        self.title = title
+        self.stamps: List[str] = []
+        self.last_end: Optional[tuple] = None
+        # report_id -> (row numbers, values)
+        self.columns: Dict[str, tuple] = {}
+
+    def add_stamp(self, stamp: EsoTimestamp) -> None:
+        end = (stamp.month, stamp.day, stamp.hour, stamp.end_minute)
+        # Hourly variables get their own stamp after the hour's last timestep: same row
+        if end != self.last_end:
+            self.stamps.append(stamp.stamp)
+            self.last_end = end
+
+    def column(self, report_id: str) -> tuple:
+        column = self.columns.get(report_id)
+        if column is None:
+            column = self.columns[report_id] = (array('q'), array('d'))
+        return column
+
+
+def read_eso_table(path) -> Optional[ReadVarsTable]:
+    """Read an ESO/MTR file into a ReadVarsTable; None when it holds no data rows."""
+    variables: Dict[str, EsoVariable] = {}
+    environments: List[_Environment] = []
+    current: Optional[_Environment] = None
+    columns: Dict[str, tuple] = {}
+    row = -1
+    # Values are most of the records, so their branch avoids attribute lookups and calls
+    for record in iter_eso(path):
+        kind = type(record)
+        if kind is EsoValue:
+            column = columns.get(record[0])
+            if column is None:
+                if row < 0:
+                    continue
+                column = columns[record[0]] = current.column(record[0])
+            column[0].append(row)
+            column[1].append(record[1])
+        elif kind is EsoTimestamp:
+            if current is None:
+                current = _Environment('')
+                environments.append(current)
+                columns = current.columns
+            current.add_stamp(record)
+            row = len(current.stamps) - 1
+        elif kind is EsoEnvironment:
+            current = _Environment(record.title)
+            environments.append(current)
+            columns = current.columns
+            row = -1
+        else:
+            variables[record.report_id] = record
+
+    environments = [env for env in environments if env.stamps]
+    if not environments:
+        return None
+    # The run period is the longest environment; sizing periods are a few design days
+    env = max(environments, key=lambda e: len(e.stamps))
+
+    report_ids = [rid for rid in variables if rid in env.columns]
+    values = np.full((len(env.stamps), len(report_ids)), np.nan)
+    for col_idx, rid in enumerate(report_ids):
+        rows, column = env.columns[rid]
+        values[np.frombuffer(rows, dtype=np.int64), col_idx] = np.frombuffer(column, dtype=np.float64)
+    return ReadVarsTable([variables[rid].label for rid in report_ids], parse_time_index(env.stamps), values)
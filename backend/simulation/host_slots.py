@@ -0,0 +1,252 @@
+"""
+Per-host simulation slots.
+
+Celery concurrency alone does not bound how many EnergyPlus containers land
+on one machine: several workers can share a Docker daemon, and containers ran
+without CPU or memory caps, so busy hosts oversubscribed and swapped.
+
+Each host gets a number of slots derived from its cores and RAM and the
+per-run container limits:
+
+    slots = min(cores // SIMULATION_CONTAINER_CPUS,
+                (RAM - SIMULATION_HOST_MEMORY_RESERVE) // SIMULATION_CONTAINER_MEMORY)
+
+(or `SIMULATION_HOST_SLOTS` when set). A run holds a slot for the duration of
+EnergyPlus; when every slot is taken - or the host's available memory is
+below one run's limit - the run waits before starting its container.
+
+Slots are leases in a Redis sorted set per host (`epsm:slots:<host>`, scored
+by expiry), so all worker processes on the host share them and a crashed
+worker's slot frees itself once its lease runs out. Without Redis the slots
+are tracked per process.
+"""
+import json
+import socket
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+from .metrics import get_redis
+
+
+SLOT_KEY_PREFIX = 'epsm:slots:'
+HOSTS_KEY = SLOT_KEY_PREFIX + 'hosts'
+POLL_INTERVAL = 2.0
+# How long a host's advertised capacity stays visible without a refresh
+CAPACITY_TTL = 600
+
+# Remove expired leases, then take a slot if one is free (atomic on the server)
+_ACQUIRE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call('ZADD', KEYS[1], ARGV[3], ARGV[4])
+    return 1
+end
+return 0
+"""
+
+
+class SlotUnavailable(RuntimeError):
+    """Raised when no simulation slot frees up within the wait timeout."""
+
+
+def parse_memory(value) -> int:
+    """Parse a Docker-style memory size ('2g', '512m', '1073741824') into bytes."""
+    text = str(value).strip().lower().rstrip('b')
+    units = {'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3, 't': 1024 ** 4}
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(float(text or 0))
+
+
+def container_cpus() -> float:
+    return float(getattr(settings, 'SIMULATION_CONTAINER_CPUS', 1) or 0)
+
+
+def container_memory() -> int:
+    return parse_memory(getattr(settings, 'SIMULATION_CONTAINER_MEMORY', '2g') or 0)
+
+
+def docker_resource_args() -> List[str]:
+    """`docker run` flags capping one EnergyPlus container (empty when limits are disabled)."""
+    args = []
+    cpus = container_cpus()
+    if cpus > 0:
+        args += ['--cpus', f'{cpus:g}']
+    memory = container_memory()
+    if memory > 0:
+        args += ['--memory', str(memory), '--memory-swap', str(memory)]
+    return args
+
+
+def host_id() -> str:
+    return getattr(settings, 'SIMULATION_HOST_ID', '') or socket.gethostname()
+
+
+def host_capacity() -> Dict[str, float]:
+    """Cores, RAM and the resulting slot count of this host."""
+    import psutil
+    cores = psutil.cpu_count(logical=True) or 1
+    memory = psutil.virtual_memory().total
+    configured = int(getattr(settings, 'SIMULATION_HOST_SLOTS', 0) or 0)
+    if configured > 0:
+        slots = configured
+    else:
+        cpus, per_run = container_cpus(), container_memory()
+        reserve = parse_memory(getattr(settings, 'SIMULATION_HOST_MEMORY_RESERVE', '1g') or 0)
+        by_cpu = int(cores // cpus) if cpus > 0 else cores
+        by_memory = int((memory - reserve) // per_run) if per_run > 0 else by_cpu
+        slots = max(1, min(by_cpu, by_memory))
+    return {'cores': cores, 'memory_bytes': memory, 'slots': slots}
+
+
+def is_enabled() -> bool:
+    return bool(getattr(settings, 'SIMULATION_HOST_SLOTS_ENABLED', True))
+
+
+class HostSlotScheduler:
+    """Lease-based slots limiting concurrent EnergyPlus runs on one host."""
+
+    def __init__(self, host: Optional[str] = None, capacity: Optional[dict] = None):
+        self.host = host or host_id()
+        self.capacity = capacity or host_capacity()
+        self.slots = int(self.capacity['slots'])
+        self.key = SLOT_KEY_PREFIX + self.host
+        self._local: Dict[str, float] = {}
+        self._local_lock = threading.Lock()
+
+    def _advertise(self, client) -> None:
+        # Lets system_resources (usually another container) list every worker host
+        client.sadd(HOSTS_KEY, self.host)
+        client.set(SLOT_KEY_PREFIX + 'capacity:' + self.host, json.dumps(self.capacity), ex=CAPACITY_TTL)
+
+    def _memory_pressure(self, in_use: int) -> bool:
+        """True when another run is active and RAM for one more run is not available."""
+        per_run = container_memory()
+        if not in_use or per_run <= 0:
+            return False
+        try:
+            import psutil
+            return psutil.virtual_memory().available < per_run
+        except Exception:
+            return False
+
+    def try_acquire(self, lease_seconds: float) -> Optional[str]:
+        """Take a slot for `lease_seconds` if one is free; return its token or None."""
+        token = uuid.uuid4().hex
+        now = time.time()
+        if self._memory_pressure(self.in_use()):
+            return None
+        client = get_redis()
+        if client is not None:
+            try:
+                self._advertise(client)
+                if client.eval(_ACQUIRE_SCRIPT, 1, self.key, now, self.slots, now + lease_seconds, token):
+                    return token
+                return None
+            except Exception as e:
+                print(f"Host slots: Redis error, using per-process slots: {e}")
+        with self._local_lock:
+            for expired in [t for t, expiry in self._local.items() if expiry <= now]:
+                del self._local[expired]
+            if len(self._local) < self.slots:
+                self._local[token] = now + lease_seconds
+                return token
+        return None
+
+    def acquire(self, lease_seconds: float, wait_timeout: Optional[float] = None) -> str:
+        """Block until a slot is free; raise SlotUnavailable after `wait_timeout` seconds."""
+        if wait_timeout is None:
+            wait_timeout = getattr(settings, 'SIMULATION_SLOT_WAIT_TIMEOUT', 3600)
+        deadline = time.monotonic() + wait_timeout
+        announced = False
+        while True:
+            token = self.try_acquire(lease_seconds)
+            if token is not None:
+                return token
+            if time.monotonic() >= deadline:
+                raise SlotUnavailable(
+                    f"No simulation slot free on host {self.host} after {wait_timeout} seconds "
+                    f"({self.slots} slots)")
+            if not announced:
+                print(f"Host {self.host} saturated ({self.slots} slots in use), waiting for a slot")
+                announced = True
+            time.sleep(POLL_INTERVAL)
+
+    def release(self, token: str) -> None:
+        client = get_redis()
+        if client is not None:
+            try:
+                client.zrem(self.key, token)
+            except Exception as e:
+                print(f"Host slots: failed to release slot {token}: {e}")
+        with self._local_lock:
+            self._local.pop(token, None)
+
+    def in_use(self) -> int:
+        now = time.time()
+        client = get_redis()
+        if client is not None:
+            try:
+                return int(client.zcount(self.key, now, '+inf'))
+            except Exception:
+                pass
+        with self._local_lock:
+            return sum(1 for expiry in self._local.values() if expiry > now)
+
+
+_scheduler: Optional[HostSlotScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_host_scheduler() -> Optional[HostSlotScheduler]:
+    """Return this host's scheduler, or None when slot scheduling is disabled."""
+    global _scheduler
+    if not is_enabled():
+        return None
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = HostSlotScheduler()
+        return _scheduler
+
+
+def slot_usage() -> List[dict]:
+    """Slot usage of every host that advertised capacity recently (this host first)."""
+    usage = []
+    local = host_id()
+    hosts = [local]
+    client = get_redis()
+    if client is not None:
+        try:
+            known = {h.decode() if isinstance(h, bytes) else h for h in client.smembers(HOSTS_KEY)}
+            hosts += sorted(known - {local})
+        except Exception:
+            pass
+    now = time.time()
+    for host in hosts:
+        capacity = None
+        in_use = None
+        if client is not None:
+            try:
+                raw = client.get(SLOT_KEY_PREFIX + 'capacity:' + host)
+                capacity = json.loads(raw) if raw else None
+                in_use = int(client.zcount(SLOT_KEY_PREFIX + host, now, '+inf'))
+            except Exception:
+                pass
+        if capacity is None:
+            if host != local:
+                continue  # capacity expired: host has not run anything recently
+            scheduler = get_host_scheduler() or HostSlotScheduler()
+            capacity, in_use = scheduler.capacity, scheduler.in_use()
+        usage.append({
+            'host': host,
+            'slots': capacity['slots'],
+            'in_use': in_use or 0,
+            'available': max(capacity['slots'] - (in_use or 0), 0),
+            'cores': capacity['cores'],
+            'memory_gb': round(capacity['memory_bytes'] / (1024 ** 3), 2),
+        })
+    return usage
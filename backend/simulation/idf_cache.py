@@ -0,0 +1,157 @@
+"""
+Per-process IDD and parsed-model caches for UnifiedIDFParser.
+
+Every `UnifiedIDFParser(..., read_only=False)` used to tokenise its content
+from scratch, although all variants of a batch start from the same few base
+IDFs, and every eppy-backed parser repeated `install_paths` and
+`IDF.setiddname`, with the first eppy load of a worker process paying for
+reading `Energy+.idd` inside a simulation task.
+
+- `get_model` keeps parsed base models keyed by the SHA-256 of their content
+  in an LRU bounded by `SIMULATION_IDF_MODEL_CACHE_SIZE`, and hands out
+  copies (`IdfModel.copy`), so each variant edits its own model without
+  re-tokenising the base text.
+- `get_template` keeps the analysed `IdfTemplate` of each base the same way
+  (same bound, separate LRU) for base-once/patch-many rendering.
+- `ensure_idd` sets eppy's IDD once per process and loads it into eppy's
+  class-level cache; `prewarm` runs it when a Celery worker process starts.
+
+The caches are per process; hit/miss counters go through metrics.py so the
+system resources endpoint reports them for all workers.
+"""
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+
+from . import metrics
+from .idf_model import IdfModel
+
+MODEL_HITS = 'idf_cache.model.hits'
+MODEL_MISSES = 'idf_cache.model.misses'
+TEMPLATE_HITS = 'idf_cache.template.hits'
+TEMPLATE_MISSES = 'idf_cache.template.misses'
+IDD_LOADS = 'idf_cache.idd.loads'
+IDD_HITS = 'idf_cache.idd.hits'
+
+_models: "OrderedDict[str, IdfModel]" = OrderedDict()
+_templates: "OrderedDict[str, Any]" = OrderedDict()
+_models_lock = threading.Lock()
+_idd_ready: Dict[str, bool] = {}
+_idd_lock = threading.Lock()
+
+
+def max_models() -> int:
+    return int(getattr(settings, 'SIMULATION_IDF_MODEL_CACHE_SIZE', 16) or 0)
+
+
+def content_key(content: str) -> str:
+    return hashlib.sha256(content.encode('utf-8', errors='surrogatepass')).hexdigest()
+
+
+def _cached(cache: OrderedDict, content: str, build: Callable[[str], Any], hits: str, misses: str) -> Any:
+    """Entry of `cache` for `content`, built on a miss; least recently used entries are evicted."""
+    size = max_models()
+    if size <= 0:
+        return build(content)
+    key = content_key(content)
+    with _models_lock:
+        entry = cache.get(key)
+        if entry is not None:
+            cache.move_to_end(key)
+    if entry is not None:
+        metrics.incr(hits)
+        return entry
+
+    metrics.incr(misses)
+    entry = build(content)
+    with _models_lock:
+        cache[key] = entry
+        cache.move_to_end(key)
+        while len(cache) > size:
+            cache.popitem(last=False)
+    return entry
+
+
+def get_model(content: str) -> IdfModel:
+    """A private copy of the parsed model of `content`; raises IdfSyntaxError like `IdfModel.parse`."""
+    return _cached(_models, content, IdfModel.parse, MODEL_HITS, MODEL_MISSES).copy()
+
+
+def get_template(content: str):
+    """The shared `IdfTemplate` of base `content` (`render` only updates its `last_mode`)."""
+    from .idf_template import IdfTemplate
+
+    return _cached(_templates, content, IdfTemplate, TEMPLATE_HITS, TEMPLATE_MISSES)
+
+
+def ensure_idd(idd_dir: str) -> bool:
+    """Point eppy at `idd_dir/Energy+.idd` and load it once per process; False when eppy or the IDD is missing."""
+    idd_path = os.path.join(idd_dir, 'Energy+.idd')
+    if _idd_ready.get(idd_path):
+        metrics.incr(IDD_HITS)
+        return True
+    with _idd_lock:
+        if _idd_ready.get(idd_path):
+            metrics.incr(IDD_HITS)
+            return True
+        try:
+            from eppy.modeleditor import IDF
+        except Exception:
+            return False
+        if not os.path.exists(idd_path):
+            return False
+        IDF.setiddname(idd_path)
+        if IDF.idd_info is None:
+            # Reading any IDF fills eppy's class-level IDD cache
+            IDF(io.StringIO('Version,23.2;'))
+        _idd_ready[idd_path] = True
+    metrics.incr(IDD_LOADS)
+    return True
+
+
+def prewarm(idd_dir: Optional[str] = None) -> bool:
+    """Load the IDD before the first task needs it (called at worker process start)."""
+    from .unified_idf_parser import _get_energyplus_path
+
+    try:
+        return ensure_idd(idd_dir or _get_energyplus_path())
+    except Exception as e:
+        print(f"Warning: Failed to pre-load Energy+.idd: {e}")
+        return False
+
+
+def _rate(hits: float, misses: float) -> Optional[float]:
+    return round(hits / (hits + misses), 4) if (hits + misses) else None
+
+
+def stats() -> dict:
+    """Hit rates of the parsed-model and IDD caches across workers, plus this process's cache size."""
+    counters = metrics.get_many(MODEL_HITS, MODEL_MISSES, TEMPLATE_HITS, TEMPLATE_MISSES, IDD_LOADS, IDD_HITS)
+    with _models_lock:
+        entries, templates = len(_models), len(_templates)
+    return {
+        'models': {
+            'hits': counters[MODEL_HITS],
+            'misses': counters[MODEL_MISSES],
+            'hit_rate': _rate(counters[MODEL_HITS], counters[MODEL_MISSES]),
+            'entries': entries,
+            'max_entries': max_models(),
+        },
+        'templates': {
+            'hits': counters[TEMPLATE_HITS],
+            'misses': counters[TEMPLATE_MISSES],
+            'hit_rate': _rate(counters[TEMPLATE_HITS], counters[TEMPLATE_MISSES]),
+            'entries': templates,
+            'max_entries': max_models(),
+        },
+        'idd': {
+            'loads': counters[IDD_LOADS],
+            'hits': counters[IDD_HITS],
+            'hit_rate': _rate(counters[IDD_HITS], counters[IDD_LOADS]),
+        },
+    }
@@ -0,0 +1,302 @@
+"""
+Lightweight tokenised IDF object model.
+
+Editing a variant used to load the whole IDF through eppy: the text was
+written to a temp file, parsed against the full `Energy+.idd`, edited through
+`getattr`/`setattr` and saved through another temp file. `IdfModel` tokenises
+the text directly instead:
+
+- every object keeps its source text (leading comments, field comments and
+  layout), with the character span of each field value, so an edited field is
+  spliced in place and untouched objects are written back byte for byte;
+- objects are indexed by class and by name;
+- new objects are appended in eppy's layout.
+
+The model exposes the small part of eppy's API the construction-set helpers in
+unified_idf_parser.py use (`idfobjects`, `newidfobject`, `removeidfobject`,
+field attributes such as `Construction_Name`, `fieldnames`, `saveas`), so the
+same helpers edit either backend. Field names are only known for the classes
+listed in `FIELDS`; any other class exposes `Name` (its first field).
+"""
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class IdfSyntaxError(ValueError):
+    """The text could not be tokenised as IDF objects."""
+
+
+def _field(label: str) -> Tuple[str, str]:
+    """(eppy attribute name, comment) for an IDD field label such as 'U-Factor {W/m2-K}'."""
+    name = re.sub(r"\s*\{.*\}$", "", label).replace(" ", "_")
+    return re.sub(r"[^A-Za-z0-9_]", "", name), label
+
+
+# IDD fields (after the class key) of the classes construction-set edits touch
+FIELDS: Dict[str, List[Tuple[str, str]]] = {
+    "MATERIAL": [_field(f) for f in (
+        "Name", "Roughness", "Thickness {m}", "Conductivity {W/m-K}", "Density {kg/m3}",
+        "Specific Heat {J/kg-K}", "Thermal Absorptance", "Solar Absorptance", "Visible Absorptance",
+    )],
+    "MATERIAL:NOMASS": [_field(f) for f in (
+        "Name", "Roughness", "Thermal Resistance {m2-K/W}", "Thermal Absorptance",
+        "Solar Absorptance", "Visible Absorptance",
+    )],
+    "WINDOWMATERIAL:SIMPLEGLAZINGSYSTEM": [_field(f) for f in (
+        "Name", "U-Factor {W/m2-K}", "Solar Heat Gain Coefficient", "Visible Transmittance",
+    )],
+    "CONSTRUCTION": [_field(f) for f in ["Name", "Outside Layer"] + [f"Layer {i}" for i in range(2, 11)]],
+    # Only the leading fields: later ones moved when Space Name was added in 23.1
+    "BUILDINGSURFACE:DETAILED": [_field(f) for f in (
+        "Name", "Surface Type", "Construction Name", "Zone Name",
+    )],
+    "FENESTRATIONSURFACE:DETAILED": [_field(f) for f in (
+        "Name", "Surface Type", "Construction Name", "Building Surface Name",
+    )],
+}
+_DEFAULT_FIELDS = [_field("Name")]
+_NAME_INDEX = {"Name": 0}
+_FIELD_INDEX = {cls: {attr: i for i, (attr, _) in enumerate(fields)} for cls, fields in FIELDS.items()}
+
+_SKIP = re.compile(r"(?:\s+|!.*)*")
+_VALUE = re.compile(r"[^,;!]*")
+_LINE_END = re.compile(r"[ \t]*(?:!.*)?(?:\r?\n)?")
+
+
+def _format_value(value: Any) -> str:
+    """Field text as eppy writes it (whole floats without decimals)."""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class IdfObject:
+    """One IDF object: its class key, field values and source text.
+
+    `text` runs from the class key to the end of the line holding the closing
+    `;`; `prefix` is the whitespace and comments before it. `spans[i]` is the
+    (start, end) of `fields[i]` within `text`.
+    """
+    __slots__ = ("key", "cls", "fields", "prefix", "text", "spans", "_model")
+
+    def __init__(self, key: str, fields: List[str], prefix: str, text: str, spans: List[Tuple[int, int]]):
+        object.__setattr__(self, "key", key)
+        # Upper-case class, as eppy's `idfobjects` keys
+        object.__setattr__(self, "cls", key.upper())
+        object.__setattr__(self, "fields", fields)
+        object.__setattr__(self, "prefix", prefix)
+        object.__setattr__(self, "text", text)
+        object.__setattr__(self, "spans", spans)
+        object.__setattr__(self, "_model", None)
+
+    @classmethod
+    def render(cls, key: str, values: List[Any], prefix: str = "\n") -> "IdfObject":
+        """A new object laid out like eppy's output; trailing empty fields are dropped."""
+        values = [_format_value(v) for v in values]
+        while len(values) > 1 and not values[-1]:
+            values.pop()
+        comments = [label for _, label in FIELDS.get(key.upper(), _DEFAULT_FIELDS)]
+        parts = [f"{key},\n"]
+        spans = []
+        offset = len(parts[0])
+        for i, value in enumerate(values):
+            line = f"    {value}{';' if i == len(values) - 1 else ','}".ljust(26)
+            if i < len(comments):
+                line += f"    !- {comments[i]}"
+            spans.append((offset + 4, offset + 4 + len(value)))
+            parts.append(line + "\n")
+            offset += len(line) + 1
+        return cls(key, values, prefix, "".join(parts), spans)
+
+    @property
+    def name(self) -> str:
+        return self.fields[0] if self.fields else ""
+
+    @property
+    def fieldnames(self) -> List[str]:
+        """eppy-style field names: 'key' followed by the known fields of the class."""
+        return ["key"] + [attr for attr, _ in FIELDS.get(self.cls, _DEFAULT_FIELDS)]
+
+    def _index(self, attr: str) -> Optional[int]:
+        if attr == "Name":
+            return 0
+        return _FIELD_INDEX.get(self.cls, _NAME_INDEX).get(attr)
+
+    def copy(self) -> "IdfObject":
+        """An unattached copy; the strings are shared, the field and span lists are not."""
+        return IdfObject(self.key, list(self.fields), self.prefix, self.text, list(self.spans))
+
+    def get(self, index: int, default: str = "") -> str:
+        return self.fields[index] if index < len(self.fields) else default
+
+    def set(self, index: int, value: Any) -> None:
+        """Set field `index`, splicing the value into the source text."""
+        value = _format_value(value)
+        if index >= len(self.fields):
+            if not value:
+                return
+            # Adding fields changes the separators: lay the object out again
+            values = self.fields + [""] * (index - len(self.fields)) + [value]
+            fresh = IdfObject.render(self.key, values)
+            for slot in ("fields", "text", "spans"):
+                object.__setattr__(self, slot, getattr(fresh, slot))
+        else:
+            start, end = self.spans[index]
+            delta = len(value) - (end - start)
+            object.__setattr__(self, "text", self.text[:start] + value + self.text[end:])
+            self.fields[index] = value
+            if delta:
+                self.spans[index] = (start, end + delta)
+                for i in range(index + 1, len(self.spans)):
+                    s, e = self.spans[i]
+                    self.spans[i] = (s + delta, e + delta)
+        if index == 0 and self._model is not None:
+            self._model._reindex()
+
+    def __getattr__(self, attr: str) -> str:
+        index = self._index(attr) if not attr.startswith("_") else None
+        if index is None:
+            raise AttributeError(attr)
+        return self.get(index)
+
+    def __setattr__(self, attr: str, value: Any) -> None:
+        index = self._index(attr)
+        if index is None:
+            raise AttributeError(f"{self.key} has no known field {attr!r}")
+        self.set(index, value)
+
+    def __repr__(self) -> str:
+        return self.text
+
+
+def tokenize(text: str) -> Iterator[IdfObject]:
+    """Yield the objects of `text`; the trailing text after the last object is yielded as a str."""
+    pos = 0
+    length = len(text)
+    while True:
+        start = _SKIP.match(text, pos).end()
+        if start >= length:
+            yield text[pos:]
+            return
+        values: List[str] = []
+        spans: List[Tuple[int, int]] = []
+        cursor = start
+        while True:
+            cursor = _SKIP.match(text, cursor).end()
+            raw = _VALUE.match(text, cursor).group()
+            value = raw.rstrip()
+            values.append(value)
+            spans.append((cursor - start, cursor - start + len(value)))
+            cursor = _SKIP.match(text, cursor + len(raw)).end()
+            if cursor >= length:
+                raise IdfSyntaxError(f"Object {values[0]!r} is not terminated with ';'")
+            sep = text[cursor]
+            if sep not in ",;":
+                raise IdfSyntaxError(f"Unexpected {sep!r} in object {values[0]!r}")
+            cursor += 1
+            if sep == ";":
+                break
+        if not values[0]:
+            raise IdfSyntaxError(f"Object without a class name at offset {start}")
+        end = _LINE_END.match(text, cursor).end()
+        yield IdfObject(values[0], values[1:], text[pos:start], text[start:end], spans[1:])
+        pos = end
+
+
+class IdfModel:
+    """An IDF held as a list of `IdfObject`s, indexed by class and by (class, name)."""
+
+    def __init__(self, objects: List[IdfObject], tail: str = ""):
+        self.objects = objects
+        self.tail = tail
+        for obj in objects:
+            object.__setattr__(obj, "_model", self)
+        self._reindex()
+
+    @classmethod
+    def parse(cls, text: str) -> "IdfModel":
+        items = list(tokenize(text))
+        return cls(items[:-1], items[-1])
+
+    def copy(self) -> "IdfModel":
+        """An independent model with the same content, without re-tokenising."""
+        return IdfModel([obj.copy() for obj in self.objects], self.tail)
+
+    def _reindex(self) -> None:
+        self._by_class: Dict[str, List[IdfObject]] = {}
+        self._by_name: Dict[Tuple[str, str], IdfObject] = {}
+        for obj in self.objects:
+            self._by_class.setdefault(obj.cls, []).append(obj)
+            self._by_name.setdefault((obj.cls, obj.name), obj)
+
+    # --------------------------- Lookup -----------------------------------
+    def of_class(self, cls: str) -> List[IdfObject]:
+        return list(self._by_class.get(cls.upper(), ()))
+
+    def get(self, cls: str, name: str) -> Optional[IdfObject]:
+        """First object of `cls` named `name` (names compare exactly, as the eppy helpers do)."""
+        return self._by_name.get((cls.upper(), name))
+
+    @property
+    def idfobjects(self) -> Dict[str, List[IdfObject]]:
+        """Objects by upper-case class, like eppy's `IDF.idfobjects`."""
+        return {cls: list(objs) for cls, objs in self._by_class.items()}
+
+    # --------------------------- Edits ------------------------------------
+    def add(self, key: str, values: List[Any]) -> IdfObject:
+        """Append a new object `key` with field `values` (Name first)."""
+        last = self.objects[-1].text if self.objects else ""
+        obj = IdfObject.render(key, values, prefix="\n" if last.endswith("\n") or not last else "\n\n")
+        object.__setattr__(obj, "_model", self)
+        self.objects.append(obj)
+        self._by_class.setdefault(obj.cls, []).append(obj)
+        self._by_name.setdefault((obj.cls, obj.name), obj)
+        return obj
+
+    def remove(self, obj: IdfObject) -> None:
+        """Drop `obj`; the comments before it stay in place."""
+        index = self.objects.index(obj)
+        del self.objects[index]
+        if index < len(self.objects):
+            following = self.objects[index]
+            object.__setattr__(following, "prefix", obj.prefix + following.prefix)
+        else:
+            self.tail = obj.prefix + self.tail
+        object.__setattr__(obj, "_model", None)
+        self._reindex()
+
+    def rename(self, obj: IdfObject, new_name: str, references: Tuple[Tuple[str, int], ...] = ()) -> None:
+        """Rename `obj` and update the (class, field index) `references` that pointed at the old name."""
+        old = obj.name
+        for cls, index in references:
+            for ref in self._by_class.get(cls.upper(), ()):
+                if ref.get(index) == old:
+                    ref.set(index, new_name)
+        obj.set(0, new_name)
+
+    # eppy-compatible spellings used by the construction-set helpers
+    def newidfobject(self, key: str, **kwargs: Any) -> IdfObject:
+        fields = FIELDS.get(key.upper(), _DEFAULT_FIELDS)
+        index = {attr: i for i, (attr, _) in enumerate(fields)}
+        values: List[Any] = [""] * len(fields)
+        for attr, value in kwargs.items():
+            i = index.get(attr.replace(" ", "_"))
+            if i is None:
+                raise AttributeError(f"{key} has no known field {attr!r}")
+            values[i] = value
+        return self.add(key, values)
+
+    def removeidfobject(self, obj: IdfObject) -> None:
+        self.remove(obj)
+
+    # --------------------------- Output -----------------------------------
+    def to_string(self) -> str:
+        return "".join(obj.prefix + obj.text for obj in self.objects) + self.tail
+
+    def saveas(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_string())
@@ -0,0 +1,203 @@
+"""
+Base-once/patch-many rendering of variant IDFs.
+
+A construction swap only adds MATERIAL / WINDOWMATERIAL / CONSTRUCTION
+objects and rewrites the `Construction Name` of BUILDINGSURFACE:DETAILED and
+FENESTRATIONSURFACE:DETAILED objects, yet every variant re-parsed (or copied)
+and re-serialised the whole base model. `IdfTemplate` analyses the base text
+once and records:
+
+- the character span of every surface's `Construction Name` value, with the
+  construction-set element type it belongs to;
+- the material and construction objects `insert_construction_set` consults,
+  and the span of each CONSTRUCTION object.
+
+`render` runs the object-creating steps of `insert_construction_set` on a
+small model holding only those materials and constructions, then splices the
+new construction names into the recorded spans, cuts out base constructions
+that were replaced and appends the new objects. The result is byte for byte
+what `IdfParser(base).insert_construction_set(...)` followed by `to_string()`
+produces, and the construction set is updated in place the same way.
+
+Bases the splice cannot reproduce exactly (duplicate construction names,
+surface references to missing constructions, surfaces without a construction
+field, no newline after the last object) and construction sets whose names
+would not resolve are rendered through the full model instead; `render`
+reports which path it took in `last_mode`.
+"""
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .idf_model import IdfModel, IdfObject
+from .unified_idf_parser import (
+    SURFACE_ELEMENT_TYPES,
+    WINDOW_MATERIAL_CLASSES,
+    UnifiedIDFParser,
+)
+
+TEMPLATE_MODE = 'template'
+MODEL_MODE = 'model'
+
+# Field index of the construction name in surface objects (after Name, Surface Type)
+CONSTRUCTION_FIELD = 2
+_RELEVANT_CLASSES = ("MATERIAL", "MATERIAL:NOMASS", "CONSTRUCTION") + WINDOW_MATERIAL_CLASSES
+
+
+class _RecordingModel(IdfModel):
+    """IdfModel that remembers the objects added to it, in order."""
+
+    def __init__(self, objects: List[IdfObject]):
+        self.added: List[IdfObject] = []
+        super().__init__(objects)
+
+    def add(self, key: str, values: List[Any]) -> IdfObject:
+        obj = super().add(key, values)
+        self.added.append(obj)
+        return obj
+
+
+class IdfTemplate:
+    """A base IDF analysed once; `render(construction_set)` produces each variant's text."""
+
+    def __init__(self, content: str, idd_dir: Optional[str] = None):
+        self.content = content
+        self.idd_dir = idd_dir
+        self.last_mode: Optional[str] = None
+        self.reason: Optional[str] = None
+
+        model = IdfModel.parse(content)
+        self._tail_start = len(content) - len(model.tail)
+        # (start, end, element type) of each surface's construction name value
+        self._surfaces: List[Tuple[int, int, Optional[str]]] = []
+        # base references per element type (None: surface types a set never assigns)
+        self._references: Dict[Optional[str], Set[str]] = {}
+        self._relevant: List[IdfObject] = []
+        self._relevant_spans: List[Optional[Tuple[int, int]]] = []
+        construction_names: List[str] = []
+
+        offset = 0
+        for obj in model.objects:
+            start = offset + len(obj.prefix)
+            offset = start + len(obj.text)
+            if not obj.text.endswith("\n"):
+                self.reason = "an object is not followed by a newline"
+            cls = obj.cls
+            if cls in ("BUILDINGSURFACE:DETAILED", "FENESTRATIONSURFACE:DETAILED"):
+                if len(obj.fields) <= CONSTRUCTION_FIELD:
+                    self.reason = f"surface {obj.name!r} has no construction field"
+                    continue
+                if cls == "FENESTRATIONSURFACE:DETAILED":
+                    element = "window"
+                else:
+                    element = SURFACE_ELEMENT_TYPES.get(obj.get(1).upper())
+                span_start, span_end = obj.spans[CONSTRUCTION_FIELD]
+                self._surfaces.append((start + span_start, start + span_end, element))
+                reference = obj.get(CONSTRUCTION_FIELD)
+                if reference:
+                    self._references.setdefault(element, set()).add(reference)
+            elif cls in _RELEVANT_CLASSES:
+                self._relevant.append(obj)
+                self._relevant_spans.append((start, offset) if cls == "CONSTRUCTION" else None)
+                if cls == "CONSTRUCTION":
+                    construction_names.append(obj.name)
+
+        # Summaries step 1 of insert_construction_set would otherwise rebuild per variant
+        summary = UnifiedIDFParser._for_model(IdfModel([obj.copy() for obj in self._relevant]), idd_dir)
+        summary._parse_materials_eppy()
+        summary._parse_constructions_eppy()
+        self._materials, self._constructions = summary.materials, summary.constructions
+
+        if model.objects and model.objects[-1].cls == "CONSTRUCTION":
+            # Replacing it would move its leading comments behind the new objects
+            self.reason = "the base ends with a construction"
+        if len(set(construction_names)) != len(construction_names):
+            self.reason = "duplicate construction names"
+        missing = set().union(*self._references.values()) - set(construction_names)
+        if missing:
+            self.reason = f"surfaces reference missing constructions ({len(missing)})"
+
+    @property
+    def patchable(self) -> bool:
+        return self.reason is None
+
+    def render(self, construction_set: Dict[str, Any]) -> str:
+        """The variant IDF for `construction_set` (updated in place with the names used)."""
+        if self.patchable:
+            text = self._splice(construction_set)
+            if text is not None:
+                self.last_mode = TEMPLATE_MODE
+                return text
+        self.last_mode = MODEL_MODE
+        editor = UnifiedIDFParser(self.content, read_only=False, idd_dir=self.idd_dir)
+        editor.insert_construction_set(construction_set)
+        return editor.to_string()
+
+    def _splice(self, construction_set: Dict[str, Any]) -> Optional[str]:
+        """Template rendering; None when the result would differ from the full model's.
+
+        The construction set is only modified when the splice succeeds.
+        """
+        import copy
+
+        cset = copy.deepcopy(construction_set)
+        copies = [obj.copy() for obj in self._relevant]
+        small = _RecordingModel(list(copies))
+        editor = UnifiedIDFParser._for_model(small, self.idd_dir)
+        editor.materials, editor.constructions = dict(self._materials), dict(self._constructions)
+        editor._add_construction_set_objects(cset)
+
+        # Construction name per element type after assignment (None: unchanged)
+        assigned: Dict[Optional[str], Optional[str]] = {}
+        for element in SURFACE_ELEMENT_TYPES.values():
+            cdef = cset.get(element)
+            if cdef:
+                assigned[element] = cdef["name"]
+        if "window" in cset:
+            wdef = cset["window"]
+            if not isinstance(wdef, dict) or not isinstance(wdef.get("name"), str) or not wdef["name"]:
+                return None
+            assigned["window"] = wdef["name"]
+
+        # Every reference must resolve, or the uniqueness pass would remap it
+        constructions = [obj.name for obj in small.of_class("CONSTRUCTION")]
+        names = set(constructions)
+        if len(names) != len(constructions):
+            return None
+        for element, references in self._references.items():
+            if element in assigned:
+                continue
+            if not references <= names:
+                return None
+        if any(name not in names for element, name in assigned.items() if element in self._references):
+            return None
+
+        alive = {id(obj) for obj in small.objects}
+        patches: List[Tuple[int, int, str]] = []
+        for copied, span in zip(copies, self._relevant_spans):
+            # A replaced base construction loses its text; the comments before it stay
+            if span is not None and id(copied) not in alive:
+                patches.append((span[0], span[1], ""))
+        for start, end, element in self._surfaces:
+            if element in assigned:
+                patches.append((start, end, assigned[element]))
+        patches.sort()
+
+        parts = []
+        pos = 0
+        for start, end, value in patches:
+            parts.append(self.content[pos:start])
+            parts.append(value)
+            pos = end
+        parts.append(self.content[pos:self._tail_start])
+        # Every new object is appended with a "\n" prefix, which stays when it is removed again
+        for obj in small.added:
+            parts.append("\n")
+            if id(obj) in alive:
+                parts.append(obj.text)
+        parts.append(self.content[self._tail_start:])
+
+        for key, value in cset.items():
+            if isinstance(construction_set.get(key), dict) and isinstance(value, dict):
+                construction_set[key].update(value)
+            else:
+                construction_set[key] = value
+        return "".join(parts)
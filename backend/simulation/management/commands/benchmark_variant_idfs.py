@@ -0,0 +1,83 @@
+import contextlib
+import copy
+import io
+import itertools
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from simulation.idf_model import IdfModel
+from simulation.idf_template import IdfTemplate, TEMPLATE_MODE
+from simulation.unified_idf_parser import IdfParser, WINDOW_MATERIAL_CLASSES
+
+
+class Command(BaseCommand):
+    help = ('Benchmark variant IDF generation for a base IDF: variants/s of template rendering '
+            '(SIMULATION_VARIANT_IDF_TEMPLATE) versus editing the full model, checking both give the same text.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('idf', help='Base IDF file')
+        parser.add_argument('--variants', type=int, default=200, help='Construction sets to render per mode (default: 200)')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['idf'], 'r', encoding='utf-8') as f:
+                base = f.read()
+        except OSError as e:
+            raise CommandError(f'Cannot read {options["idf"]}: {e}')
+
+        sets = self._construction_sets(base, max(options['variants'], 1))
+        started = time.perf_counter()
+        template = IdfTemplate(base)
+        analyse_seconds = time.perf_counter() - started
+        if not template.patchable:
+            self.stdout.write(self.style.WARNING(f'Base is rendered through the full model: {template.reason}'))
+
+        timings = {}
+        outputs = {}
+        modes = {}
+        for label in ('model', 'template'):
+            csets = copy.deepcopy(sets)
+            texts = []
+            started = time.perf_counter()
+            # The editing helpers print per construction; keep them out of the timings
+            with contextlib.redirect_stdout(io.StringIO()):
+                for cset in csets:
+                    if label == 'template':
+                        texts.append(template.render(cset))
+                        modes[template.last_mode] = modes.get(template.last_mode, 0) + 1
+                    else:
+                        editor = IdfParser(base)
+                        editor.insert_construction_set(cset)
+                        texts.append(editor.to_string())
+            timings[label] = time.perf_counter() - started
+            outputs[label] = texts
+
+        mismatches = sum(1 for a, b in zip(outputs['model'], outputs['template']) if a != b)
+        self.stdout.write(f'{len(sets)} construction sets, base analysed in {analyse_seconds * 1000:.1f} ms')
+        for label, seconds in timings.items():
+            self.stdout.write(f'  {label:<9} {len(sets) / seconds:8.1f} variants/s ({seconds:.3f} s)')
+        self.stdout.write(f'  spliced {modes.get(TEMPLATE_MODE, 0)} of {len(sets)}, '
+                          f'speed-up x{timings["model"] / timings["template"]:.1f}')
+        if mismatches:
+            raise CommandError(f'{mismatches} variant(s) differ between template and model rendering')
+        self.stdout.write(self.style.SUCCESS('Template output identical to the model path'))
+
+    @staticmethod
+    def _construction_sets(base: str, count: int) -> list:
+        """Construction sets built from the base's own materials, cycling through layer combinations."""
+        model = IdfModel.parse(base)
+        opaque = [obj.name for obj in model.of_class('MATERIAL') + model.of_class('MATERIAL:NOMASS')] or ['Material A']
+        glazing = [obj.name for cls in WINDOW_MATERIAL_CLASSES for obj in model.of_class(cls)] or ['Glazing A']
+        layers = itertools.cycle(itertools.product(opaque, repeat=2))
+        windows = itertools.cycle(glazing)
+        sets = []
+        for i in range(count):
+            outer, inner = next(layers)
+            sets.append({
+                'wall': {'name': f'Wall {i % 7}', 'layers': [outer, inner]},
+                'roof': {'name': f'Roof {i % 5}', 'layers': [inner, outer]},
+                'floor': {'name': f'Floor {i % 3}', 'layers': [outer]},
+                'window': {'name': f'Window {i % 4}', 'layers': [next(windows)]},
+            })
+        return sets
@@ -0,0 +1,109 @@
+"""
+Shared counters for simulation workers.
+
+Celery runs simulations in several worker processes (and possibly several
+hosts), so counters such as result-cache hits are kept in Redis where every
+process can increment and the API can read them. Redis db 2 is used so the
+keys do not mix with the Celery broker (db 0) or the Channels layer (db 1).
+If Redis is unreachable the counters fall back to a per-process dict, which
+keeps local development working without Redis.
+"""
+import threading
+from typing import Dict, Optional
+
+from django.conf import settings
+
+
+KEY_PREFIX = 'epsm:metrics:'
+
+_client = None
+_client_failed = False
+_client_lock = threading.Lock()
+_local_counters: Dict[str, float] = {}
+_local_lock = threading.Lock()
+
+
+def _redis_url() -> str:
+    host = getattr(settings, 'REDIS_HOST', 'redis')
+    port = getattr(settings, 'REDIS_PORT', '6379')
+    password = getattr(settings, 'REDIS_PASSWORD', '')
+    if password:
+        return f'redis://:{password}@{host}:{port}/2'
+    return f'redis://{host}:{port}/2'
+
+
+def get_redis():
+    """Return a shared Redis client, or None when Redis is not reachable."""
+    global _client, _client_failed
+    if _client is not None or _client_failed:
+        return _client
+    with _client_lock:
+        if _client is None and not _client_failed:
+            try:
+                import redis
+                client = redis.Redis.from_url(
+                    getattr(settings, 'SIMULATION_METRICS_REDIS_URL', None) or _redis_url(),
+                    socket_connect_timeout=2, socket_timeout=2
+                )
+                client.ping()
+                _client = client
+            except Exception as e:
+                print(f"Metrics: Redis unavailable, using in-process counters: {e}")
+                _client_failed = True
+    return _client
+
+
+def incr(name: str, amount: float = 1) -> None:
+    """Increment counter `name` by `amount` (never raises)."""
+    client = get_redis()
+    if client is not None:
+        try:
+            if isinstance(amount, float) and not amount.is_integer():
+                client.incrbyfloat(KEY_PREFIX + name, amount)
+            else:
+                client.incrby(KEY_PREFIX + name, int(amount))
+            return
+        except Exception:
+            pass
+    with _local_lock:
+        _local_counters[name] = _local_counters.get(name, 0) + amount
+
+
+def get(name: str, default: float = 0) -> float:
+    """Return the current value of counter `name`."""
+    client = get_redis()
+    if client is not None:
+        try:
+            value = client.get(KEY_PREFIX + name)
+            if value is None:
+                return default
+            value = float(value)
+            return int(value) if value.is_integer() else value
+        except Exception:
+            pass
+    with _local_lock:
+        return _local_counters.get(name, default)
+
+
+def get_many(*names: str) -> Dict[str, float]:
+    return {name: get(name) for name in names}
+
+
+def reset(name: Optional[str] = None) -> None:
+    """Reset one counter, or every counter when `name` is None."""
+    client = get_redis()
+    if client is not None:
+        try:
+            if name is not None:
+                client.delete(KEY_PREFIX + name)
+            else:
+                keys = list(client.scan_iter(KEY_PREFIX + '*'))
+                if keys:
+                    client.delete(*keys)
+        except Exception:
+            pass
+    with _local_lock:
+        if name is not None:
+            _local_counters.pop(name, None)
+        else:
+            _local_counters.clear()
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulation', '0008_add_gwp_cost_to_simulation_result'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulation',
+            name='run_options',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulation', '0009_simulation_run_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulation',
+            name='estimated_run_seconds',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='simulation',
+            name='total_runs',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-17 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulation', '0010_simulation_total_runs_estimate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulationhourlytimeseries',
+            name='interval_seconds',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='simulationhourlytimeseries',
+            name='row_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='simulationhourlytimeseries',
+            name='start_time',
+            field=models.CharField(blank=True, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='simulationhourlytimeseries',
+            name='storage_format',
+            field=models.CharField(default='json', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='simulationhourlytimeseries',
+            name='values_blob',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='simulationhourlytimeseries',
+            name='variables',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
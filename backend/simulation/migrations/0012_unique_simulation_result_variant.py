@@ -0,0 +1,40 @@
+# Generated by Django 3.2.25 on 2026-10-17 15:20
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def remove_duplicate_results(apps, schema_editor):
+    """Keep the newest row of each (simulation, idf, variant) so the unique constraints can be added."""
+    SimulationResult = apps.get_model('simulation', 'SimulationResult')
+    duplicates = (SimulationResult.objects
+                  .filter(simulation_id__isnull=False, idf_idx__isnull=False)
+                  .values('simulation_id', 'idf_idx', 'variant_idx')
+                  .annotate(rows=Count('id'), keep=Max('id'))
+                  .filter(rows__gt=1))
+    for group in duplicates:
+        rows = SimulationResult.objects.filter(simulation_id=group['simulation_id'], idf_idx=group['idf_idx'])
+        if group['variant_idx'] is None:
+            rows = rows.filter(variant_idx__isnull=True)
+        else:
+            rows = rows.filter(variant_idx=group['variant_idx'])
+        rows.exclude(id=group['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulation', '0011_compact_hourly_timeseries'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_results, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='simulationresult',
+            constraint=models.UniqueConstraint(fields=('simulation_id', 'idf_idx', 'variant_idx'), name='uniq_simulation_result_variant'),
+        ),
+        migrations.AddConstraint(
+            model_name='simulationresult',
+            constraint=models.UniqueConstraint(condition=models.Q(('variant_idx__isnull', True)), fields=('simulation_id', 'idf_idx'), name='uniq_simulation_result_base'),
+        ),
+    ]
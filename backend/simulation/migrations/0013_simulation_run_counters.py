@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-17 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulation', '0012_unique_simulation_result_variant'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulation',
+            name='completed_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='simulation',
+            name='failed_count',
+            field=models.IntegerField(default=0),
+        ),
+    ]
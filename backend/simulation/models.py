@@ -28,6 +28,14 @@ class Simulation(models.Model):
     progress = models.IntegerField(default=0)
     # Celery task ID for tracking async task status
     celery_task_id = models.CharField(max_length=255, blank=True, null=True, db_index=True)
+    # Per-request execution options read by the workers (e.g. {"use_cache": false})
+    run_options = models.JSONField(default=dict, blank=True)
+    # Number of EnergyPlus runs dispatched and the predicted seconds per run (batch ETA)
+    total_runs = models.IntegerField(default=0)
+    estimated_run_seconds = models.FloatField(null=True, blank=True)
+    # Finished runs of the batch, incremented atomically by workers; `progress` is derived from them
+    completed_count = models.IntegerField(default=0)
+    failed_count = models.IntegerField(default=0)
 
     class Meta:
         db_table = 'simulation_runs'
@@ -101,7 +109,16 @@ class SimulationResult(models.Model):
             models.Index(fields=['variant_idx', 'idf_idx']),
             models.Index(fields=['user_id']),
         ]
-    
+        # One row per run of a simulation, so retried tasks upsert instead of
+        # duplicating (see result_persistence.py). NULLs are distinct in unique
+        # indexes, hence the separate key for base IDF runs without a variant.
+        constraints = [
+            models.UniqueConstraint(fields=['simulation_id', 'idf_idx', 'variant_idx'],
+                                    name='uniq_simulation_result_variant'),
+            models.UniqueConstraint(fields=['simulation_id', 'idf_idx'], condition=models.Q(variant_idx__isnull=True),
+                                    name='uniq_simulation_result_base'),
+        ]
+
     def __str__(self):
         return f"Result for {self.file_name} - simulation {self.simulation_id}"
 
@@ -137,13 +154,21 @@ class SimulationEnergyUse(models.Model):
 class SimulationHourlyTimeseries(models.Model):
     """Optional hourly timeseries for a simulation result (e.g., 8760 values)
 
-    Stored as a JSON array of numeric values. Kept optional to avoid forcing
-    large payloads when not required.
+    New rows store compressed float32 columns in `values_blob` (see
+    timeseries_store.py). Older rows hold the payload as JSON in
+    `hourly_values` and are converted the first time they are read.
     """
     simulation_result = models.ForeignKey(SimulationResult, on_delete=models.CASCADE, related_name='hourly_timeseries')
     has_hourly = models.BooleanField(default=False, db_index=True)
-    # Expect a list/array of floats length ~8760 when present
+    # Legacy JSON payload ({'is_hourly', 'rows', 'series': {var: [values]}}); None once migrated
     hourly_values = models.JSONField(null=True, blank=True)
+    # Compact format: 'json' (legacy, not yet migrated) or 'f32-zlib'
+    storage_format = models.CharField(max_length=16, default='json')
+    values_blob = models.BinaryField(null=True, blank=True)
+    variables = models.JSONField(default=list, blank=True)  # [[name, offset, length], ...] into values_blob
+    row_count = models.IntegerField(default=0)
+    start_time = models.CharField(max_length=32, blank=True)  # ISO timestamp of the first row (nominal year)
+    interval_seconds = models.IntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -0,0 +1,82 @@
+"""
+Run / post-process stages for parametric variants.
+
+With `SIMULATION_PIPELINE_ENABLED`, a variant chunk is dispatched as a chain
+of two tasks instead of one:
+
+    run_variant_stage (default queue)  ->  postprocess_variant_stage (SIMULATION_POSTPROCESS_QUEUE)
+
+The run stage only generates the variant IDF and executes EnergyPlus, so its
+worker process (and host slot) is free for the next run as soon as the
+container exits. Parsing, GWP/cost calculation and persistence run on the
+post-process queue, served by a separate worker pool sized for CPU-bound
+Python work:
+
+    celery -A config worker -Q postprocess --concurrency=<cores>
+
+Each stage records how long its tasks waited in the queue and how long they
+ran (counters in `metrics`); `stage_stats` adds the current queue depths.
+"""
+import time
+from typing import Dict, Optional
+
+from django.conf import settings
+
+from . import metrics
+
+
+RUN_STAGE = 'run'
+POSTPROCESS_STAGE = 'postprocess'
+STAGES = (RUN_STAGE, POSTPROCESS_STAGE)
+
+
+def is_enabled() -> bool:
+    return bool(getattr(settings, 'SIMULATION_PIPELINE_ENABLED', False))
+
+
+def run_queue() -> str:
+    return getattr(settings, 'SIMULATION_RUN_QUEUE', '') or 'celery'
+
+
+def postprocess_queue() -> str:
+    return getattr(settings, 'SIMULATION_POSTPROCESS_QUEUE', '') or 'postprocess'
+
+
+def record_stage(stage: str, queued_at: Optional[float], started_at: float, items: int = 1) -> None:
+    """Count one finished task of `stage`: its queue wait (since `queued_at`) and run time."""
+    now = time.time()
+    metrics.incr(f'pipeline.{stage}.tasks')
+    metrics.incr(f'pipeline.{stage}.items', items)
+    metrics.incr(f'pipeline.{stage}.busy_seconds', round(now - started_at, 3))
+    if queued_at:
+        metrics.incr(f'pipeline.{stage}.wait_seconds', round(max(started_at - queued_at, 0.0), 3))
+
+
+def queue_depth(queue: str) -> Optional[int]:
+    """Messages waiting in a broker queue (None if the broker cannot be asked)."""
+    try:
+        from config.celery import app
+        with app.connection_for_read() as connection:
+            return int(connection.default_channel.queue_declare(queue=queue, passive=True).message_count)
+    except Exception as e:
+        print(f"Pipeline: could not read depth of queue {queue}: {e}")
+        return None
+
+
+def stage_stats() -> Dict[str, dict]:
+    """Queue depth, task counts and mean wait/run seconds per stage."""
+    queues = {RUN_STAGE: run_queue(), POSTPROCESS_STAGE: postprocess_queue()}
+    stats = {'enabled': is_enabled()}
+    for stage in STAGES:
+        counters = metrics.get_many(*(f'pipeline.{stage}.{name}'
+                                      for name in ('tasks', 'items', 'busy_seconds', 'wait_seconds')))
+        tasks = counters[f'pipeline.{stage}.tasks'] or 0
+        stats[stage] = {
+            'queue': queues[stage],
+            'queue_depth': queue_depth(queues[stage]),
+            'tasks': tasks,
+            'items': counters[f'pipeline.{stage}.items'] or 0,
+            'mean_wait_seconds': round(counters[f'pipeline.{stage}.wait_seconds'] / tasks, 3) if tasks else None,
+            'mean_busy_seconds': round(counters[f'pipeline.{stage}.busy_seconds'] / tasks, 3) if tasks else None,
+        }
+    return stats
@@ -0,0 +1,138 @@
+"""
+Columnar reader for EnergyPlus ReadVars CSV output (eplusout.csv).
+
+A ReadVars CSV has a `Date/Time` column followed by one column per report
+variable; variables reported at a coarser frequency leave their cells empty
+on the other rows:
+
+    Date/Time,Site Outdoor Air Drybulb Temperature [C](TimeStep),... (Monthly)
+     01/01  00:15:00,-2.1,
+     ...
+     01/31  24:00:00,-1.8,1234.5
+
+The file is read in one pass: the timestamps are split off each line and the
+remaining numeric block is parsed by NumPy straight into a float64 matrix,
+with NaN for empty cells. There is no row cap, so sub-hourly annual files are
+read completely. Timestamps become a `datetime64[s]` index on a nominal year
+(EnergyPlus does not write years), with `24:00:00` rolling over to the next day.
+"""
+import re
+from typing import List, Optional
+
+import numpy as np
+
+
+_STAMP_RE = re.compile(r'^\s*(\d{1,2})/(\d{1,2})\s+(\d{1,2}):(\d{2}):(\d{2})')
+_DAYS_BEFORE_MONTH = np.array([0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334])
+
+
+class ReadVarsTable:
+    """ReadVars output as a time index plus a (rows x variables) float matrix."""
+
+    def __init__(self, columns: List[str], time_index: np.ndarray, values: np.ndarray):
+        self.columns = columns
+        self.time_index = time_index
+        self.values = values
+
+    def __len__(self):
+        return self.values.shape[0]
+
+    def column(self, name: str) -> np.ndarray:
+        return self.values[:, self.columns.index(name)]
+
+    def interval_seconds(self) -> Optional[int]:
+        """Most common spacing between consecutive timestamps (None if unknown)."""
+        stamps = self.time_index[~np.isnat(self.time_index)]
+        if len(stamps) < 2:
+            return None
+        steps = np.diff(stamps).astype('timedelta64[s]').astype(np.int64)
+        steps = steps[steps > 0]
+        if not len(steps):
+            return None
+        unique, counts = np.unique(steps, return_counts=True)
+        return int(unique[np.argmax(counts)])
+
+
+def parse_time_index(stamps: List[str], year: Optional[int] = None) -> np.ndarray:
+    """Convert ` MM/DD  hh:mm:ss` strings to datetime64[s]; unparseable stamps become NaT."""
+    matches = [_STAMP_RE.match(stamp) for stamp in stamps]
+    valid = np.array([match is not None for match in matches], dtype=bool)
+    parts = np.array([match.groups() if match else ('1', '1', '0', '0', '0') for match in matches],
+                     dtype=np.str_).reshape(len(stamps), 5).astype(np.int64)
+
+    month, day, hour, minute, second = parts.T
+    if year is None:
+        # A leap year only when the file contains 02/29
+        year = 2000 if np.any(valid & (month == 2) & (day == 29)) else 2001
+    leap_shift = (month > 2) if year % 4 == 0 else np.zeros(len(stamps), dtype=bool)
+    day_of_year = _DAYS_BEFORE_MONTH[np.clip(month - 1, 0, 11)] + day - 1 + leap_shift
+    offsets = day_of_year * 86400 + hour * 3600 + minute * 60 + second
+    index = np.datetime64(f'{year}-01-01T00:00:00', 's') + offsets.astype('timedelta64[s]')
+    index[~valid] = np.datetime64('NaT')
+    return index
+
+
+def _parse_block(rows: List[str], width: int) -> np.ndarray:
+    """Parse comma separated numeric rows into a (len(rows) x width) matrix, NaN for empty cells."""
+    flat = ','.join(rows)
+    # Empty cells: ",," (and a leading/trailing comma) -> nan
+    flat = re.sub(r',(?=,)', ',nan', flat)
+    if flat.startswith(','):
+        flat = 'nan' + flat
+    if flat.endswith(','):
+        flat += 'nan'
+    values = np.fromstring(flat, sep=',') if flat else np.empty(0)
+    if values.size == len(rows) * width:
+        return values.reshape(len(rows), width)
+
+    # Ragged rows (truncated lines): pad each row to the header width
+    matrix = np.full((len(rows), width), np.nan)
+    for i, row in enumerate(rows):
+        cells = row.split(',')[:width]
+        for j, cell in enumerate(cells):
+            try:
+                matrix[i, j] = float(cell)
+            except ValueError:
+                pass
+    return matrix
+
+
+def read_readvars_csv(csv_path) -> Optional[ReadVarsTable]:
+    """Read a ReadVars CSV; None if it has no header or no variable columns."""
+    with open(csv_path, 'r', encoding='utf-8', errors='replace') as f:
+        lines = f.read().splitlines()
+
+    # The header is the first row with at least two non-numeric labels
+    header_idx = None
+    for idx, line in enumerate(lines[:10]):
+        cells = [c.strip() for c in line.split(',')]
+        labels = [c for c in cells if c]
+        if len(labels) >= 2 and any(not _is_number(c) for c in labels):
+            header_idx = idx
+            break
+    if header_idx is None:
+        return None
+
+    columns = [c.strip() for c in lines[header_idx].split(',')][1:]
+    if not columns:
+        return None
+
+    stamps: List[str] = []
+    rows: List[str] = []
+    for line in lines[header_idx + 1:]:
+        if not line.strip():
+            continue
+        stamp, _, rest = line.partition(',')
+        stamps.append(stamp)
+        rows.append(rest.rstrip())
+
+    values = _parse_block(rows, len(columns)) if rows else np.empty((0, len(columns)))
+    return ReadVarsTable(columns, parse_time_index(stamps), values)
+
+
+def _is_number(text: str) -> bool:
+    try:
+        float(text)
+        return True
+    except ValueError:
+        return False
@@ -0,0 +1,208 @@
+"""
+Content-addressed cache of EnergyPlus results.
+
+Scenario studies re-run the same IDF + EPW + construction set many times. A
+cache entry is keyed by the SHA-256 of the exact staged `input.idf` bytes, the
+`weather.epw` bytes and the EnergyPlus version of the active runner, so any
+change in inputs or engine produces a new key.
+
+Layout (below `SIMULATION_RESULT_CACHE_DIR`, default MEDIA_ROOT/result_cache):
+
+    <key[:2]>/<key>/
+        meta.json       # key, size, created/accessed timestamps
+        results.json    # parsed results from process_file_results
+        output.*        # renamed EnergyPlus output files
+
+Entries are written to a temporary directory and renamed into place so a
+concurrent reader never sees a partial entry. The cache is bounded by
+`SIMULATION_RESULT_CACHE_MAX_BYTES`; least recently used entries are evicted
+after each store. Hits and misses are counted in `metrics`.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Optional
+
+from django.conf import settings
+
+from . import metrics
+from .staging import stage_file
+from .timeseries_store import json_default
+
+
+# Files in a simulation directory that are inputs or diagnostics, not outputs
+_EXCLUDED_FILES = {'input.idf', 'weather.epw', 'preflight_listing.txt', 'run_output.log', 'output.json'}
+
+HITS_COUNTER = 'result_cache.hits'
+MISSES_COUNTER = 'result_cache.misses'
+STORES_COUNTER = 'result_cache.stores'
+EVICTIONS_COUNTER = 'result_cache.evictions'
+
+
+def _file_digest(hasher, path: str) -> None:
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(chunk)
+
+
+def compute_cache_key(idf_path: str, weather_path: str, engine_version: str) -> str:
+    """Hash IDF bytes, EPW bytes and the EnergyPlus version into a cache key."""
+    hasher = hashlib.sha256()
+    hasher.update(b'idf\0')
+    _file_digest(hasher, idf_path)
+    hasher.update(b'\0epw\0')
+    _file_digest(hasher, weather_path)
+    hasher.update(b'\0engine\0')
+    hasher.update(str(engine_version).encode('utf-8'))
+    return hasher.hexdigest()
+
+
+class ResultCache:
+    """Filesystem-backed, size-bounded result cache shared by all workers."""
+
+    def __init__(self, root: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.root = str(root or getattr(settings, 'SIMULATION_RESULT_CACHE_DIR', None)
+                        or os.path.join(settings.MEDIA_ROOT, 'result_cache'))
+        self.max_bytes = int(max_bytes if max_bytes is not None
+                             else getattr(settings, 'SIMULATION_RESULT_CACHE_MAX_BYTES', 5 * 1024 ** 3))
+
+    def entry_dir(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    # ----------------------------------------------------------------- lookup
+    def lookup(self, key: str) -> Optional[str]:
+        """Return the entry directory for `key` (and count a hit), else None (a miss)."""
+        entry = self.entry_dir(key)
+        meta_path = os.path.join(entry, 'meta.json')
+        if os.path.exists(meta_path) and os.path.exists(os.path.join(entry, 'results.json')):
+            try:
+                # mtime of meta.json doubles as the LRU access time
+                os.utime(meta_path, None)
+            except OSError:
+                pass
+            metrics.incr(HITS_COUNTER)
+            return entry
+        metrics.incr(MISSES_COUNTER)
+        return None
+
+    def restore_outputs(self, key: str, simulation_dir: str) -> int:
+        """Stage cached output files into `simulation_dir`; return the number of files restored."""
+        entry = self.entry_dir(key)
+        restored = 0
+        for name in os.listdir(entry):
+            if name in ('meta.json', 'results.json'):
+                continue
+            stage_file(os.path.join(entry, name), os.path.join(simulation_dir, name))
+            restored += 1
+        return restored
+
+    def load_results(self, key: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(self.entry_dir(key), 'results.json'), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    # ------------------------------------------------------------------ store
+    def store(self, key: str, simulation_dir: str, results: dict) -> bool:
+        """Store the outputs in `simulation_dir` and parsed `results` under `key`."""
+        entry = self.entry_dir(key)
+        if os.path.exists(entry):
+            return False
+        parent = os.path.dirname(entry)
+        os.makedirs(parent, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=f'.{key[:8]}-', dir=parent)
+        try:
+            size = 0
+            for name in os.listdir(simulation_dir):
+                src = os.path.join(simulation_dir, name)
+                if name in _EXCLUDED_FILES or not os.path.isfile(src):
+                    continue
+                stage_file(src, os.path.join(tmp_dir, name))
+                size += os.path.getsize(src)
+
+            with open(os.path.join(tmp_dir, 'results.json'), 'w') as f:
+                json.dump(results, f, default=json_default)
+            size += os.path.getsize(os.path.join(tmp_dir, 'results.json'))
+
+            now = time.time()
+            with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+                json.dump({'key': key, 'size': size, 'created': now}, f)
+
+            try:
+                os.rename(tmp_dir, entry)
+            except OSError:
+                # Another worker stored the same key first
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                return False
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        metrics.incr(STORES_COUNTER)
+        self.evict()
+        return True
+
+    # --------------------------------------------------------------- eviction
+    def _entries(self):
+        """Yield (access_time, size, path) for every complete entry."""
+        if not os.path.isdir(self.root):
+            return
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if not entry.is_dir() or entry.name.startswith('.'):
+                    continue
+                meta_path = os.path.join(entry.path, 'meta.json')
+                try:
+                    with open(meta_path, 'r') as f:
+                        size = int(json.load(f).get('size', 0))
+                    yield os.path.getmtime(meta_path), size, entry.path
+                except (OSError, ValueError):
+                    continue
+
+    def evict(self) -> int:
+        """Remove least recently used entries until the cache fits `max_bytes`."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            evicted += 1
+        if evicted:
+            metrics.incr(EVICTIONS_COUNTER, evicted)
+        return evicted
+
+    def stats(self) -> dict:
+        entries = list(self._entries())
+        counters = metrics.get_many(HITS_COUNTER, MISSES_COUNTER, STORES_COUNTER, EVICTIONS_COUNTER)
+        hits, misses = counters[HITS_COUNTER], counters[MISSES_COUNTER]
+        return {
+            'enabled': is_enabled(),
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+            'hits': hits,
+            'misses': misses,
+            'stores': counters[STORES_COUNTER],
+            'evictions': counters[EVICTIONS_COUNTER],
+            'hit_rate': round(hits / (hits + misses), 4) if (hits + misses) else None,
+        }
+
+
+def is_enabled() -> bool:
+    return bool(getattr(settings, 'SIMULATION_RESULT_CACHE_ENABLED', True))
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Return the result cache, or None when caching is disabled."""
+    if not is_enabled():
+        return None
+    return ResultCache()
@@ -0,0 +1,140 @@
+"""
+COPY-based ingestion of simulation results on Postgres.
+
+Building-stock runs persist thousands of results with tens of zones and end
+uses each; even batched INSERTs spend most of their time parsing statements.
+This mode streams rows through psycopg2's `copy_expert` (`COPY ... FROM STDIN`)
+instead:
+
+1. results are copied into a temporary staging table (`ON COMMIT DROP`);
+2. one `INSERT ... SELECT ... ON CONFLICT DO UPDATE ... RETURNING` merges the
+   staging rows into `simulation_results` with the same upsert semantics as
+   result_persistence.py, and returns the ids the child rows need (base IDF
+   runs have their own conflict target, so a chunk holding them takes a
+   second statement);
+3. the child rows of updated results are deleted, then zones and end uses are
+   copied straight into their tables. Timeseries rows carry compressed blobs
+   and stay on bulk_create.
+
+`persist_results` uses this mode on Postgres for chunks of at least
+`SIMULATION_PERSIST_COPY_MIN_RESULTS` keyed results; other backends (SQLite
+in local development) keep the batched inserts.
+"""
+import io
+import json
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .result_persistence import BASE_CONFLICT, KEY_FIELDS, VARIANT_CONFLICT, batch_size, child_rows, result_fields
+
+STAGING_TABLE = 'simulation_results_staging'
+
+
+def min_results() -> int:
+    return int(getattr(settings, 'SIMULATION_PERSIST_COPY_MIN_RESULTS', 200) or 0)
+
+
+def is_available() -> bool:
+    """COPY needs Postgres through psycopg2 (and a threshold above zero)."""
+    return connection.vendor == 'postgresql' and min_results() > 0
+
+
+def _copy_value(field, value) -> str:
+    """`value` of `field` in COPY text format."""
+    if value is None:
+        return '\\N'
+    internal = field.get_internal_type()
+    if internal == 'JSONField':
+        value = json.dumps(value)
+    elif internal == 'BooleanField':
+        return 't' if value else 'f'
+    elif hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    else:
+        value = str(value)
+    return (value.replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def _copy_rows(cursor, table: str, fields: list, instances: list) -> None:
+    """Stream `instances` into `table` with COPY FROM STDIN."""
+    if not instances:
+        return
+    quote = connection.ops.quote_name
+    buffer = io.StringIO()
+    for instance in instances:
+        buffer.write('\t'.join(_copy_value(f, f.pre_save(instance, True)) for f in fields))
+        buffer.write('\n')
+    buffer.seek(0)
+    cursor.copy_expert(
+        f'COPY {quote(table)} ({", ".join(quote(f.column) for f in fields)}) FROM STDIN',
+        buffer, size=1 << 20
+    )
+
+
+def _insert_fields(model) -> list:
+    return [f for f in model._meta.concrete_fields if not f.primary_key]
+
+
+def write(results: List[dict], simulation_id, run_id: str, user_id: Optional[int]) -> int:
+    """Upsert keyed `results` and replace their child rows using COPY; returns rows written.
+
+    Every result must have an `idf_idx`: results without a run key cannot be
+    matched to the ids the merge returns.
+    """
+    from .models import SimulationResult, SimulationZone, SimulationEnergyUse, SimulationHourlyTimeseries
+
+    # A key repeated within the chunk would hit the same row twice in one merge: last one wins
+    keyed: Dict[tuple, dict] = {(r.get("idf_idx"), r.get("variant_idx")): r for r in results}
+    results = list(keyed.values())
+    parents = [SimulationResult(simulation_id=simulation_id, run_id=run_id, user_id=user_id, **result_fields(r))
+               for r in results]
+
+    quote = connection.ops.quote_name
+    fields = _insert_fields(SimulationResult)
+    columns = ', '.join(quote(f.column) for f in fields)
+    updates = ', '.join(f'{quote(f.column)} = excluded.{quote(f.column)}' for f in fields
+                        if f.name not in KEY_FIELDS and f.name != 'created_at')
+    target = quote(SimulationResult._meta.db_table)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # A surrounding transaction would keep an earlier chunk's staging table alive
+        cursor.execute(f'DROP TABLE IF EXISTS {STAGING_TABLE}')
+        cursor.execute(f'CREATE TEMP TABLE {STAGING_TABLE} ON COMMIT DROP AS '
+                       f'SELECT {columns} FROM {target} WITH NO DATA')
+        _copy_rows(cursor, STAGING_TABLE, fields, parents)
+
+        ids: Dict[tuple, int] = {}
+        variant_rows = sum(1 for p in parents if p.variant_idx is not None)
+        merges = [(variant_rows, 'variant_idx IS NOT NULL', VARIANT_CONFLICT),
+                  (len(parents) - variant_rows, 'variant_idx IS NULL', BASE_CONFLICT)]
+        for rows, condition, conflict in merges:
+            if not rows:
+                continue
+            cursor.execute(
+                f'INSERT INTO {target} ({columns}) SELECT {columns} FROM {STAGING_TABLE} WHERE {condition} '
+                f'ON CONFLICT {conflict} DO UPDATE SET {updates} RETURNING id, idf_idx, variant_idx'
+            )
+            ids.update(((idf, variant), pk) for pk, idf, variant in cursor.fetchall())
+        for parent in parents:
+            parent.pk = ids[(parent.idf_idx, parent.variant_idx)]
+
+        # Rows of an updated result are replaced, not merged
+        saved_ids = [p.pk for p in parents]
+        for model in (SimulationZone, SimulationEnergyUse, SimulationHourlyTimeseries):
+            cursor.execute(f'DELETE FROM {quote(model._meta.db_table)} WHERE simulation_result_id = ANY(%s)',
+                           [saved_ids])
+
+        zones, energy_uses, timeseries = [], [], []
+        for result, parent in zip(results, parents):
+            z, e, t = child_rows(result, parent)
+            zones += z
+            energy_uses += e
+            timeseries += t
+        _copy_rows(cursor, SimulationZone._meta.db_table, _insert_fields(SimulationZone), zones)
+        _copy_rows(cursor, SimulationEnergyUse._meta.db_table, _insert_fields(SimulationEnergyUse), energy_uses)
+        # Timeseries rows carry large blobs: keep their INSERTs small
+        SimulationHourlyTimeseries.objects.bulk_create(timeseries, batch_size=max(batch_size() // 50, 1))
+    return len(parents) + len(zones) + len(energy_uses) + len(timeseries)
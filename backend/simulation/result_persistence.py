@@ -0,0 +1,295 @@
+"""
+Bulk persistence of parsed simulation results.
+
+Saving a result used to take one INSERT for the `SimulationResult`, one per
+zone, one per end use and one for the timeseries, each in autocommit; a
+500-variant batch of a 40-zone model meant tens of thousands of single-row
+statements. `persist_results` builds all model instances for a chunk of
+results first and writes each table with `bulk_create` (in batches of
+`SIMULATION_PERSIST_BATCH_SIZE` rows) inside one transaction.
+
+Results are upserted on their run key (simulation_id, idf_idx, variant_idx):
+a retried task or a chord callback that runs twice updates the existing row
+and replaces its zones, end uses and timeseries instead of adding duplicates.
+The upsert is one `INSERT ... ON CONFLICT ... DO UPDATE` per batch, which
+Postgres and SQLite (>= 3.24) both support; it is written as SQL because
+`bulk_create(update_conflicts=...)` needs Django 4.1 and cannot target the
+partial index that keys base IDF runs (variant_idx NULL). Results without an
+idf_idx have no key and are inserted as before.
+
+Large chunks on Postgres are streamed with COPY instead (result_copy.py).
+Rows written per second are returned with each summary and accumulated per
+mode in `metrics` (`ingest_stats`, shown on the system resources endpoint).
+
+If the chunk's transaction fails, the results are retried one transaction per
+result so a single bad payload only loses itself. The summary reports saved
+and failed results, rows written and elapsed seconds.
+"""
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from . import metrics
+from .timeseries_store import timeseries_row
+
+
+INSERT_MODE = 'insert'
+COPY_MODE = 'copy'
+INGEST_MODES = (INSERT_MODE, COPY_MODE)
+
+
+def batch_size() -> int:
+    return max(int(getattr(settings, 'SIMULATION_PERSIST_BATCH_SIZE', 500) or 500), 1)
+
+
+def result_fields(result: dict) -> dict:
+    """SimulationResult field values for a parsed result payload."""
+    return {
+        'file_name': result.get("fileName") or result.get("originalFileName") or "unknown.idf",
+        'building_name': result.get("building", ""),
+        'total_energy_use': result.get("totalEnergyUse"),
+        'heating_demand': result.get("heatingDemand"),
+        'cooling_demand': result.get("coolingDemand"),
+        'lighting_demand': result.get("lightingDemand"),
+        'equipment_demand': result.get("equipmentDemand"),
+        'gwp_total': result.get("gwp_total"),
+        'cost_total': result.get("cost_total"),
+        'total_area': result.get("totalArea"),
+        'run_time': result.get("runTime"),
+        'status': result.get("status", "success"),
+        'error_message': result.get("error", ""),
+        # Timeseries are stored compactly in SimulationHourlyTimeseries, not in raw_json
+        'raw_json': {k: v for k, v in result.items() if k != 'hourly_timeseries'},
+        'variant_idx': result.get("variant_idx"),
+        'idf_idx': result.get("idf_idx"),
+        'construction_set_data': result.get("construction_set"),
+    }
+
+
+def child_rows(result: dict, simulation_result) -> Tuple[list, list, list]:
+    """Unsaved zone, end use and timeseries rows of one result."""
+    from .models import SimulationZone, SimulationEnergyUse
+
+    zones = [
+        SimulationZone(
+            simulation_result=simulation_result,
+            zone_name=zone_data.get("name", ""),
+            area=zone_data.get("area"),
+            volume=zone_data.get("volume")
+        )
+        for zone_data in result.get("zones", []) or []
+    ]
+    energy_uses = [
+        SimulationEnergyUse(
+            simulation_result=simulation_result,
+            end_use=end_use,
+            electricity=values.get("electricity", 0.0),
+            district_heating=values.get("district_heating", 0.0),
+            total=values.get("total", 0.0)
+        )
+        for end_use, values in (result.get("energy_use", {}) or {}).items()
+        if isinstance(values, dict)
+    ]
+    timeseries = []
+    hourly_payload = result.get('hourly_timeseries')
+    if hourly_payload and isinstance(hourly_payload, dict) and hourly_payload.get('is_hourly'):
+        timeseries.append(timeseries_row(simulation_result, hourly_payload))
+    return zones, energy_uses, timeseries
+
+
+# Columns identifying a run; never changed by the upsert
+KEY_FIELDS = ('simulation_id', 'idf_idx', 'variant_idx')
+# Conflict targets of the two unique constraints on SimulationResult
+VARIANT_CONFLICT = '(simulation_id, idf_idx, variant_idx)'
+BASE_CONFLICT = '(simulation_id, idf_idx) WHERE variant_idx IS NULL'
+
+
+def run_key(result: dict) -> tuple:
+    return result.get("idf_idx"), result.get("variant_idx")
+
+
+def _upsert(parents: list, conflict_target: str, size: int) -> None:
+    """INSERT ... ON CONFLICT DO UPDATE for unsaved SimulationResults sharing one conflict target."""
+    from .models import SimulationResult
+
+    meta = SimulationResult._meta
+    fields = [f for f in meta.concrete_fields if not f.primary_key]
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(f.column) for f in fields)
+    updates = ', '.join(f'{quote(f.column)} = excluded.{quote(f.column)}' for f in fields
+                        if f.name not in KEY_FIELDS and f.name != 'created_at')
+    row_placeholder = '(' + ', '.join(['%s'] * len(fields)) + ')'
+    # Stay under the backend's limit on query parameters
+    size = max(min(size, connection.ops.bulk_batch_size(fields, parents)), 1)
+
+    with connection.cursor() as cursor:
+        for i in range(0, len(parents), size):
+            batch = parents[i:i + size]
+            params = []
+            for parent in batch:
+                params.extend(f.get_db_prep_save(f.pre_save(parent, True), connection) for f in fields)
+            cursor.execute(
+                f'INSERT INTO {quote(meta.db_table)} ({columns}) VALUES '
+                f'{", ".join([row_placeholder] * len(batch))} '
+                f'ON CONFLICT {conflict_target} DO UPDATE SET {updates}',
+                params
+            )
+
+
+def _key_ids(simulation_id, keys: List[tuple]) -> Dict[tuple, int]:
+    """Primary keys of the stored results of `simulation_id` with the given (idf_idx, variant_idx) keys."""
+    from .models import SimulationResult
+
+    ids = {}
+    variant_keys = [k for k in keys if k[1] is not None]
+    base_idfs = [k[0] for k in keys if k[1] is None]
+    rows = SimulationResult.objects.filter(simulation_id=simulation_id)
+    if variant_keys:
+        ids.update(((idf, variant), pk) for pk, idf, variant in rows.filter(
+            idf_idx__in={k[0] for k in variant_keys}, variant_idx__in={k[1] for k in variant_keys}
+        ).values_list('id', 'idf_idx', 'variant_idx'))
+    if base_idfs:
+        ids.update(((idf, None), pk) for pk, idf in rows.filter(
+            idf_idx__in=base_idfs, variant_idx__isnull=True
+        ).values_list('id', 'idf_idx'))
+    return ids
+
+
+def _write(results: List[dict], simulation_id, run_id: str, user_id: Optional[int]) -> int:
+    """Upsert `results` and replace their child rows in one transaction; returns rows written."""
+    from .models import SimulationResult, SimulationZone, SimulationEnergyUse, SimulationHourlyTimeseries
+
+    size = batch_size()
+    # A key repeated within the chunk would hit the same row twice in one statement: last one wins
+    keyed = {}
+    unkeyed = []
+    for result in results:
+        if result.get("idf_idx") is None:
+            unkeyed.append(result)
+        else:
+            keyed[run_key(result)] = result
+    results = list(keyed.values()) + unkeyed
+    parents = [SimulationResult(simulation_id=simulation_id, run_id=run_id, user_id=user_id, **result_fields(r))
+               for r in results]
+    keyed_parents = parents[:len(keyed)]
+
+    with transaction.atomic():
+        variant_parents = [p for p in keyed_parents if p.variant_idx is not None]
+        base_parents = [p for p in keyed_parents if p.variant_idx is None]
+        if variant_parents:
+            _upsert(variant_parents, VARIANT_CONFLICT, size)
+        if base_parents:
+            _upsert(base_parents, BASE_CONFLICT, size)
+        ids = _key_ids(simulation_id, list(keyed))
+        for parent in keyed_parents:
+            parent.pk = ids[(parent.idf_idx, parent.variant_idx)]
+        # The child rows need the new primary keys: bulk_create only sets them where the
+        # backend returns rows from bulk inserts (Postgres on Django 3.2)
+        if connection.features.can_return_rows_from_bulk_insert:
+            SimulationResult.objects.bulk_create(parents[len(keyed):], batch_size=size)
+        else:
+            for parent in parents[len(keyed):]:
+                parent.save(force_insert=True)
+
+        # Rows of an updated result are replaced, not merged
+        updated = [p.pk for p in keyed_parents]
+        if updated:
+            SimulationZone.objects.filter(simulation_result_id__in=updated).delete()
+            SimulationEnergyUse.objects.filter(simulation_result_id__in=updated).delete()
+            SimulationHourlyTimeseries.objects.filter(simulation_result_id__in=updated).delete()
+
+        zones, energy_uses, timeseries = [], [], []
+        for result, parent in zip(results, parents):
+            z, e, t = child_rows(result, parent)
+            zones += z
+            energy_uses += e
+            timeseries += t
+        SimulationZone.objects.bulk_create(zones, batch_size=size)
+        SimulationEnergyUse.objects.bulk_create(energy_uses, batch_size=size)
+        # Timeseries rows carry large blobs: keep their INSERTs small
+        SimulationHourlyTimeseries.objects.bulk_create(timeseries, batch_size=max(size // 50, 1))
+    return len(parents) + len(zones) + len(energy_uses) + len(timeseries)
+
+
+def _write_chunk(results: List[dict], simulation_id, run_id: str, user_id: Optional[int]) -> Tuple[int, str]:
+    """Write a chunk with COPY when it qualifies (see result_copy.py), else batched inserts; returns (rows, mode)."""
+    from . import result_copy
+
+    keyed = [r for r in results if r.get("idf_idx") is not None]
+    if not result_copy.is_available() or len(keyed) < result_copy.min_results():
+        return _write(results, simulation_id, run_id, user_id), INSERT_MODE
+    unkeyed = [r for r in results if r.get("idf_idx") is None]
+    with transaction.atomic():
+        rows = result_copy.write(keyed, simulation_id, run_id, user_id)
+        if unkeyed:
+            rows += _write(unkeyed, simulation_id, run_id, user_id)
+    return rows, COPY_MODE
+
+
+def record_ingest(mode: str, rows: int, seconds: float) -> None:
+    metrics.incr(f'ingest.{mode}.chunks')
+    metrics.incr(f'ingest.{mode}.rows', rows)
+    metrics.incr(f'ingest.{mode}.seconds', round(seconds, 4))
+
+
+def ingest_stats() -> Dict[str, dict]:
+    """Chunks, rows, seconds and rows/s written per ingestion mode since the counters were reset."""
+    stats = {}
+    for mode in INGEST_MODES:
+        counters = metrics.get_many(*(f'ingest.{mode}.{name}' for name in ('chunks', 'rows', 'seconds')))
+        rows = counters[f'ingest.{mode}.rows'] or 0
+        seconds = counters[f'ingest.{mode}.seconds'] or 0
+        stats[mode] = {
+            'chunks': counters[f'ingest.{mode}.chunks'] or 0,
+            'rows': rows,
+            'seconds': round(seconds, 3),
+            'rows_per_second': round(rows / seconds, 1) if seconds else None,
+        }
+    return stats
+
+
+def persist_results(results: Iterable, simulation_id, run_id: str, user_id: Optional[int] = None) -> dict:
+    """Save parsed result payloads.
+
+    Returns {'saved', 'failed', 'errors', 'rows_written', 'elapsed_seconds',
+    'mode', 'rows_per_second'}; `mode` is 'copy' or 'insert'.
+    """
+    started = time.perf_counter()
+    summary = {'saved': 0, 'failed': 0, 'errors': [], 'rows_written': 0, 'elapsed_seconds': 0.0,
+               'mode': INSERT_MODE, 'rows_per_second': None}
+
+    valid = []
+    for idx, result in enumerate(results):
+        if isinstance(result, dict):
+            valid.append(result)
+        else:
+            summary['failed'] += 1
+            summary['errors'].append(f"Result {idx} has unexpected type {type(result).__name__}")
+
+    if valid:
+        try:
+            rows, summary['mode'] = _write_chunk(valid, simulation_id, run_id, user_id)
+            summary['rows_written'] += rows
+            summary['saved'] += len(valid)
+        except Exception as e:
+            print(f"Bulk save of {len(valid)} result(s) failed, saving one by one: {e}")
+            for result in valid:
+                try:
+                    summary['rows_written'] += _write([result], simulation_id, run_id, user_id)
+                    summary['saved'] += 1
+                except Exception as row_err:
+                    summary['failed'] += 1
+                    name = result.get("fileName") or result.get("originalFileName") or "unknown.idf"
+                    summary['errors'].append(f"Result {name}: {row_err}")
+                    print(f"Error saving result to database: {row_err}")
+
+    elapsed = time.perf_counter() - started
+    summary['elapsed_seconds'] = round(elapsed, 4)
+    if summary['rows_written'] and elapsed > 0:
+        summary['rows_per_second'] = round(summary['rows_written'] / elapsed, 1)
+        record_ingest(summary['mode'], summary['rows_written'], elapsed)
+    print(f"Saved {summary['saved']} simulation result(s) ({summary['rows_written']} rows, {summary['mode']}) "
+          f"in {summary['elapsed_seconds']:.3f}s ({summary['rows_per_second'] or 0} rows/s)")
+    return summary
@@ -0,0 +1,124 @@
+"""
+Output retention profiles for simulation run directories.
+
+EnergyPlus writes far more files than the pipeline consumes. A retention
+profile (selected per simulation via `run_options['output_retention']`,
+default `SIMULATION_OUTPUT_RETENTION`) decides what is kept once a run has
+been parsed:
+
+- `minimal`: what the pipeline and result views read (HTML tables, ReadVars
+  CSV, error file, logs). Unneeded outputs, including the SQLite file that
+  would duplicate every report variable, are also switched off in the IDF
+  through `OutputControl:Files` so they are never written.
+- `analysis`: `minimal` plus the raw ESO/MTR/EIO and sizing CSVs for offline
+  analysis.
+- `full`: keep everything EnergyPlus writes.
+"""
+import os
+from typing import Dict, Optional
+
+from django.conf import settings
+
+
+DEFAULT_PROFILE = 'full'
+
+_MINIMAL_FILES = {
+    'input.idf', 'output.htm', 'output.html', 'output.csv', 'output.sql', 'output.err',
+    'output.json', 'run_output.log', 'preflight_listing.txt',
+}
+
+RETENTION_PROFILES: Dict[str, Optional[set]] = {
+    'minimal': _MINIMAL_FILES,
+    'analysis': _MINIMAL_FILES | {
+        'weather.epw', 'output.eso', 'output.mtr', 'output.mtd', 'output.rdd', 'eplusout.eio',
+        'eplusmtr.csv', 'output_zones.csv', 'output_system.csv',
+    },
+    'full': None,  # keep everything
+}
+
+# Suppress outputs nobody reads. Only the first eight fields are set: they have
+# been stable since EnergyPlus 9.4 and the remaining fields keep their defaults.
+# ESO stays on because timeseries are parsed from it; summaries come from the
+# HTML tables, so SQLite is off.
+MINIMAL_OUTPUT_CONTROL = """
+OutputControl:Files,
+    ,                        !- Output CSV
+    No,                      !- Output MTR
+    Yes,                     !- Output ESO
+    No,                      !- Output EIO
+    Yes,                     !- Output Tabular
+    No,                      !- Output SQLite
+    No,                      !- Output JSON
+    No;                      !- Output AUDIT
+"""
+
+
+def resolve_profile(run_options: Optional[dict] = None) -> str:
+    """Return the retention profile for a simulation's run options."""
+    profile = (run_options or {}).get('output_retention') or getattr(
+        settings, 'SIMULATION_OUTPUT_RETENTION', DEFAULT_PROFILE)
+    profile = str(profile).lower()
+    return profile if profile in RETENTION_PROFILES else DEFAULT_PROFILE
+
+
+def apply_output_controls(idf_path: str, profile: str) -> bool:
+    """Append OutputControl:Files to the staged IDF for `minimal` runs.
+
+    The staged input may be a hardlink to the uploaded/generated IDF, so the
+    file is rewritten through a temporary file instead of edited in place.
+    IDFs that already define OutputControl:Files are left alone.
+    """
+    if profile != 'minimal':
+        return False
+    with open(idf_path, 'r', encoding='utf-8', errors='replace') as f:
+        content = f.read()
+    if 'outputcontrol:files' in content.lower():
+        return False
+    tmp_path = idf_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+        if not content.endswith('\n'):
+            f.write('\n')
+        f.write(MINIMAL_OUTPUT_CONTROL)
+    os.replace(tmp_path, idf_path)
+    return True
+
+
+# Staged inputs are not run output (and are usually hardlinks to the uploads)
+_INPUT_FILES = ('input.idf', 'weather.epw')
+
+
+def directory_bytes(directory: str) -> int:
+    """Bytes of run output in `directory`, counting hardlinked inodes once."""
+    seen = set()
+    total = 0
+    for entry in os.scandir(directory):
+        if entry.name in _INPUT_FILES or not entry.is_file(follow_symlinks=False):
+            continue
+        st = entry.stat(follow_symlinks=False)
+        if (st.st_dev, st.st_ino) in seen:
+            continue
+        seen.add((st.st_dev, st.st_ino))
+        total += st.st_size
+    return total
+
+
+def apply_output_retention(simulation_dir: str, profile: str) -> dict:
+    """Delete files not kept by `profile`; return bytes written/retained for the run."""
+    keep = RETENTION_PROFILES.get(profile)
+    bytes_written = directory_bytes(simulation_dir)
+    removed = []
+    if keep is not None:
+        for entry in os.scandir(simulation_dir):
+            if entry.is_file(follow_symlinks=False) and entry.name not in keep:
+                try:
+                    os.unlink(entry.path)
+                    removed.append(entry.name)
+                except OSError as e:
+                    print(f"Warning: failed to remove {entry.path}: {e}")
+    return {
+        'profile': profile,
+        'bytes_written': bytes_written,
+        'bytes_retained': directory_bytes(simulation_dir) if removed else bytes_written,
+        'removed': sorted(removed),
+    }
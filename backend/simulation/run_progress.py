@@ -0,0 +1,184 @@
+"""
+Streaming execution and intra-run progress for EnergyPlus.
+
+`stream_process` runs a command while reading stdout/stderr line by line,
+so runners can report progress while EnergyPlus is still simulating and
+abort runs that stop producing output long before the hard timeout.
+
+`RunProgressTracker` turns EnergyPlus console lines into a completion
+fraction. EnergyPlus prints, in order:
+
+    Initializing Simulation
+    Performing Zone Sizing Simulation / Warming up {n}
+    Starting Simulation at 01/01/2006 for RUN PERIOD 1
+    Continuing Simulation at 01/21/2006 for RUN PERIOD 1
+    ...
+    Writing tabular output file results using HTML format.
+    EnergyPlus Completed Successfully.
+
+The simulated date is placed inside the IDF's RunPeriod, which gives the
+fraction of the run period that is done. Date lines for other environments
+(design days run during sizing) are ignored.
+"""
+import datetime
+import re
+import subprocess
+import threading
+import time
+from typing import Callable, List, Optional
+
+
+class SimulationStalled(subprocess.TimeoutExpired):
+    """Raised when a run produces no output for longer than the stall timeout."""
+
+    def __str__(self):
+        return f"Command '{self.cmd}' produced no output for {self.timeout} seconds"
+
+
+def stream_process(command: List[str], cwd: str, timeout: float,
+                   on_line: Optional[Callable[[str], None]] = None,
+                   stall_timeout: Optional[float] = None,
+                   on_kill: Optional[Callable[[], None]] = None) -> subprocess.CompletedProcess:
+    """Run `command`, feeding each stdout line to `on_line` as it arrives.
+
+    Raises subprocess.TimeoutExpired after `timeout` seconds and
+    SimulationStalled when neither stdout nor stderr produced a line for
+    `stall_timeout` seconds. `on_kill` runs after the local process is killed
+    (e.g. to remove a container the docker client was attached to).
+    """
+    process = subprocess.Popen(command, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               text=True, bufsize=1)
+    stdout_lines: List[str] = []
+    stderr_lines: List[str] = []
+    last_activity = [time.monotonic()]
+
+    def _read(stream, sink, callback):
+        for line in iter(stream.readline, ''):
+            sink.append(line)
+            last_activity[0] = time.monotonic()
+            if callback is not None:
+                try:
+                    callback(line.rstrip('\r\n'))
+                except Exception as e:
+                    print(f"Warning: progress callback failed: {e}")
+        stream.close()
+
+    readers = [
+        threading.Thread(target=_read, args=(process.stdout, stdout_lines, on_line), daemon=True),
+        threading.Thread(target=_read, args=(process.stderr, stderr_lines, None), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    started = time.monotonic()
+    error = None
+    while process.poll() is None:
+        now = time.monotonic()
+        if now - started > timeout:
+            error = subprocess.TimeoutExpired(command, timeout)
+        elif stall_timeout and now - last_activity[0] > stall_timeout:
+            error = SimulationStalled(command, stall_timeout)
+        if error is not None:
+            process.kill()
+            process.wait()
+            if on_kill is not None:
+                on_kill()
+            break
+        time.sleep(0.2)
+
+    for reader in readers:
+        reader.join(timeout=5)
+    stdout, stderr = ''.join(stdout_lines), ''.join(stderr_lines)
+    if error is not None:
+        error.output, error.stderr = stdout, stderr
+        raise error
+    return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
+
+
+DEFAULT_RUN_PERIOD_NAME = 'RUN PERIOD 1'
+_DATE_RE = re.compile(r'(?:Starting|Continuing) Simulation at (\d{1,2})/(\d{1,2})\S* for (.+)$')
+
+
+def read_run_period(idf_path: str):
+    """Return (name, (begin_month, begin_day), (end_month, end_day)) of the first RunPeriod."""
+    try:
+        with open(idf_path, 'r', encoding='utf-8', errors='replace') as f:
+            content = f.read()
+    except OSError:
+        return None
+    match = re.search(r'(?im)^\s*RunPeriod\s*,(.*?);', content, re.S)
+    if not match:
+        return None
+    body = '\n'.join(re.sub(r'!.*', '', line) for line in match.group(1).split('\n'))
+    # Name, Begin Month, Begin Day of Month, Begin Year, End Month, End Day of Month, ...
+    values = [v.strip() for v in body.split(',')]
+    try:
+        return values[0], (int(values[1]), int(values[2])), (int(values[4]), int(values[5]))
+    except (IndexError, ValueError):
+        return None
+
+
+def day_of_year(month: int, day: int) -> int:
+    # A leap year keeps 02/29 valid; the one-day skew does not matter for progress
+    return datetime.date(2000, month, day).timetuple().tm_yday
+
+
+class RunProgressTracker:
+    """Track the completion fraction of one EnergyPlus run from its console output."""
+
+    # Fraction reached when each phase starts; the run period fills 0.10 - 0.95
+    PHASES = [
+        ('Initializing Simulation', 'initializing', 0.02),
+        ('Sizing Simulation', 'sizing', 0.04),
+        ('Warming up', 'warmup', 0.06),
+        ('Writing tabular output', 'reporting', 0.96),
+        ('Writing final SQL reports', 'reporting', 0.97),
+        ('EnergyPlus Completed Successfully', 'completed', 1.0),
+    ]
+    SIMULATION_START, SIMULATION_END = 0.10, 0.95
+
+    def __init__(self, idf_path: Optional[str] = None):
+        period = read_run_period(idf_path) if idf_path else None
+        # EnergyPlus reports an unnamed run period as "RUN PERIOD 1"
+        self.run_period = (period[0] or DEFAULT_RUN_PERIOD_NAME).upper() if period else None
+        try:
+            self.begin = day_of_year(*period[1]) if period else 1
+            self.end = day_of_year(*period[2]) if period else 366
+        except ValueError:
+            self.begin, self.end = 1, 366
+        self.phase = 'starting'
+        self.fraction = 0.0
+        self.date = None
+
+    def _period_fraction(self, month: int, day: int) -> float:
+        doy = day_of_year(month, day)
+        length = (self.end - self.begin) % 366 or 366
+        done = (doy - self.begin) % 366
+        return min(max(done / length, 0.0), 1.0)
+
+    def feed(self, line: str) -> Optional[dict]:
+        """Consume one stdout line; return the new state if it advanced, else None."""
+        match = _DATE_RE.search(line)
+        if match and self.run_period and match.group(3).strip().upper() != self.run_period:
+            return None
+        if match:
+            month, day = int(match.group(1)), int(match.group(2))
+            try:
+                period = self._period_fraction(month, day)
+            except ValueError:
+                return None
+            phase, fraction = 'simulating', self.SIMULATION_START + period * (self.SIMULATION_END - self.SIMULATION_START)
+            if fraction > self.fraction:
+                self.date = f'{month:02d}/{day:02d}'
+        else:
+            for marker, phase, fraction in self.PHASES:
+                if marker in line:
+                    break
+            else:
+                return None
+
+        if fraction <= self.fraction:
+            return None
+        self.phase = phase
+        self.fraction = fraction
+        return {'phase': self.phase, 'fraction': round(self.fraction, 3), 'date': self.date}
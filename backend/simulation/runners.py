@@ -0,0 +1,422 @@
+"""
+Pluggable EnergyPlus runner backends.
+
+`EnergyPlusSimulator.run_single_simulation` stages `input.idf` and
+`weather.epw` into a per-run directory and then hands execution to a runner.
+Every runner writes EnergyPlus' standard `eplusout.*` / `eplustbl.htm` files
+into that directory and returns a `RunOutcome`; renaming and parsing stay in
+the simulator.
+
+Available runners (selected with the `SIMULATION_RUNNER` setting):
+
+- `docker`: the `nrel/energyplus` image, one-shot `docker run --rm` or the warm
+  container pool from `container_pool.py` when enabled.
+- `native`: an `energyplus` binary installed in the worker image. No container
+  start and no bind-mount path translation.
+- `fake`: emits canned output files without running EnergyPlus, so the Celery
+  pipeline can be load-tested on machines without Docker.
+"""
+import hashlib
+import os
+import re
+import subprocess
+import time
+from dataclasses import dataclass, field
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+
+from .container_pool import get_container_pool, host_path_for, ContainerPoolError
+from .host_slots import docker_resource_args
+from .run_progress import stream_process, read_run_period
+
+
+@dataclass
+class RunOutcome:
+    """Result of one EnergyPlus invocation."""
+    command: List[str]
+    returncode: int
+    stdout: str = ''
+    stderr: str = ''
+    runner: str = ''
+    extra: Dict[str, object] = field(default_factory=dict)
+
+
+class SimulationRunner:
+    """Base class: run EnergyPlus on `<simulation_dir>/input.idf` + `weather.epw`."""
+    name = 'base'
+
+    def run(self, simulation_dir: str, timeout: float, on_line: Optional[Callable[[str], None]] = None,
+            stall_timeout: Optional[float] = None, readvars: bool = True) -> RunOutcome:
+        """Run EnergyPlus, passing each stdout line to `on_line` while it runs.
+
+        `readvars=False` skips the ReadVarsESO post-processing (no eplusout.csv).
+        Raises subprocess.TimeoutExpired on timeout and SimulationStalled when
+        no output arrives for `stall_timeout` seconds.
+        """
+        raise NotImplementedError
+
+    def availability(self) -> dict:
+        """Describe whether this runner can execute simulations on this host."""
+        return {'runner': self.name, 'status': 'Unknown', 'exists': False}
+
+    def engine_version(self) -> str:
+        """Identify the EnergyPlus build this runner executes (part of result cache keys)."""
+        return self.name
+
+    @staticmethod
+    def energyplus_args(input_dir: str, output_dir: str, readvars: bool = True) -> List[str]:
+        return [
+            '--weather', f'{input_dir}/weather.epw',
+            '--output-directory', output_dir,
+            '--expandobjects',
+        ] + (['--readvars'] if readvars else []) + [
+            f'{input_dir}/input.idf'
+        ]
+
+
+class DockerRunner(SimulationRunner):
+    """Run EnergyPlus in the `nrel/energyplus` Docker image."""
+    name = 'docker'
+
+    def __init__(self, image: Optional[str] = None, platform: Optional[str] = None):
+        self.image = image or getattr(settings, 'SIMULATION_DOCKER_IMAGE', 'nrel/energyplus:23.2.0')
+        # Honor an environment variable to request a specific container platform
+        self.platform = platform or os.environ.get('EPLUS_DOCKER_PLATFORM', 'linux/amd64')
+
+    def run(self, simulation_dir: str, timeout: float, on_line: Optional[Callable[[str], None]] = None,
+            stall_timeout: Optional[float] = None, readvars: bool = True) -> RunOutcome:
+        # Prefer a warm pooled container (docker exec) when pooling is enabled;
+        # fall back to a one-shot `docker run --rm` on any pool failure.
+        pool = get_container_pool()
+        if pool is not None:
+            container_dir = pool.container_path(simulation_dir)
+            if container_dir is not None:
+                try:
+                    process = pool.run(self.energyplus_args(container_dir, container_dir, readvars), simulation_dir,
+                                       timeout=timeout, on_line=on_line, stall_timeout=stall_timeout)
+                    return RunOutcome(list(process.args), process.returncode, process.stdout, process.stderr, self.name,
+                                      {'pooled': True})
+                except ContainerPoolError as pool_err:
+                    print(f"Container pool unavailable, falling back to docker run: {pool_err}")
+
+        # If the backend runs inside Docker and invokes the host Docker daemon, the
+        # bind-mount source must be the host path (see HOST_MEDIA_ROOT).
+        mount_source = host_path_for(simulation_dir)
+        # Named so the container can be removed if the run times out or stalls;
+        # killing the docker client alone leaves the container running.
+        container_name = f'epsm-eplus-run-{uuid.uuid4().hex[:12]}'
+        command = [
+            'docker', 'run', '--rm', '--name', container_name,
+            '-v', f'{mount_source}:/var/simdata/energyplus',
+            '--platform', self.platform,
+        ] + docker_resource_args() + [
+            self.image,
+            'energyplus',
+        ] + self.energyplus_args('/var/simdata/energyplus', '/var/simdata/energyplus', readvars)
+
+        def _remove_container():
+            subprocess.run(['docker', 'rm', '-f', container_name], capture_output=True, text=True, timeout=30)
+
+        process = stream_process(command, cwd=simulation_dir, timeout=timeout, on_line=on_line,
+                                 stall_timeout=stall_timeout, on_kill=_remove_container)
+        return RunOutcome(command, process.returncode, process.stdout, process.stderr, self.name)
+
+    def engine_version(self) -> str:
+        # Image tags are versioned (nrel/energyplus:23.2.0)
+        return f'docker:{self.image}'
+
+    def availability(self) -> dict:
+        info = {'runner': self.name, 'docker_available': False, 'container_image': self.image, 'exists': False}
+        try:
+            result = subprocess.run(['docker', '--version'], capture_output=True, text=True, timeout=10)
+            if result.returncode != 0:
+                info['status'] = 'Docker not available'
+                return info
+            info['docker_available'] = True
+            result = subprocess.run(['docker', 'images', self.image, '--format', '{{.Repository}}:{{.Tag}}'],
+                                    capture_output=True, text=True, timeout=10)
+            if self.image not in result.stdout:
+                info['status'] = 'Container image not found locally'
+                return info
+            test_result = subprocess.run(['docker', 'run', '--rm', self.image, 'energyplus', '--version'],
+                                         capture_output=True, text=True, timeout=30)
+            if test_result.returncode == 0 and 'EnergyPlus' in test_result.stdout:
+                info.update({
+                    'status': 'Available and working',
+                    'exists': True,
+                    'version': test_result.stdout.strip().split('\n')[-1] if test_result.stdout else 'Unknown'
+                })
+            else:
+                info['status'] = 'Image available but test failed'
+        except (subprocess.TimeoutExpired, FileNotFoundError, subprocess.CalledProcessError):
+            info['status'] = 'Docker not available or accessible'
+        return info
+
+
+# `energyplus --version` output per executable, resolved once per process
+_native_versions: Dict[str, str] = {}
+
+
+class NativeRunner(SimulationRunner):
+    """Run an `energyplus` binary bundled in the worker image."""
+    name = 'native'
+
+    def __init__(self, executable: Optional[str] = None):
+        self.executable = executable or getattr(settings, 'ENERGYPLUS_EXECUTABLE', 'energyplus')
+
+    def run(self, simulation_dir: str, timeout: float, on_line: Optional[Callable[[str], None]] = None,
+            stall_timeout: Optional[float] = None, readvars: bool = True) -> RunOutcome:
+        simulation_dir = str(simulation_dir)
+        command = [self.executable] + self.energyplus_args(simulation_dir, simulation_dir, readvars)
+        process = stream_process(command, cwd=simulation_dir, timeout=timeout, on_line=on_line,
+                                 stall_timeout=stall_timeout)
+        return RunOutcome(command, process.returncode, process.stdout, process.stderr, self.name)
+
+    def engine_version(self) -> str:
+        if self.executable not in _native_versions:
+            try:
+                result = subprocess.run([self.executable, '--version'], capture_output=True, text=True, timeout=30)
+                version = result.stdout.strip().split('\n')[-1] if result.returncode == 0 else ''
+            except (subprocess.TimeoutExpired, OSError):
+                version = ''
+            _native_versions[self.executable] = version or 'unknown'
+        return f'native:{_native_versions[self.executable]}'
+
+    def availability(self) -> dict:
+        info = {'runner': self.name, 'executable': self.executable, 'exists': False}
+        try:
+            result = subprocess.run([self.executable, '--version'], capture_output=True, text=True, timeout=30)
+            if result.returncode == 0 and 'EnergyPlus' in result.stdout:
+                info.update({
+                    'status': 'Available and working',
+                    'exists': True,
+                    'version': result.stdout.strip().split('\n')[-1],
+                })
+            else:
+                info['status'] = 'EnergyPlus executable test failed'
+        except (subprocess.TimeoutExpired, FileNotFoundError, OSError):
+            info['status'] = f'EnergyPlus executable not found: {self.executable}'
+        return info
+
+
+class FakeRunner(SimulationRunner):
+    """Write canned `eplusout.*` files instead of running EnergyPlus.
+
+    Values are derived from a hash of the input IDF so different variants get
+    different (but deterministic) results. `SIMULATION_FAKE_RUNNER_DELAY`
+    seconds of sleep can be added to mimic real run times.
+    """
+    name = 'fake'
+
+    END_USE_COLUMNS = [
+        'Electricity [kWh]', 'Natural Gas [kWh]', 'Gasoline [kWh]', 'Diesel [kWh]', 'Coal [kWh]',
+        'Fuel Oil No 1 [kWh]', 'Fuel Oil No 2 [kWh]', 'Propane [kWh]', 'Other Fuel 1 [kWh]',
+        'Other Fuel 2 [kWh]', 'District Cooling [kWh]', 'District Heating Water [kWh]',
+        'District Heating Steam [kWh]', 'Water [m3]',
+    ]
+
+    def __init__(self, delay: Optional[float] = None):
+        self.delay = float(delay if delay is not None else getattr(settings, 'SIMULATION_FAKE_RUNNER_DELAY', 0))
+
+    def run(self, simulation_dir: str, timeout: float, on_line: Optional[Callable[[str], None]] = None,
+            stall_timeout: Optional[float] = None, readvars: bool = True) -> RunOutcome:
+        started = time.time()
+        idf_path = os.path.join(simulation_dir, 'input.idf')
+        with open(idf_path, 'r', encoding='utf-8', errors='replace') as f:
+            content = f.read()
+
+        seed = int(hashlib.sha256(content.encode('utf-8')).hexdigest()[:8], 16)
+        factor = 0.8 + (seed % 4000) / 10000.0  # 0.8 .. 1.2
+
+        building_match = re.search(r'(?im)^\s*Building\s*,\s*([^,;!\n]+)', content)
+        building = building_match.group(1).strip() if building_match else 'Fake Building'
+        zone_names = [m.group(1).strip() for m in re.finditer(r'(?im)^\s*Zone\s*,\s*([^,;!\n]+)', content)] or ['Zone 1']
+
+        # Emit EnergyPlus-like console lines, spreading the configured delay over the year
+        period = read_run_period(idf_path)
+        period_name = period[0].upper() if period and period[0] else 'RUN PERIOD 1'
+        lines = ["EnergyPlus Starting", "EnergyPlus (fake runner)", "Initializing Simulation", "Warming up {1}"]
+        lines += [f"{'Starting' if m == 1 else 'Continuing'} Simulation at {m:02d}/01 for {period_name}" for m in range(1, 13)]
+        lines += ["Writing tabular output file results using HTML format."]
+        delay = min(self.delay, max(0.0, timeout - 1))
+        for line in lines:
+            if on_line is not None:
+                on_line(line)
+            if delay > 0 and 'Simulation at' in line:
+                time.sleep(delay / 12)
+
+        zone_area = 50.0
+        total_area = zone_area * len(zone_names)
+        end_uses = {
+            'Heating': (0.0, 90.0 * total_area * factor),
+            'Cooling': (5.0 * total_area * factor, 0.0),
+            'Interior Lighting': (10.0 * total_area, 0.0),
+            'Interior Equipment': (20.0 * total_area, 0.0),
+        }
+        total_site = sum(e + dh for e, dh in end_uses.values())
+
+        tables = self._report_tables(total_area, total_site, end_uses, zone_names, zone_area)
+        self._write_html(os.path.join(simulation_dir, 'eplustbl.htm'), building, tables)
+        if re.search(r'(?im)^\s*Output:SQLite\s*,', content) and self._sqlite_enabled(content):
+            self._write_sql(os.path.join(simulation_dir, 'eplusout.sql'), tables)
+        self._write_eso(os.path.join(simulation_dir, 'eplusout.eso'), factor)
+        if readvars:
+            self._write_csv(os.path.join(simulation_dir, 'eplusout.csv'), factor)
+
+        elapsed = time.time() - started
+        runtime_line = f"EnergyPlus Run Time=00hr 00min {elapsed:5.2f}sec"
+        with open(os.path.join(simulation_dir, 'eplusout.err'), 'w') as f:
+            f.write("Program Version,EnergyPlus (fake runner)\n")
+            f.write("   ************* EnergyPlus Completed Successfully-- 0 Warning; 0 Severe Errors; "
+                    f"Elapsed Time=00hr 00min {elapsed:5.2f}sec\n")
+
+        lines += [runtime_line, "EnergyPlus Completed Successfully."]
+        if on_line is not None:
+            for line in lines[-2:]:
+                on_line(line)
+        stdout = '\n'.join(lines) + '\n'
+        return RunOutcome(['fake-energyplus', idf_path], 0, stdout, '', self.name, {'runtime_line': runtime_line})
+
+    def availability(self) -> dict:
+        return {'runner': self.name, 'status': 'Fake runner (no EnergyPlus execution)', 'exists': True,
+                'version': 'fake'}
+
+    def _report_tables(self, total_area, total_site, end_uses, zone_names, zone_area):
+        """(report, table title, column headers, rows) of the canned tabular reports."""
+        ncols = len(self.END_USE_COLUMNS)
+        end_use_rows = []
+        for name, (elec, dh) in end_uses.items():
+            values = ['0.00'] * ncols
+            values[0] = f'{elec:.2f}'
+            values[11] = f'{dh:.2f}'
+            end_use_rows.append((name, values))
+
+        abups, summary = 'Annual Building Utility Performance Summary', 'Input Verification and Results Summary'
+        return [
+            (abups, 'Site and Source Energy',
+             ['Total Energy [kWh]', 'Energy Per Total Building Area [kWh/m2]',
+              'Energy Per Conditioned Building Area [kWh/m2]'],
+             [('Total Site Energy', [f'{total_site:.2f}', f'{total_site / total_area:.2f}',
+                                     f'{total_site / total_area:.2f}'])]),
+            (abups, 'Building Area', ['Area [m2]'],
+             [('Total Building Area', [f'{total_area:.2f}']),
+              ('Net Conditioned Building Area', [f'{total_area:.2f}'])]),
+            (abups, 'End Uses', self.END_USE_COLUMNS, end_use_rows),
+            (summary, 'Zone Summary',
+             ['Area [m2]', 'Conditioned (Y/N)', 'Part of Total Floor Area (Y/N)', 'Volume [m3]'],
+             [(z, [f'{zone_area:.2f}', 'Yes', 'Yes', f'{zone_area * 2.7:.2f}']) for z in zone_names]
+             + [('Total', [f'{total_area:.2f}', '', '', f'{total_area * 2.7:.2f}'])]),
+        ]
+
+    def _write_html(self, path, building, tables):
+        def table(title, header, rows):
+            out = [f"<b>{title}</b><br><br>", '<table border="1" cellpadding="4" cellspacing="0">',
+                   '  <tr><td></td>' + ''.join(f'<td align="right">{h}</td>' for h in header) + '</tr>']
+            for label, values in rows:
+                out.append(f'  <tr><td align="right">{label}</td>' +
+                           ''.join(f'<td align="right">{v}</td>' for v in values) + '</tr>')
+            out.append('</table><br><br>')
+            return '\n'.join(out)
+
+        parts = ['<!DOCTYPE html>', '<html>', '<head><title>Fake EnergyPlus report</title></head>', '<body>',
+                 f'<p>Program Version:<b>EnergyPlus (fake runner)</b></p>',
+                 f'<p>Building: <b>{building}</b></p>']
+        report = None
+        for report_name, title, header, rows in tables:
+            if report_name != report:
+                parts += [f'<p>Report:<b> {report_name}</b></p>', '<p>For:<b> Entire Facility</b></p>']
+                report = report_name
+            parts.append(table(title, header, rows))
+        parts += ['</body>', '</html>']
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(parts))
+
+    @staticmethod
+    def _sqlite_enabled(content: str) -> bool:
+        """False when OutputControl:Files switches the SQLite output off (its sixth field)."""
+        match = re.search(r'(?ims)^\s*OutputControl:Files\s*,(.*?);', content)
+        if not match:
+            return True
+        fields = '\n'.join(re.sub(r'!.*', '', line) for line in match.group(1).split('\n')).split(',')
+        return len(fields) < 6 or fields[5].strip().lower() != 'no'
+
+    def _write_sql(self, path, tables):
+        """Write the tabular reports to a TabularDataWithStrings table like eplusout.sql."""
+        import sqlite3
+        if os.path.exists(path):
+            os.unlink(path)
+        conn = sqlite3.connect(path)
+        try:
+            conn.execute('CREATE TABLE TabularDataWithStrings (TabularDataIndex INTEGER PRIMARY KEY, Value TEXT, '
+                         'ReportName TEXT, ReportForString TEXT, TableName TEXT, RowName TEXT, '
+                         'ColumnName TEXT, Units TEXT, RowId INTEGER, ColumnId INTEGER)')
+            records = []
+            for report_name, title, header, rows in tables:
+                for row_id, (label, values) in enumerate(rows):
+                    for column_id, (column, value) in enumerate(zip(header, values)):
+                        name, _, units = column.partition(' [')
+                        records.append((value, report_name.replace(' ', ''), 'Entire Facility', title, label,
+                                        name, units.rstrip(']'), row_id, column_id))
+            conn.executemany('INSERT INTO TabularDataWithStrings (Value, ReportName, ReportForString, TableName, '
+                             'RowName, ColumnName, Units, RowId, ColumnId) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                             records)
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _hourly_values(factor):
+        """(month, day, hour, outdoor temperature, electricity demand) for every hour of a year."""
+        import math
+        days_in_month = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+        hour_of_year = 0
+        for month, days in enumerate(days_in_month, start=1):
+            for day in range(1, days + 1):
+                for hour in range(1, 25):
+                    temp = 8.0 - 10.0 * math.cos(2 * math.pi * hour_of_year / 8760.0) \
+                        + 4.0 * math.sin(2 * math.pi * (hour - 9) / 24.0)
+                    demand = 1000.0 * factor * (1.2 + math.sin(2 * math.pi * (hour - 6) / 24.0))
+                    yield month, day, hour, temp, demand
+                    hour_of_year += 1
+
+    def _write_eso(self, path, factor):
+        day_types = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('Program Version,EnergyPlus (fake runner)\n'
+                    '1,5,Environment Title[],Latitude[deg],Longitude[deg],Time Zone[],Elevation[m]\n'
+                    '2,8,Day of Simulation[],Month[],Day of Month[],DST Indicator[1=yes 0=no],Hour[],'
+                    'StartMinute[],EndMinute[],DayType\n'
+                    '7,1,Environment,Site Outdoor Air Drybulb Temperature [C] !Hourly\n'
+                    '8,1,Whole Building,Facility Total Electricity Demand Rate [W] !Hourly\n'
+                    'End of Data Dictionary\n'
+                    '1,RUN PERIOD 1,  57.70,  11.97,   1.00,  12.00\n')
+            for index, (month, day, hour, temp, demand) in enumerate(self._hourly_values(factor)):
+                day_of_year = index // 24 + 1
+                f.write(f'2,{day_of_year},{month:2d},{day:2d}, 0,{hour:2d}, 0.00,60.00,'
+                        f'{day_types[(day_of_year - 1) % 7]}\n7,{temp:.2f}\n8,{demand:.2f}\n')
+            f.write('End of Data\n')
+
+    def _write_csv(self, path, factor):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('Date/Time,Environment:Site Outdoor Air Drybulb Temperature [C](Hourly),'
+                    'Whole Building:Facility Total Electricity Demand Rate [W](Hourly)\n')
+            for month, day, hour, temp, demand in self._hourly_values(factor):
+                f.write(f' {month:02d}/{day:02d}  {hour:02d}:00:00,{temp:.2f},{demand:.2f}\n')
+
+
+RUNNERS = {
+    DockerRunner.name: DockerRunner,
+    NativeRunner.name: NativeRunner,
+    FakeRunner.name: FakeRunner,
+}
+
+
+def get_runner(name: Optional[str] = None) -> SimulationRunner:
+    """Return the runner configured by `SIMULATION_RUNNER` (or `name` when given)."""
+    name = (name or getattr(settings, 'SIMULATION_RUNNER', 'docker') or 'docker').lower()
+    try:
+        return RUNNERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown SIMULATION_RUNNER '{name}'. Choose one of: {', '.join(sorted(RUNNERS))}")
@@ -0,0 +1,220 @@
+"""
+History-driven EnergyPlus runtime estimates.
+
+EnergyPlus runtime grows roughly with (surfaces x simulated timesteps), so
+each run is described by a few IDF features and reduced to "work units":
+
+    work = (surfaces + ZONE_WEIGHT * zones) * run_days * timesteps_per_hour
+
+The estimator learns seconds-per-work-unit from recent `SimulationResult`
+rows (their `run_time` plus the `idf_features` stored in `raw_json`) and
+predicts `overhead + rate * work`. The prediction drives:
+
+- an adaptive per-run timeout (a multiple of the estimate, clamped to
+  SIMULATION_TIMEOUT_MIN / SIMULATION_TIMEOUT_MAX) instead of a flat 600 s;
+- a batch ETA on the status endpoint, given the current worker concurrency.
+
+Without enough history a conservative default rate is used, and the
+timeout never drops below the fixed SIMULATION_TIMEOUT.
+"""
+import re
+import threading
+import time
+from statistics import median
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+
+from .run_progress import read_run_period, day_of_year
+
+
+ZONE_WEIGHT = 5.0
+# Seconds per work unit and fixed per-run overhead used until history is available
+DEFAULT_RATE = 5e-4
+DEFAULT_OVERHEAD = 5.0
+MIN_SAMPLES = 5
+HISTORY_SIZE = 500
+REFIT_INTERVAL = 300  # seconds between history refits in a process
+
+_SURFACE_PREFIXES = (
+    'buildingsurface:', 'fenestrationsurface:', 'wall:', 'roofceiling:', 'roof:', 'floor:', 'ceiling:',
+    'window', 'door', 'glazeddoor', 'shading:',
+)
+
+
+def extract_idf_features(idf_path: str) -> Dict[str, float]:
+    """Count the IDF properties that drive EnergyPlus runtime."""
+    with open(idf_path, 'r', encoding='utf-8', errors='replace') as f:
+        content = f.read()
+
+    zones = surfaces = 0
+    timesteps = 1
+    for obj in re.sub(r'!.*', '', content).split(';'):
+        head, _, rest = obj.partition(',')
+        cls = head.strip().lower()
+        if not cls:
+            continue
+        if cls == 'zone':
+            zones += 1
+        elif cls.startswith(_SURFACE_PREFIXES):
+            surfaces += 1
+        elif cls == 'timestep':
+            try:
+                timesteps = max(1, int(rest.strip()))
+            except ValueError:
+                pass
+
+    run_days = 365
+    period = read_run_period(idf_path)
+    if period:
+        try:
+            begin, end = day_of_year(*period[1]), day_of_year(*period[2])
+            run_days = (end - begin) % 366 + 1
+        except ValueError:
+            pass
+
+    return {
+        'zones': zones,
+        'surfaces': surfaces,
+        'run_days': run_days,
+        'timesteps_per_hour': timesteps,
+    }
+
+
+def work_units(features: Optional[dict]) -> float:
+    if not features:
+        return 0.0
+    try:
+        geometry = float(features.get('surfaces', 0)) + ZONE_WEIGHT * float(features.get('zones', 0))
+        return max(geometry, 1.0) * float(features.get('run_days', 365)) * float(features.get('timesteps_per_hour', 1))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class RuntimeEstimator:
+    """Predict EnergyPlus runtime from IDF features and past runs."""
+
+    def __init__(self, rate: float = DEFAULT_RATE, overhead: float = DEFAULT_OVERHEAD, samples: int = 0):
+        self.rate = rate
+        self.overhead = overhead
+        self.samples = samples
+        self.fitted_at = 0.0
+
+    def fit(self, history: Iterable) -> 'RuntimeEstimator':
+        """Fit from (run_time_seconds, features) pairs; keeps defaults if too few samples."""
+        rates = []
+        for run_time, features in history:
+            work = work_units(features)
+            if not run_time or run_time <= self.overhead or work <= 0:
+                continue
+            rates.append((float(run_time) - self.overhead) / work)
+        if len(rates) >= MIN_SAMPLES:
+            # The median keeps a few cold-start or swapping runs from skewing the rate
+            self.rate = median(rates)
+        self.samples = len(rates)
+        self.fitted_at = time.time()
+        return self
+
+    def fit_from_database(self) -> 'RuntimeEstimator':
+        from .models import SimulationResult
+        try:
+            rows = (SimulationResult.objects
+                    .filter(status='success', run_time__gt=0)
+                    .order_by('-created_at')
+                    .values_list('run_time', 'raw_json__idf_features', 'raw_json__cache_hit')[:HISTORY_SIZE])
+            history = [(run_time, features) for run_time, features, cache_hit in rows
+                       if isinstance(features, dict) and not cache_hit]
+        except Exception as e:
+            print(f"Runtime estimator: failed to load history: {e}")
+            history = []
+        return self.fit(history)
+
+    def predict(self, features: Optional[dict]) -> float:
+        """Predicted runtime in seconds."""
+        return self.overhead + self.rate * work_units(features)
+
+    @property
+    def trusted(self) -> bool:
+        """True once the rate was fitted on at least MIN_SAMPLES past runs."""
+        return self.samples >= MIN_SAMPLES
+
+    def timeout_for(self, estimate: float) -> int:
+        """Adaptive timeout for a run with the given estimate.
+
+        Until the estimator is trusted, the fixed SIMULATION_TIMEOUT stays the
+        floor, so the default rate cannot cut long runs short.
+        """
+        multiplier = getattr(settings, 'SIMULATION_TIMEOUT_MULTIPLIER', 4.0)
+        low = getattr(settings, 'SIMULATION_TIMEOUT_MIN', 120)
+        high = getattr(settings, 'SIMULATION_TIMEOUT_MAX', 3000)
+        timeout = min(max(estimate * multiplier, low), high)
+        if not self.trusted:
+            timeout = max(timeout, getattr(settings, 'SIMULATION_TIMEOUT', 600))
+        return int(timeout)
+
+
+_estimator: Optional[RuntimeEstimator] = None
+_estimator_lock = threading.Lock()
+
+
+def get_runtime_estimator() -> RuntimeEstimator:
+    """Return this process's estimator, refitted from history every REFIT_INTERVAL seconds."""
+    global _estimator
+    with _estimator_lock:
+        if _estimator is None or time.time() - _estimator.fitted_at > REFIT_INTERVAL:
+            _estimator = RuntimeEstimator().fit_from_database()
+        return _estimator
+
+
+def estimate_batch(idf_paths: Iterable[str]) -> float:
+    """Mean predicted seconds per run over a batch's base IDFs."""
+    estimator = get_runtime_estimator()
+    estimates = []
+    for path in idf_paths:
+        try:
+            estimates.append(estimator.predict(extract_idf_features(path)))
+        except Exception as e:
+            print(f"Runtime estimator: could not read features from {path}: {e}")
+    if not estimates:
+        return estimator.predict(None)
+    return sum(estimates) / len(estimates)
+
+
+_concurrency_cache = {'value': None, 'at': 0.0}
+
+
+def get_worker_concurrency() -> int:
+    """Total Celery worker processes across online workers (cached for a minute)."""
+    now = time.time()
+    if _concurrency_cache['value'] and now - _concurrency_cache['at'] < 60:
+        return _concurrency_cache['value']
+    concurrency = 0
+    try:
+        from config.celery import app
+        stats = app.control.inspect(timeout=1.0).stats() or {}
+        for worker_stats in stats.values():
+            concurrency += int(worker_stats.get('pool', {}).get('max-concurrency', 0) or 0)
+    except Exception as e:
+        print(f"Runtime estimator: could not inspect Celery workers: {e}")
+    concurrency = concurrency or int(getattr(settings, 'SIMULATION_DEFAULT_CONCURRENCY', 4))
+    _concurrency_cache.update(value=concurrency, at=now)
+    return concurrency
+
+
+def batch_eta(simulation, completed: int) -> Optional[dict]:
+    """Remaining-time estimate for a running simulation, or None if unknown."""
+    total = getattr(simulation, 'total_runs', 0) or 0
+    per_run = getattr(simulation, 'estimated_run_seconds', None)
+    if not total or not per_run:
+        return None
+    remaining = max(total - completed, 0)
+    concurrency = get_worker_concurrency()
+    waves = -(-remaining // concurrency)  # ceil
+    return {
+        'total_runs': total,
+        'completed_runs': completed,
+        'remaining_runs': remaining,
+        'estimated_run_seconds': round(per_run, 1),
+        'worker_concurrency': concurrency,
+        'eta_seconds': round(waves * per_run, 1),
+    }
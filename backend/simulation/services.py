@@ -2,6 +2,7 @@ import os
 import re
 import json
 import tempfile
+import time
 import pathlib
 from pathlib import Path
 from typing import Optional
@@ -9,12 +10,24 @@ from django.conf import settings
 from .models import Simulation, SimulationFile
 import uuid
 from eppy.modeleditor import IDF
-from bs4 import BeautifulSoup
+import numpy as np
 import psutil
 
 import sqlite3
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
+from .runners import get_runner
+from .result_cache import get_result_cache, compute_cache_key
+from .staging import stage_file
+from .run_progress import RunProgressTracker, SimulationStalled
+from .runtime_estimator import get_runtime_estimator, extract_idf_features
+from .host_slots import get_host_scheduler
+from .readvars import read_readvars_csv
+from .eso import read_eso_table
+from .timeseries_store import json_default
+from .result_persistence import persist_results
+from .tabular_results import parse_sql_results, parse_html_results, ensure_sqlite_output
+from .retention import resolve_profile, apply_output_controls, apply_output_retention
 
 
 # Reserve the final portion of progress reporting for persistence/finalization steps
@@ -53,6 +66,12 @@ class EnergyPlusSimulator:
         self._channel_layer = get_channel_layer()
         self._progress_group = f"simulation_progress_{self.run_id}"
 
+        # Share of overall progress (start, end) covered by the run in flight; callers
+        # set it so intra-run EnergyPlus progress maps onto the simulation's progress bar.
+        self.progress_window = None
+        self._last_run_push = 0.0
+        self._last_run_progress = None
+
     def _push_progress(self, progress: int, status: str = None, extra: dict = None):
         """Send a progress update to the Channels group so WebSocket clients receive pushes."""
         payload = {"progress": int(progress)}
@@ -73,6 +92,22 @@ class EnergyPlusSimulator:
             # Non-fatal: continue if channel layer is not available
             pass
 
+    def _report_run_progress(self, update: dict, idf_name: str):
+        """Push intra-run progress from a RunProgressTracker update, throttled."""
+        if not self.progress_window:
+            return
+        start, end = self.progress_window
+        progress = int(start + update['fraction'] * (end - start))
+        now = time.monotonic()
+        interval = getattr(settings, 'SIMULATION_PROGRESS_PUSH_INTERVAL', 2.0)
+        if progress == self._last_run_progress or now - self._last_run_push < interval:
+            return
+        self._last_run_push = now
+        self._last_run_progress = progress
+        self._push_progress(progress, status='running', extra={
+            'run': {'idf_file': idf_name, **update}
+        })
+
     def _intermediate_progress(self, completed: int, total: int) -> int:
         """Return a progress percentage capped below 100% for in-flight work."""
         if not total:
@@ -80,10 +115,15 @@ class EnergyPlusSimulator:
         pct = int((completed / total) * 100)
         return min(pct, FINALIZATION_PROGRESS_CEILING)
 
-    def run_single_simulation(self, idf_file, weather_file, simulation_dir):
-        """Run a single EnergyPlus simulation using Docker container"""
+    def run_single_simulation(self, idf_file, weather_file, simulation_dir, use_cache=None):
+        """Run a single EnergyPlus simulation with the configured runner (see runners.py).
+
+        When the result cache is enabled and `use_cache` is not False (default:
+        the simulation's `run_options['use_cache']`), identical inputs restore
+        cached outputs instead of running EnergyPlus. The returned log carries
+        `cache_key`/`cache_hit` for `process_file_results`.
+        """
         import subprocess
-        import shutil
 
         # Resolve stored file paths.
         # Support multiple idf_file shapes:
@@ -114,12 +154,24 @@ class EnergyPlusSimulator:
         # Prepare simulation directory
         Path(simulation_dir).mkdir(parents=True, exist_ok=True)
         
-        # Copy files to simulation directory
+        # Stage input files into the simulation directory (hardlink/reflink, copy as fallback)
         temp_idf_path = os.path.join(simulation_dir, 'input.idf')
         temp_epw_path = os.path.join(simulation_dir, 'weather.epw')
 
-        shutil.copy2(idf_path, temp_idf_path)
-        shutil.copy2(weather_path, temp_epw_path)
+        staging = {
+            'input.idf': stage_file(idf_path, temp_idf_path),
+            'weather.epw': stage_file(weather_path, temp_epw_path),
+        }
+
+        # Summary results are read from the SQLite tabular data when the IDF produces it
+        # (not requested for `minimal` runs, see ensure_sqlite_output)
+        retention_profile = resolve_profile(self.simulation.run_options)
+        if ensure_sqlite_output(temp_idf_path, retention_profile):
+            staging['input.idf'] = 'rewritten (Output:SQLite)'
+
+        # The `minimal` retention profile switches unused outputs off in the staged IDF
+        if apply_output_controls(temp_idf_path, retention_profile):
+            staging['input.idf'] = 'rewritten (OutputControl:Files)'
 
         # Preflight: ensure copied files exist in the container-side simulation directory.
         # The host path (HOST_MEDIA_ROOT) is only useful for building the docker -v source
@@ -155,6 +207,7 @@ class EnergyPlusSimulator:
                 f.write(f"simulation_dir: {simulation_dir}\n")
                 if expected_host_sim_dir:
                     f.write(f"expected_host_sim_dir: {expected_host_sim_dir}\n")
+                f.write(f"staging: {', '.join(f'{k}={v}' for k, v in staging.items())}\n")
                 f.write(f"contents:\n{listing}\n")
         except Exception:
             pass
@@ -162,63 +215,100 @@ class EnergyPlusSimulator:
         if missing:
             raise FileNotFoundError(f"Preflight: expected file(s) missing in container simulation dir: {missing}")
 
-        # Use NREL EnergyPlus Docker container
-        # If backend is running inside Docker and invoking the host Docker daemon,
-        # mounting the container-internal path (e.g. /app/media/...) will fail because
-        # the Docker daemon on the host doesn't know that path. Allow an explicit
-        # host-accessible path via HOST_MEDIA_ROOT env var.
-        host_media_root = os.environ.get('HOST_MEDIA_ROOT')
+        display_idf_name = getattr(idf_file, 'original_name', None) or getattr(idf_file, 'file_name', None) or idf_basename
 
-        # If HOST_MEDIA_ROOT is set to the host's MEDIA_ROOT directory, translate
-        # the container `simulation_dir` to the equivalent host path. This allows
-        # the host Docker daemon to mount the correct host directory even when
-        # the code runs inside a container.
-        if host_media_root and str(simulation_dir).startswith(str(settings.MEDIA_ROOT)):
-            rel = os.path.relpath(str(simulation_dir), str(settings.MEDIA_ROOT))
-            mount_source = os.path.join(host_media_root, rel)
-        else:
-            mount_source = simulation_dir
-
-        # Honor an environment variable to request a specific container platform
-        platform = os.environ.get('EPLUS_DOCKER_PLATFORM', 'linux/amd64')
-
-        docker_command = [
-            'docker', 'run', '--rm',
-            '-v', f'{mount_source}:/var/simdata/energyplus',
-            '--platform', platform,
-            'nrel/energyplus:23.2.0',
-            'energyplus',
-            '--weather', '/var/simdata/energyplus/weather.epw',
-            '--output-directory', '/var/simdata/energyplus',
-            '--expandobjects', '--readvars',
-            '/var/simdata/energyplus/input.idf'
-        ]
+        # Execution backend (docker / native / fake) is selected by SIMULATION_RUNNER
+        runner = get_runner()
+        # Timeseries are read from the ESO directly; ReadVarsESO only adds output.csv for users
+        readvars = use_readvars(self.simulation.run_options)
 
+        if use_cache is None:
+            use_cache = (self.simulation.run_options or {}).get('use_cache', True)
+        cache = get_result_cache() if use_cache else None
+        cache_key = None
+        if cache is not None:
+            try:
+                # Retained files differ per profile, so the profile is part of the key
+                cache_key = compute_cache_key(temp_idf_path, temp_epw_path,
+                                              f"{runner.engine_version()}|{retention_profile}"
+                                              + ('' if readvars else '|no-readvars'))
+                if cache.lookup(cache_key):
+                    restored = cache.restore_outputs(cache_key, simulation_dir)
+                    with open(os.path.join(simulation_dir, 'run_output.log'), 'w') as f:
+                        f.write(f"RESULT CACHE HIT: {cache_key} ({restored} files restored)\n")
+                    print(f"Result cache hit for {display_idf_name}: {cache_key[:12]}")
+                    return {
+                        "idf_file": display_idf_name,
+                        "stdout": "",
+                        "stderr": "",
+                        "returncode": 0,
+                        "output_dir": str(simulation_dir),
+                        "runner": runner.name,
+                        "docker_command": "",
+                        "cache_key": cache_key,
+                        "cache_hit": True
+                    }
+            except Exception as cache_err:
+                print(f"Warning: result cache lookup failed, running EnergyPlus: {cache_err}")
+                cache_key = None
+
+        # Stream EnergyPlus stdout into progress updates; runs silent for longer than
+        # SIMULATION_STALL_TIMEOUT seconds are aborted instead of waiting for the timeout
+        tracker = RunProgressTracker(temp_idf_path)
+
+        def on_line(line):
+            update = tracker.feed(line)
+            if update:
+                self._report_run_progress(update, display_idf_name)
+
+        stall_timeout = getattr(settings, 'SIMULATION_STALL_TIMEOUT', 300) or None
+
+        # Adaptive timeout from the predicted runtime of this IDF (see runtime_estimator.py)
+        idf_features = None
+        estimated_runtime = None
+        timeout = getattr(settings, 'SIMULATION_TIMEOUT', 600)
         try:
-            # Run EnergyPlus simulation in Docker
-            process = subprocess.run(
-                docker_command, 
-                capture_output=True, 
-                text=True, 
-                timeout=600,  # 10 minute timeout
-                cwd=simulation_dir
-            )
+            estimator = get_runtime_estimator()
+            idf_features = extract_idf_features(temp_idf_path)
+            estimated_runtime = estimator.predict(idf_features)
+            timeout = estimator.timeout_for(estimated_runtime)
+        except Exception as est_err:
+            print(f"Warning: runtime estimate failed, using {timeout}s timeout: {est_err}")
 
-            display_idf_name = getattr(idf_file, 'original_name', None) or getattr(idf_file, 'file_name', None) or idf_basename
+        try:
+            # Wait for a free slot on this host (see host_slots.py); the lease outlives
+            # the run timeout so a crashed worker's slot frees itself
+            scheduler = get_host_scheduler()
+            slot_token = scheduler.acquire(lease_seconds=timeout + 60) if scheduler else None
+            try:
+                outcome = runner.run(simulation_dir, timeout=timeout, on_line=on_line, stall_timeout=stall_timeout,
+                                     readvars=readvars)
+            finally:
+                if slot_token:
+                    scheduler.release(slot_token)
+            command_str = ' '.join(outcome.command)
 
             output_log = {
                 "idf_file": display_idf_name,
-                "stdout": process.stdout,
-                "stderr": process.stderr,
-                "returncode": process.returncode,
+                "stdout": outcome.stdout,
+                "stderr": outcome.stderr,
+                "returncode": outcome.returncode,
                 "output_dir": str(simulation_dir),
-                "docker_command": ' '.join(docker_command)
+                "runner": outcome.runner,
+                "docker_command": command_str,
+                # Only successful runs are offered to the result cache
+                "cache_key": cache_key if outcome.returncode == 0 else None,
+                "cache_hit": False,
+                "idf_features": idf_features,
+                "estimated_runtime": round(estimated_runtime, 1) if estimated_runtime is not None else None,
+                "timeout": timeout,
+                "readvars": readvars
             }
 
             # Save output logs
             with open(os.path.join(simulation_dir, 'run_output.log'), 'w') as f:
-                f.write(f"DOCKER COMMAND: {' '.join(docker_command)}\n\n")
-                f.write(f"STDOUT:\n{process.stdout}\n\nSTDERR:\n{process.stderr}")
+                f.write(f"{outcome.runner.upper()} COMMAND: {command_str}\n\n")
+                f.write(f"STDOUT:\n{outcome.stdout}\n\nSTDERR:\n{outcome.stderr}")
 
             # Rename standard output files (same as before)
             standard_files = {
@@ -243,22 +333,31 @@ class EnergyPlusSimulator:
                     os.rename(src_path, dst_path)
 
             # Ensure a canonical output.html exists: if only output.htm is present,
-            # copy it to output.html so clients requesting output.html succeed.
+            # link (or copy) it to output.html so clients requesting output.html succeed.
             out_html = os.path.join(simulation_dir, 'output.html')
             out_htm = os.path.join(simulation_dir, 'output.htm')
             try:
                 if not os.path.exists(out_html) and os.path.exists(out_htm):
-                    shutil.copy2(out_htm, out_html)
+                    stage_file(out_htm, out_html)
             except Exception:
                 # Non-fatal; we already saved run_output.log and other outputs.
                 pass
 
             return output_log
 
+        except SimulationStalled:
+            return {
+                "idf_file": display_idf_name,
+                "error": f"Simulation stalled: no EnergyPlus output for {stall_timeout} seconds "
+                         f"(last phase: {tracker.phase}{', ' + tracker.date if tracker.date else ''})",
+                "returncode": -1,
+                "output_dir": str(simulation_dir)
+            }
         except subprocess.TimeoutExpired:
             return {
                 "idf_file": display_idf_name,
-                "error": "Simulation timed out after 10 minutes",
+                "error": f"Simulation timed out after {timeout} seconds"
+                         + (f" (estimated runtime {estimated_runtime:.0f}s)" if estimated_runtime else ""),
                 "returncode": -1,
                 "output_dir": str(simulation_dir)
             }
@@ -321,10 +420,11 @@ class EnergyPlusSimulator:
                 idf_basename = os.path.basename(idf_path)
                 idf_name_no_ext = os.path.splitext(idf_basename)[0]
                 idf_results_dir = self.results_dir / idf_name_no_ext
+                self.progress_window = (self._intermediate_progress(done, total), self._intermediate_progress(done + 1, total))
                 log = self.run_single_simulation(idf_file, weather_file, str(idf_results_dir))
                 logs.append((idf_file, log))
                 results_path = idf_results_dir / 'output'
-                file_results = self.process_file_results(results_path, idf_file)
+                file_results = self.process_file_results(results_path, idf_file, run_log=log)
                 if file_results:
                     all_results.append(file_results)
                 # update progress
@@ -350,7 +450,7 @@ class EnergyPlusSimulator:
             # Save all results to a combined JSON file
             combined_results_path = self.results_dir / 'combined_results.json'
             with open(combined_results_path, 'w') as f:
-                json.dump(all_results, f)
+                json.dump(all_results, f, default=json_default)
 
             # For batch mode, save results to database
             if batch_mode:
@@ -388,13 +488,40 @@ class EnergyPlusSimulator:
             raise
 
     # Add a new helper method to process results for a single file
-    def process_file_results(self, output_file: Path, idf_file):
-        """Process and store results for a single IDF file."""
+    def process_file_results(self, output_file: Path, idf_file, run_log=None):
+        """Process and store results for a single IDF file.
+
+        `run_log` is the dict returned by run_single_simulation. On a result
+        cache hit the cached parsed results are reused, otherwise successful
+        results are stored in the cache under its `cache_key`. Its IDF features
+        are kept with the results to train the runtime estimator.
+        """
+        run_log = run_log or {}
+        cache_key = run_log.get('cache_key')
+        cache_hit = run_log.get('cache_hit', False)
         try:
             # Ensure output_file is a Path object
             if isinstance(output_file, str):
                 output_file = Path(output_file)
-            
+
+            original_name = idf_file.original_name if hasattr(idf_file, 'original_name') and idf_file.original_name else (idf_file.file_name if getattr(idf_file, 'file_name', None) else os.path.basename(idf_file.file_path))
+
+            if cache_hit and cache_key:
+                cache = get_result_cache()
+                cached = cache.load_results(cache_key) if cache is not None else None
+                if cached:
+                    cached['fileName'] = idf_file.file_name if getattr(idf_file, 'file_name', None) else os.path.basename(idf_file.file_path)
+                    cached['originalFileName'] = original_name
+                    cached['cache_hit'] = True
+                    # Restored files are links into the cache: nothing new was written
+                    retention = apply_output_retention(str(output_file.parent), resolve_profile(self.simulation.run_options))
+                    cached['outputRetention'] = retention['profile']
+                    cached['outputBytesWritten'] = 0
+                    cached['outputBytes'] = retention['bytes_retained']
+                    with open(output_file.with_suffix('.json'), 'w') as f:
+                        json.dump(cached, f)
+                    return cached
+
             # Get the HTML file path
             html_path = output_file.with_suffix('.htm')
             log_path = output_file.parent / 'run_output.log'
@@ -405,7 +532,6 @@ class EnergyPlusSimulator:
             
             # List files in the directory to see what's actually there
             try:
-                import os
                 parent_dir = html_path.parent
                 if parent_dir.exists():
                     files = os.listdir(parent_dir)
@@ -415,34 +541,72 @@ class EnergyPlusSimulator:
             except Exception as list_err:
                 print(f"DEBUG process_file_results: Error listing directory: {list_err}")
             
-            if html_path.exists():
-                # Extract results from HTML
+            # Prefer the SQLite tabular data (see tabular_results.py); the HTML report is the fallback
+            parse_started = time.perf_counter()
+            results = None
+            sql_path = output_file.with_suffix('.sql')
+            if sql_path.exists():
+                results = parse_sql_results(sql_path, log_path, [idf_file])
+            if results is None and html_path.exists():
                 results = parse_html_with_table_lookup(html_path, log_path, [idf_file])
 
-                # If a ReadVars CSV exists, attempt to parse hourly timeseries
-                csv_path = output_file.with_suffix('.csv')
-                if csv_path.exists():
-                    try:
+            if results is not None:
+                results['parseTime'] = round(time.perf_counter() - parse_started, 4)
+                print(f"Parsed {results.get('resultSource', 'tabular')} results for {original_name} "
+                      f"in {results['parseTime']:.3f}s")
+
+                # Timeseries come from the ESO (no ReadVars step needed), else from the ReadVars CSV
+                try:
+                    timeseries_started = time.perf_counter()
+                    hourly_data = {}
+                    eso_path = output_file.with_suffix('.eso')
+                    csv_path = output_file.with_suffix('.csv')
+                    if eso_path.exists():
+                        hourly_data = parse_eso_timeseries(eso_path)
+                    if not hourly_data and csv_path.exists():
                         hourly_data = parse_readvars_csv(csv_path)
-                        if hourly_data:
-                            # attach hourly_data to the results so downstream
-                            # save_results_to_database can persist it
-                            results['hourly_timeseries'] = hourly_data
-                    except Exception:
-                        # Non-fatal: continue even if CSV parsing fails
-                        pass
+                    if hourly_data:
+                        # attach hourly_data to the results so downstream
+                        # save_results_to_database can persist it
+                        results['hourly_timeseries'] = hourly_data
+                        results['timeseriesParseTime'] = round(time.perf_counter() - timeseries_started, 4)
+                except Exception:
+                    # Non-fatal: continue even if timeseries parsing fails
+                    pass
                 
                 # Add original filename to results
-                results['originalFileName'] = idf_file.original_name if hasattr(idf_file, 'original_name') and idf_file.original_name else (idf_file.file_name if getattr(idf_file, 'file_name', None) else os.path.basename(idf_file.file_path))
+                results['originalFileName'] = original_name
+                if run_log.get('idf_features'):
+                    results['idf_features'] = run_log['idf_features']
+                    results['estimated_runtime'] = run_log.get('estimated_runtime')
                 
+                # Drop outputs the simulation's retention profile does not keep
+                try:
+                    retention = apply_output_retention(str(output_file.parent), resolve_profile(self.simulation.run_options))
+                    results['outputRetention'] = retention['profile']
+                    results['outputBytesWritten'] = retention['bytes_written']
+                    results['outputBytes'] = retention['bytes_retained']
+                    print(f"Output retention '{retention['profile']}': {retention['bytes_written']} bytes written, "
+                          f"{retention['bytes_retained']} bytes kept ({len(retention['removed'])} files removed)")
+                except Exception as retention_err:
+                    print(f"Warning: failed to apply output retention: {retention_err}")
+
                 # Save parsed results as a JSON file
                 json_path = output_file.with_suffix('.json')
                 with open(json_path, 'w') as f:
-                    json.dump(results, f)
+                    json.dump(results, f, default=json_default)
+
+                if cache_key and results.get('status') == 'success':
+                    try:
+                        cache = get_result_cache()
+                        if cache is not None:
+                            cache.store(cache_key, str(output_file.parent), results)
+                    except Exception as cache_err:
+                        print(f"Warning: failed to store results in result cache: {cache_err}")
                 
                 return results
             else:
-                print(f"Warning: HTML results file not found at {html_path}")
+                print(f"Warning: no SQL or HTML results file found at {output_file}")
                 return {
                     'error': 'HTML results file not found',
                     'fileName': idf_file.file_name if getattr(idf_file, 'file_name', None) else os.path.basename(idf_file.file_path),
@@ -464,190 +628,84 @@ class EnergyPlusSimulator:
     def save_results_to_database(self, results, job_info=None):
         """Save parsed simulation results to PostgreSQL database models.
 
-        Returns a summary dict with counts of saved and failed records to help
-        callers decide whether the simulation can be marked completed.
+        Rows are written with bulk_create in one transaction (see
+        result_persistence.py). Returns a summary dict with counts of saved and
+        failed records, rows written and elapsed seconds, to help callers decide
+        whether the simulation can be marked completed.
         """
-        from .models import SimulationResult, SimulationZone, SimulationEnergyUse, SimulationHourlyTimeseries
-        import traceback
-
-        summary = {
-            'saved': 0,
-            'failed': 0,
-            'errors': []
-        }
-
         if results is None:
-            return summary
-
-        if not isinstance(results, (list, tuple)):
-            iterable = [results]
-        else:
-            iterable = list(results)
+            return {'saved': 0, 'failed': 0, 'errors': [], 'rows_written': 0, 'elapsed_seconds': 0.0}
 
+        iterable = list(results) if isinstance(results, (list, tuple)) else [results]
         run_id = job_info.get("run_id") if job_info else str(self.simulation.id)
         user_id = getattr(self.simulation, 'user_id', None)
+        return persist_results(iterable, self.simulation.id, run_id, user_id)
 
-        for idx, result in enumerate(iterable):
-            if not isinstance(result, dict):
-                summary['failed'] += 1
-                summary['errors'].append(f"Result {idx} has unexpected type {type(result).__name__}")
-                continue
-
-            try:
-                file_name = result.get("fileName") or result.get("originalFileName") or "unknown.idf"
-
-                simulation_result = SimulationResult.objects.create(
-                    simulation_id=self.simulation.id,
-                    run_id=run_id,
-                    file_name=file_name,
-                    building_name=result.get("building", ""),
-                    total_energy_use=result.get("totalEnergyUse"),
-                    heating_demand=result.get("heatingDemand"),
-                    cooling_demand=result.get("coolingDemand"),
-                    lighting_demand=result.get("lightingDemand"),
-                    equipment_demand=result.get("equipmentDemand"),
-                    gwp_total=result.get("gwp_total"),
-                    cost_total=result.get("cost_total"),
-                    total_area=result.get("totalArea"),
-                    run_time=result.get("runTime"),
-                    status=result.get("status", "success"),
-                    error_message=result.get("error", ""),
-                    raw_json=result,
-                    variant_idx=result.get("variant_idx"),
-                    idf_idx=result.get("idf_idx"),
-                    construction_set_data=result.get("construction_set"),
-                    user_id=user_id,
-                )
-
-                zones = result.get("zones", [])
-                for zone_data in zones:
-                    SimulationZone.objects.create(
-                        simulation_result=simulation_result,
-                        zone_name=zone_data.get("name", ""),
-                        area=zone_data.get("area"),
-                        volume=zone_data.get("volume")
-                    )
-
-                energy_uses = result.get("energy_use", {})
-                for end_use, values in energy_uses.items():
-                    if isinstance(values, dict):
-                        SimulationEnergyUse.objects.create(
-                            simulation_result=simulation_result,
-                            end_use=end_use,
-                            electricity=values.get("electricity", 0.0),
-                            district_heating=values.get("district_heating", 0.0),
-                            total=values.get("total", 0.0)
-                        )
 
-                try:
-                    hourly_payload = result.get('hourly_timeseries')
-                    if hourly_payload and isinstance(hourly_payload, dict) and hourly_payload.get('is_hourly'):
-                        SimulationHourlyTimeseries.objects.create(
-                            simulation_result=simulation_result,
-                            has_hourly=True,
-                            hourly_values=hourly_payload
-                        )
-                except Exception as hourly_err:
-                    summary['errors'].append(f"Hourly timeseries save failed for result {file_name}: {hourly_err}")
+def use_readvars(run_options: Optional[dict] = None) -> bool:
+    """Whether EnergyPlus runs with --readvars (run_options['readvars'], default SIMULATION_READVARS)."""
+    readvars = (run_options or {}).get('readvars')
+    if readvars is None:
+        return bool(getattr(settings, 'SIMULATION_READVARS', True))
+    return bool(readvars)
 
-                summary['saved'] += 1
-                print(f"Saved simulation result to database: {simulation_result.pk}")
 
-            except Exception as e:
-                summary['failed'] += 1
-                summary['errors'].append(f"Result {idx}: {e}")
-                print(f"Error saving result to database: {e}")
-                traceback.print_exc()
+def timeseries_from_table(table) -> dict:
+    """Convert a ReadVarsTable into the timeseries payload stored with the results.
 
-        summary['failed'] = summary['failed'] or 0
-        return summary
+    - `series` maps sanitized variable names to float32 arrays (NaN where the
+      variable has no value on that row), ready for the columnar store.
+    - `is_hourly` marks annual-length tables (>= 8000 rows); in those, variables
+      with fewer than 100 values (monthly / run period columns) are skipped.
+    - `start` and `interval_seconds` describe the time index.
+    """
+    if table is None or len(table) == 0:
+        return {}
 
+    # Determine if this looks like an hourly file (approx 8760 rows)
+    hourly_like = len(table) >= 8000
+    present = np.count_nonzero(~np.isnan(table.values), axis=0)
 
-def parse_readvars_csv(csv_path: str | Path) -> dict:
-    """Parse EnergyPlus ReadVars CSV (eplusout.csv) into a dict of timeseries.
+    series = {}
+    for col_idx, var_name_raw in enumerate(table.columns):
+        if hourly_like and present[col_idx] < 100:
+            continue
+        series[_sanitize_variable_name(var_name_raw or f'col_{col_idx + 1}')] = \
+            table.values[:, col_idx].astype(np.float32)
+
+    # If nothing meaningful found, return empty
+    if not series:
+        return {}
 
-    Heuristics used:
-    - Skip the first header row(s) until the line that starts with "" (blank first cell)
-      followed by variable columns (older ReadVars sometimes include metadata rows).
-    - Detect whether the CSV is hourly by counting rows (>= 8000 rows is treated as yearly hourly).
-    - Return a dict mapping sanitized variable names to numeric arrays.
+    valid = table.time_index[~np.isnat(table.time_index)]
+    return {
+        'is_hourly': hourly_like,
+        'rows': len(table),
+        'start': str(valid[0]) if len(valid) else None,
+        'interval_seconds': table.interval_seconds(),
+        'series': series
+    }
 
-    This implementation is conservative: it reads numeric columns only and limits
-    memory by only reading the first ~20000 rows.
-    """
-    import csv
 
-    csv_path = Path(csv_path)
-    series = {}
+def parse_eso_timeseries(eso_path: str | Path) -> dict:
+    """Parse EnergyPlus ESO output (eplusout.eso) into a timeseries payload (see eso.py)."""
     try:
-        with csv_path.open('r', encoding='utf-8', errors='replace') as fh:
-            reader = csv.reader(fh)
-            rows = []
-            # Read all rows up to a reasonable cap (protect memory)
-            max_rows = 20000
-            for i, row in enumerate(reader):
-                rows.append(row)
-                if i + 1 >= max_rows:
-                    break
-
-        if len(rows) < 2:
-            return {}
-
-        # Attempt to find the header row which contains variable names
-        header_idx = 0
-        # Common EnergyPlus ReadVars CSV has first column blank then variable labels
-        for idx, r in enumerate(rows[:10]):
-            # Heuristic: header row contains at least 2 non-empty cells and not numeric
-            non_empty = sum(1 for c in r if c and c.strip() != '')
-            if non_empty >= 2 and any(not _is_number_like(c) for c in r):
-                header_idx = idx
-                break
-
-        header = rows[header_idx]
-        data_rows = rows[header_idx+1:]
-
-        # If the first column is empty and second column looks like a number for the
-        # first data row, then columns from 1..N are variables
-        col_count = len(header)
-        if col_count < 2:
-            return {}
-
-        # Determine if this looks like an hourly file (approx 8760 rows)
-        hourly_like = len(data_rows) >= 8000
-
-        # For each column, try to parse numeric values
-        for col_idx in range(1, col_count):
-            var_name_raw = header[col_idx].strip() if header[col_idx] else f'col_{col_idx}'
-            var_name = _sanitize_variable_name(var_name_raw)
-            vals = []
-            for r in data_rows:
-                if col_idx >= len(r):
-                    vals.append(None)
-                    continue
-                v = r[col_idx].strip()
-                if v == '' or v == '\u00a0':
-                    vals.append(None)
-                    continue
-                try:
-                    vals.append(float(v))
-                except Exception:
-                    vals.append(None)
-            # If hourly_like but we have far fewer rows, skip this variable
-            if hourly_like and len([x for x in vals if x is not None]) < 100:
-                continue
-            series[var_name] = vals
+        return timeseries_from_table(read_eso_table(eso_path))
+    except Exception as e:
+        print(f"Warning: failed to parse ESO output {eso_path}: {e}")
+        return {}
 
-        # If nothing meaningful found, return empty
-        if not series:
-            return {}
 
-        # Attach metadata
-        return {
-            'is_hourly': hourly_like,
-            'rows': len(data_rows),
-            'series': series
-        }
-    except Exception:
+def parse_readvars_csv(csv_path: str | Path) -> dict:
+    """Parse EnergyPlus ReadVars CSV (eplusout.csv) into a timeseries payload.
+
+    The file is read by `readvars.read_readvars_csv` (NumPy, no row cap); see
+    `timeseries_from_table` for the payload.
+    """
+    try:
+        return timeseries_from_table(read_readvars_csv(csv_path))
+    except Exception as e:
+        print(f"Warning: failed to parse ReadVars CSV {csv_path}: {e}")
         return {}
 
 
@@ -660,155 +718,13 @@ def _sanitize_variable_name(name: str) -> str:
     return s or name
 
 
-def _is_number_like(s: str) -> bool:
-    try:
-        float(s)
-        return True
-    except Exception:
-        return False
-
 def parse_html_with_table_lookup(html_path, log_path, idf_files):
-    """Parse EnergyPlus HTML output and log to extract structured results."""
-    try:
-        with open(html_path, 'r', encoding='utf-8') as f:
-            soup = BeautifulSoup(f, 'html.parser')
-        
-        with open(log_path, 'r', encoding='utf-8') as f:
-            log_content = f.read()
-
-        def get_value_from_table(table_title, row_label, col_index=1):
-            """Locate a table by title and return value at row_label and column index."""
-            table_header = soup.find('b', string=table_title)
-            if not table_header:
-                return None
-            table = table_header.find_next('table')
-            for row in table.find_all('tr'):
-                cells = row.find_all('td')
-                if cells and row_label in cells[0].text.strip():
-                    try:
-                        return float(cells[col_index].text.strip())
-                    except ValueError:
-                        return None
-            return None
-
-        # Extract building name and file info
-        building_name = soup.find('p', string=lambda s: s and 'Building:' in s)
-        building_name = building_name.b.text if building_name and building_name.b else "Unknown Building"
-
-        # Fix: idf_files may be a list or a queryset
-        file_name = None
-        if hasattr(idf_files, "first") and callable(getattr(idf_files, "first", None)):
-            first_file = idf_files.first()
-            if first_file:
-                if getattr(first_file, 'file_name', None):
-                    file_name = first_file.file_name
-                elif getattr(first_file, 'original_name', None):
-                    file_name = first_file.original_name
-                elif getattr(first_file, 'file_path', None):
-                    file_name = os.path.basename(first_file.file_path)
-        elif isinstance(idf_files, list) and idf_files:
-            first = idf_files[0]
-            if getattr(first, 'file_name', None):
-                file_name = first.file_name
-            elif getattr(first, 'original_name', None):
-                file_name = first.original_name
-            elif getattr(first, 'file_path', None):
-                file_name = os.path.basename(first.file_path)
-            else:
-                # Fallback: try FileField-like attribute
-                file_attr = getattr(first, 'file', None)
-                if file_attr and getattr(file_attr, 'name', None):
-                    file_name = os.path.basename(file_attr.name)
-        if not file_name:
-            file_name = "unknown.idf"
-
-        # Extract values from tables
-        total_energy_use = get_value_from_table("Site and Source Energy", "Total Site Energy", 2)  # kWh/m²
-        total_area = get_value_from_table("Building Area", "Total Building Area")  # m²
-        heating_kwh = get_value_from_table("End Uses", "Heating", 12)
-        cooling_kwh = get_value_from_table("End Uses", "Cooling", 12)
-        lighting_kwh = get_value_from_table("End Uses", "Interior Lighting", 1)
-        equipment_kwh = get_value_from_table("End Uses", "Interior Equipment", 1)
-
-        if not total_area:
-            total_area = 1.0  # fallback to avoid division by zero
-
-        # Normalize values by area
-        heating_demand = heating_kwh / total_area if heating_kwh else 0.0
-        cooling_demand = cooling_kwh / total_area if cooling_kwh else 0.0
-        lighting_intensity = lighting_kwh / total_area if lighting_kwh else 0.0
-        equipment_intensity = equipment_kwh / total_area if equipment_kwh else 0.0
-
-        # Extract run time in seconds from log
-        runtime_match = re.search(r'EnergyPlus Run Time=(\d+)hr\s+(\d+)min\s+([\d\.]+)sec', log_content)
-        if runtime_match:
-            hr, minute, sec = map(float, runtime_match.groups())
-            runtime_seconds = hr * 3600 + minute * 60 + sec
-        else:
-            runtime_seconds = 0.0
-
-        # Extract energy use breakdown by end use
-        energy_use = {}
-        table_header = soup.find('b', string="End Uses")
-        if table_header:
-            table = table_header.find_next('table')
-            for row in table.find_all('tr'):
-                cells = row.find_all('td')
-                if len(cells) > 1:
-                    end_use = cells[0].text.strip()
-                    if end_use and end_use not in ["", "&nbsp;", "Total End Uses"]:
-                        # Get values for electricity and district heating
-                        electricity = cells[1].text.strip()
-                        district_heating = cells[12].text.strip()
-                        try:
-                            electricity = float(electricity) if electricity else 0.0
-                            district_heating = float(district_heating) if district_heating else 0.0
-                            energy_use[end_use] = {
-                                "electricity": electricity,
-                                "district_heating": district_heating,
-                                "total": electricity + district_heating
-                            }
-                        except ValueError:
-                            pass
-
-        # Extract zone information
-        zones = []
-        zone_table_header = soup.find('b', string="Zone Summary")
-        if zone_table_header:
-            table = zone_table_header.find_next('table')
-            for row in table.find_all('tr'):
-                cells = row.find_all('td')
-                if len(cells) > 3 and "Total" not in cells[0].text.strip():
-                    try:
-                        zone_name = cells[0].text.strip()
-                        area = float(cells[1].text.strip())
-                        volume = float(cells[3].text.strip())
-                        zones.append({
-                            "name": zone_name,
-                            "area": area,
-                            "volume": volume
-                        })
-                    except (ValueError, IndexError):
-                        pass
-
-        # Combine results into a structured output
-        result = {
-            "building": building_name,
-            "fileName": file_name,
-            "totalEnergyUse": round(total_energy_use, 1) if total_energy_use else 0.0,
-            "heatingDemand": round(heating_demand, 1),
-            "coolingDemand": round(cooling_demand, 1),
-            "lightingDemand": round(lighting_intensity, 1),
-            "equipmentDemand": round(equipment_intensity, 1),
-            "runTime": round(runtime_seconds, 1),
-            "totalArea": total_area,
-            "energy_use": energy_use,
-            "zones": zones,
-            "status": "success"
-        }
-
-        return result
+    """Parse EnergyPlus HTML output and log to extract structured results.
 
+    The report is indexed in a single pass (see tabular_results.read_html_index).
+    """
+    try:
+        return parse_html_results(html_path, log_path, idf_files)
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -0,0 +1,63 @@
+"""
+Zero-copy staging of simulation input files.
+
+Every run needs `input.idf` and `weather.epw` inside its own directory (the
+directory is what gets mounted into the EnergyPlus container). For large
+parametric batches copying the same multi-megabyte EPW into every variant
+directory dominates disk I/O, so inputs are staged by:
+
+1. hardlink (same filesystem; visible through Docker bind mounts, unlike symlinks)
+2. reflink / copy-on-write clone (FICLONE on btrfs, XFS, ...)
+3. plain copy as the fallback
+
+Staged inputs are only read by EnergyPlus, so sharing the inode with the
+source is safe. `SIMULATION_INPUT_STAGING=copy` restores the old always-copy
+behaviour.
+"""
+import os
+import shutil
+
+from django.conf import settings
+
+
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+
+def _reflink(src: str, dst: str) -> None:
+    import fcntl
+    with open(src, 'rb') as s, open(dst, 'wb') as d:
+        try:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        except OSError:
+            d.close()
+            os.unlink(dst)
+            raise
+    shutil.copystat(src, dst)
+
+
+def stage_file(src: str, dst: str) -> str:
+    """Place `src` at `dst` as cheaply as possible; return 'hardlink', 'reflink' or 'copy'."""
+    src, dst = str(src), str(dst)
+    try:
+        if os.path.samefile(src, dst):
+            return 'hardlink'
+    except OSError:
+        pass
+    if os.path.lexists(dst):
+        os.unlink(dst)
+
+    if getattr(settings, 'SIMULATION_INPUT_STAGING', 'auto') != 'copy':
+        try:
+            os.link(src, dst)
+            return 'hardlink'
+        except OSError:
+            pass
+        try:
+            _reflink(src, dst)
+            return 'reflink'
+        except (OSError, ImportError):
+            pass
+
+    shutil.copy2(src, dst)
+    return 'copy'
@@ -0,0 +1,407 @@
+"""
+Summary results from EnergyPlus tabular reports.
+
+EnergyPlus writes the same tabular reports to `eplustbl.htm` and, when the IDF
+requests `Output:SQLite, SimpleAndTabular`, to the `TabularDataWithStrings`
+view of `eplusout.sql`. Reading the SQL output is a handful of indexed queries
+instead of parsing a multi-megabyte HTML document, and every value is looked
+up by report, table, row and column *name*, so new fuel columns in a later
+EnergyPlus version do not shift the values that are read.
+
+The SQL output is not requested for `minimal` runs, whose report variables
+would all be written to it as well. When there is no SQL output the HTML report is read in a single streaming
+pass (`read_html_index`, lxml's iterparse when lxml is installed, the standard
+library's html.parser otherwise) into the same index.
+
+`TabularIndex` holds the tables of a report as plain dicts and
+`results_from_index` turns it into the result dict the rest of the pipeline
+stores.
+"""
+import os
+import re
+import sqlite3
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+
+ABUPS_REPORT = 'AnnualBuildingUtilityPerformanceSummary'
+INPUT_SUMMARY_REPORT = 'InputVerificationandResultsSummary'
+ENTIRE_FACILITY = 'Entire Facility'
+
+# (report, table) pairs the result dict is built from
+SUMMARY_TABLES = [
+    (ABUPS_REPORT, 'Site and Source Energy'),
+    (ABUPS_REPORT, 'Building Area'),
+    (ABUPS_REPORT, 'End Uses'),
+    (INPUT_SUMMARY_REPORT, 'Zone Summary'),
+]
+
+SQLITE_OUTPUT = """
+Output:SQLite,
+    SimpleAndTabular;        !- Option Type
+"""
+
+_SKIPPED_END_USE_ROWS = ('', '&nbsp;', 'Total End Uses')
+
+
+def report_key(name: str) -> str:
+    """Normalise a report name ('Annual Building Utility Performance Summary' -> SQL form)."""
+    return re.sub(r'\s+', '', name or '')
+
+
+def column_key(name: str) -> str:
+    """Strip units from an HTML column header ('Area [m2]' -> 'Area')."""
+    return re.sub(r'\s*\[[^\]]*\]\s*$', '', (name or '').strip())
+
+
+def to_float(value) -> Optional[float]:
+    try:
+        return float(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+class TabularIndex:
+    """Tables of a tabular report keyed by (report, table title).
+
+    Each table maps row name -> {column name: value string}, in report order.
+    """
+
+    def __init__(self):
+        self.tables: Dict[tuple, Dict[str, Dict[str, str]]] = {}
+        self.building: Optional[str] = None
+
+    def add_table(self, report: str, title: str, rows: List[List[str]]) -> None:
+        """Add an HTML table whose first row holds the column headers.
+
+        Only the first table with a given report and title is kept, matching
+        the first-match lookups of the previous parser.
+        """
+        key = (report_key(report), title.strip())
+        if key in self.tables or not rows:
+            return
+        header = rows[0]
+        self.tables[key] = {}
+        for row in rows[1:]:
+            if not row:
+                continue
+            for column, value in zip(header[1:], row[1:]):
+                self.add(report, title, row[0], column, value)
+
+    def add(self, report: str, table: str, row: str, column: str, value: str) -> None:
+        rows = self.tables.setdefault((report_key(report), table.strip()), {})
+        rows.setdefault(row.strip(), {})[column_key(column)] = value
+
+    def table(self, report: str, title: str) -> Optional[Dict[str, Dict[str, str]]]:
+        return self.tables.get((report_key(report), title))
+
+    def value(self, report: str, title: str, row: str, column: str) -> Optional[float]:
+        """Numeric cell; `row` matches exactly, else as a substring, `column` as a prefix."""
+        rows = self.table(report, title)
+        if not rows:
+            return None
+        cells = rows.get(row)
+        if cells is None:
+            cells = next((c for name, c in rows.items() if row in name), None)
+        if cells is None:
+            return None
+        return to_float(find_column(cells, column))
+
+
+def find_column(cells: Dict[str, str], column: str) -> Optional[str]:
+    if column in cells:
+        return cells[column]
+    for name, value in cells.items():
+        if name.startswith(column):
+            return value
+    return None
+
+
+def results_from_index(index: TabularIndex, building_name: str, file_name: str, runtime_seconds: float) -> dict:
+    """Build the stored result dict from the summary tables."""
+    total_energy_use = index.value(ABUPS_REPORT, 'Site and Source Energy', 'Total Site Energy',
+                                   'Energy Per Total Building Area')  # kWh/m²
+    total_area = index.value(ABUPS_REPORT, 'Building Area', 'Total Building Area', 'Area')  # m²
+    heating_kwh = index.value(ABUPS_REPORT, 'End Uses', 'Heating', 'District Heating')
+    cooling_kwh = index.value(ABUPS_REPORT, 'End Uses', 'Cooling', 'District Heating')
+    lighting_kwh = index.value(ABUPS_REPORT, 'End Uses', 'Interior Lighting', 'Electricity')
+    equipment_kwh = index.value(ABUPS_REPORT, 'End Uses', 'Interior Equipment', 'Electricity')
+
+    if not total_area:
+        total_area = 1.0  # fallback to avoid division by zero
+
+    # Energy use breakdown by end use (electricity and district heating)
+    energy_use = {}
+    for end_use, cells in (index.table(ABUPS_REPORT, 'End Uses') or {}).items():
+        if end_use in _SKIPPED_END_USE_ROWS:
+            continue
+        electricity = find_column(cells, 'Electricity')
+        district_heating = find_column(cells, 'District Heating')
+        electricity = to_float(electricity) if electricity else 0.0
+        district_heating = to_float(district_heating) if district_heating else 0.0
+        if electricity is None or district_heating is None:
+            continue
+        energy_use[end_use] = {
+            "electricity": electricity,
+            "district_heating": district_heating,
+            "total": electricity + district_heating
+        }
+
+    zones = []
+    for zone_name, cells in (index.table(INPUT_SUMMARY_REPORT, 'Zone Summary') or {}).items():
+        if "Total" in zone_name:
+            continue
+        area, volume = to_float(cells.get('Area')), to_float(cells.get('Volume'))
+        if area is None or volume is None:
+            continue
+        zones.append({"name": zone_name, "area": area, "volume": volume})
+
+    return {
+        "building": building_name,
+        "fileName": file_name,
+        "totalEnergyUse": round(total_energy_use, 1) if total_energy_use else 0.0,
+        "heatingDemand": round(heating_kwh / total_area if heating_kwh else 0.0, 1),
+        "coolingDemand": round(cooling_kwh / total_area if cooling_kwh else 0.0, 1),
+        "lightingDemand": round(lighting_kwh / total_area if lighting_kwh else 0.0, 1),
+        "equipmentDemand": round(equipment_kwh / total_area if equipment_kwh else 0.0, 1),
+        "runTime": round(runtime_seconds, 1),
+        "totalArea": total_area,
+        "energy_use": energy_use,
+        "zones": zones,
+        "status": "success"
+    }
+
+
+class _IndexBuilder:
+    """Turn report-level HTML events into a TabularIndex.
+
+    EnergyPlus writes each report as `<p>Report:<b> name</b></p>` (and
+    `<p>Building: <b> name</b></p>` once at the top), then per table a bold
+    title followed by the table itself.
+    """
+
+    def __init__(self):
+        self.index = TabularIndex()
+        self.report = ''
+        self.title = ''
+
+    def paragraph(self, text: str, bold: str) -> None:
+        label = text.strip()
+        if label.startswith('Report:'):
+            self.report = bold.strip()
+        elif label.startswith('Building:') and self.index.building is None:
+            self.index.building = bold.strip()
+
+    def bold(self, text: str) -> None:
+        self.title = text.strip()
+
+    def table(self, rows: List[List[str]]) -> None:
+        if self.title:
+            self.index.add_table(self.report, self.title, rows)
+        self.title = ''
+
+
+class _StdlibReportParser(HTMLParser):
+    """html.parser backend for read_html_index."""
+
+    def __init__(self, builder: _IndexBuilder):
+        super().__init__(convert_charrefs=True)
+        self.builder = builder
+        self.in_p = False
+        self.p_text: List[str] = []
+        self.b_text: Optional[List[str]] = None
+        self.p_bold = ''
+        self.rows: Optional[List[List[str]]] = None
+        self.cell: Optional[List[str]] = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'p':
+            self.in_p, self.p_text, self.p_bold = True, [], ''
+        elif tag == 'b':
+            self.b_text = []
+        elif tag == 'table':
+            self.rows = []
+        elif tag == 'tr' and self.rows is not None:
+            self.rows.append([])
+        elif tag in ('td', 'th') and self.rows is not None:
+            self.cell = []
+
+    def handle_endtag(self, tag):
+        if tag == 'b' and self.b_text is not None:
+            text = ''.join(self.b_text)
+            if self.in_p:
+                self.p_bold = self.p_bold or text
+            elif self.rows is None:
+                self.builder.bold(text)
+            self.b_text = None
+        elif tag == 'p' and self.in_p:
+            self.builder.paragraph(''.join(self.p_text), self.p_bold)
+            self.in_p = False
+        elif tag in ('td', 'th') and self.cell is not None:
+            if self.rows:
+                self.rows[-1].append(''.join(self.cell).strip())
+            self.cell = None
+        elif tag == 'table' and self.rows is not None:
+            self.builder.table(self.rows)
+            self.rows = None
+
+    def handle_data(self, data):
+        if self.cell is not None:
+            self.cell.append(data)
+        if self.b_text is not None:
+            self.b_text.append(data)
+        if self.in_p:
+            self.p_text.append(data)
+
+
+def _index_with_lxml(html_path, builder: _IndexBuilder) -> None:
+    from lxml import etree
+
+    for _, element in etree.iterparse(str(html_path), events=('end',), tag=('p', 'b', 'table'), html=True,
+                                      encoding='utf-8', recover=True):
+        parent = element.getparent()
+        if element.tag == 'b':
+            if parent is None or parent.tag not in ('p', 'td', 'th'):
+                builder.bold(''.join(element.itertext()))
+            continue
+        if element.tag == 'p':
+            bold = element.find('b')
+            builder.paragraph(''.join(element.itertext()), ''.join(bold.itertext()) if bold is not None else '')
+        else:
+            builder.table([[''.join(cell.itertext()).strip() for cell in row.iter('td', 'th')]
+                           for row in element.iter('tr')])
+        # Free what has been indexed so memory stays flat on large reports
+        element.clear()
+        while parent is not None and element.getprevious() is not None:
+            del parent[0]
+
+
+def read_html_index(html_path) -> TabularIndex:
+    """Index every table of an EnergyPlus HTML report in one pass."""
+    builder = _IndexBuilder()
+    try:
+        import lxml  # noqa: F401
+    except ImportError:
+        parser = _StdlibReportParser(builder)
+        with open(html_path, 'r', encoding='utf-8', errors='replace') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), ''):
+                parser.feed(chunk)
+        parser.close()
+    else:
+        _index_with_lxml(html_path, builder)
+    return builder.index
+
+
+def parse_html_results(html_path, log_path, idf_files) -> dict:
+    """Results from the HTML tabular report (used when there is no SQL output)."""
+    index = read_html_index(html_path)
+    results = results_from_index(index, index.building or "Unknown Building", result_file_name(idf_files),
+                                 run_time_from_log(log_path))
+    results['resultSource'] = 'html'
+    return results
+
+
+def result_file_name(idf_files) -> str:
+    """Name of the first IDF in `idf_files` (a list or a queryset)."""
+    first = None
+    if hasattr(idf_files, "first") and callable(getattr(idf_files, "first", None)):
+        first = idf_files.first()
+    elif isinstance(idf_files, list) and idf_files:
+        first = idf_files[0]
+    if first is not None:
+        for attr in ('file_name', 'original_name'):
+            if getattr(first, attr, None):
+                return getattr(first, attr)
+        if getattr(first, 'file_path', None):
+            return os.path.basename(first.file_path)
+        # Fallback: try FileField-like attribute
+        file_attr = getattr(first, 'file', None)
+        if file_attr and getattr(file_attr, 'name', None):
+            return os.path.basename(file_attr.name)
+    return "unknown.idf"
+
+
+def run_time_from_log(log_path) -> float:
+    """EnergyPlus run time in seconds from the run log (0.0 when missing)."""
+    with open(log_path, 'r', encoding='utf-8') as f:
+        log_content = f.read()
+    runtime_match = re.search(r'EnergyPlus Run Time=(\d+)hr\s+(\d+)min\s+([\d\.]+)sec', log_content)
+    if not runtime_match:
+        return 0.0
+    hr, minute, sec = map(float, runtime_match.groups())
+    return hr * 3600 + minute * 60 + sec
+
+
+def building_name_from_idf(idf_path) -> str:
+    """Name field of the IDF's Building object."""
+    try:
+        with open(idf_path, 'r', encoding='utf-8', errors='replace') as f:
+            match = re.search(r'(?im)^\s*Building\s*,\s*([^,;!\n]+)', f.read())
+        if match:
+            return match.group(1).strip()
+    except OSError:
+        pass
+    return "Unknown Building"
+
+
+def read_sql_index(sql_path) -> TabularIndex:
+    """Load the summary tables from an EnergyPlus SQLite output."""
+    index = TabularIndex()
+    conn = sqlite3.connect(f"file:{sql_path}?mode=ro", uri=True)
+    try:
+        placeholders = ','.join('(?, ?)' for _ in SUMMARY_TABLES)
+        params: List[str] = [part for pair in SUMMARY_TABLES for part in pair]
+        rows = conn.execute(
+            "SELECT ReportName, TableName, RowName, ColumnName, Value FROM TabularDataWithStrings "
+            f"WHERE ReportForString = ? AND (ReportName, TableName) IN (VALUES {placeholders}) "
+            "ORDER BY TabularDataIndex",
+            [ENTIRE_FACILITY] + params,
+        )
+        for report, table, row, column, value in rows:
+            index.add(report, table, row or '', column or '', value)
+    finally:
+        conn.close()
+    return index
+
+
+def parse_sql_results(sql_path, log_path, idf_files) -> Optional[dict]:
+    """Results from `output.sql`, or None when it has no tabular data (use the HTML report)."""
+    try:
+        index = read_sql_index(sql_path)
+    except sqlite3.Error as e:
+        print(f"Warning: could not read tabular data from {sql_path}: {e}")
+        return None
+    if index.table(ABUPS_REPORT, 'End Uses') is None:
+        return None
+    building_name = building_name_from_idf(os.path.join(os.path.dirname(str(sql_path)), 'input.idf'))
+    results = results_from_index(index, building_name, result_file_name(idf_files), run_time_from_log(log_path))
+    results['resultSource'] = 'sql'
+    return results
+
+
+def ensure_sqlite_output(idf_path: str, profile: Optional[str] = None) -> bool:
+    """Request `Output:SQLite, SimpleAndTabular` in the staged IDF if it has no Output:SQLite.
+
+    SimpleAndTabular also writes every report variable and meter to the SQL
+    file. Timeseries are read from the ESO, so `minimal` runs (retention.py)
+    skip it and are summarised from the HTML report instead.
+
+    Like apply_output_controls, the staged IDF may be a hardlink to the source,
+    so it is rewritten through a temporary file.
+    """
+    if not getattr(settings, 'SIMULATION_SQL_RESULTS', True) or profile == 'minimal':
+        return False
+    with open(idf_path, 'r', encoding='utf-8', errors='replace') as f:
+        content = f.read()
+    if re.search(r'(?im)^\s*Output:SQLite\s*,', content):
+        return False
+    tmp_path = idf_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+        if not content.endswith('\n'):
+            f.write('\n')
+        f.write(SQLITE_OUTPUT)
+    os.replace(tmp_path, idf_path)
+    return True
@@ -3,16 +3,32 @@ Celery tasks for EnergyPlus simulations.
 """
 import os
 import json
+import time
 from pathlib import Path
 from typing import Optional, List, Dict, Any
-from celery import shared_task, current_task, chord, group
+from celery import shared_task, current_task, chord, chain, group
 from celery.exceptions import SoftTimeLimitExceeded
+from celery.signals import worker_process_init, worker_process_shutdown
 from django.conf import settings
 from django.core.files.storage import default_storage
 
 
+@worker_process_init.connect
+def _prewarm_idf_cache(**kwargs):
+    """Load Energy+.idd once when the worker process starts instead of in its first task."""
+    from .idf_cache import prewarm
+    prewarm()
+
+
+@worker_process_shutdown.connect
+def _shutdown_container_pool(**kwargs):
+    """Remove warm EnergyPlus containers owned by this worker process."""
+    from .container_pool import shutdown_container_pool
+    shutdown_container_pool()
+
+
 @shared_task(bind=True, name='simulation.aggregate_batch_results')
-def aggregate_batch_results(self, task_results, simulation_id, parent_task_id, total_items):
+def aggregate_batch_results(self, task_results, simulation_id, parent_task_id, total_items, waves=1):
     """
     Callback task that aggregates results from Celery worker tasks.
     This runs AFTER all worker tasks (variants or base IDF runs) complete via a chord.
@@ -22,6 +38,7 @@ def aggregate_batch_results(self, task_results, simulation_id, parent_task_id, t
         simulation_id: UUID of the parent Simulation
         parent_task_id: ID of the parent dispatch task
         total_items: Total number of worker items processed
+        waves: Dispatch waves of the batch; results of all but the last are read from disk
     """
     from .models import Simulation
     from .services import EnergyPlusSimulator
@@ -33,47 +50,101 @@ def aggregate_batch_results(self, task_results, simulation_id, parent_task_id, t
         simulation = Simulation.objects.get(id=simulation_id)
         simulator = EnergyPlusSimulator(simulation, celery_task=None)
 
-        # Collect successful results and track which ones still need persistence
         from .models import SimulationResult
 
-        all_results: List[Dict[str, Any]] = []
-        pending_persistence: List[Dict[str, Any]] = []
-
-        for task_result in task_results:
-            if task_result and task_result.get('status') == 'success':
-                payload = task_result.get('results')
-                if payload:
-                    all_results.append(payload)
-                    if not task_result.get('persisted'):
-                        pending_persistence.append(payload)
-                else:
-                    all_results.append(task_result)
-            else:
-                all_results.append(task_result)
-
-        save_summary = {'saved': 0, 'failed': 0, 'errors': []}
-        if pending_persistence:
-            print(f"Persisting {len(pending_persistence)} result(s) that were not saved by workers")
-            save_summary = simulator.save_results_to_database(pending_persistence, job_info={
-                "simulation_id": simulation.id,
-                "run_id": simulator.run_id
-            })
-        else:
-            print("All worker tasks reported persisted results; skipping duplicate save")
+        # Waves are aggregated one at a time: earlier waves left their task results on
+        # disk (see advance_variant_waves_task), the last one arrives as task_results.
+        # Only counters are kept across waves; each wave's entries are persisted and
+        # appended to combined_results.json before the next one is read.
+        def _waves():
+            for wave in range(waves - 1):
+                with open(_wave_results_path(simulator.results_dir, wave)) as f:
+                    yield json.load(f)
+            yield task_results
 
-        saved_count = save_summary.get('saved', 0)
-        failed_count = save_summary.get('failed', 0)
-        persisted_count = SimulationResult.objects.filter(simulation_id=simulation_id).count()
-        print(f"Result persistence summary: saved_now={saved_count}, failed={failed_count}, total_persisted={persisted_count}")
+        results_count = 0
+        worker_persisted = 0
+        output_bytes = 0
+        pending_total = 0
+        save_summary = {'saved': 0, 'failed': 0, 'errors': [], 'rows_written': 0, 'elapsed_seconds': 0.0}
 
         # Ensure the results directory exists before writing combined JSON
         results_dir = simulator.results_dir
         results_dir.mkdir(parents=True, exist_ok=True)
         combined_results_path = results_dir / 'combined_results.json'
-        with open(combined_results_path, 'w') as f:
-            json.dump(all_results, f)
+        with open(combined_results_path, 'w') as combined:
+            # Same text as json.dump(list) of all entries, written entry by entry
+            combined.write('[')
+            for wave_results in _waves():
+                entries: List[Dict[str, Any]] = []
+                pending_persistence: List[Dict[str, Any]] = []
+
+                # Chunked variant tasks return one payload per variant under 'items'
+                flattened = []
+                for task_result in wave_results:
+                    if task_result and task_result.get('status') == 'chunk':
+                        flattened.extend(task_result.get('items') or [])
+                    else:
+                        flattened.append(task_result)
+
+                for task_result in flattened:
+                    if task_result and task_result.get('status') == 'success':
+                        payload = task_result.get('results')
+                        if payload:
+                            entries.append(payload)
+                            if task_result.get('persisted'):
+                                worker_persisted += 1
+                            else:
+                                pending_persistence.append(payload)
+                        else:
+                            entries.append(task_result)
+                    else:
+                        entries.append(task_result)
+
+                # Results are upserted on (simulation, idf, variant), so saving a payload a worker
+                # already wrote (or aggregating twice) updates the same row instead of duplicating it
+                if pending_persistence:
+                    pending_total += len(pending_persistence)
+                    print(f"Persisting {len(pending_persistence)} result(s) that were not saved by workers")
+                    wave_summary = simulator.save_results_to_database(pending_persistence, job_info={
+                        "simulation_id": simulation.id,
+                        "run_id": simulator.run_id
+                    })
+                    for key in ('saved', 'failed', 'rows_written', 'elapsed_seconds'):
+                        save_summary[key] += wave_summary.get(key, 0) or 0
+                    # Keep the first few messages only; the counts carry the totals
+                    save_summary['errors'] = (save_summary['errors'] + wave_summary.get('errors', []))[:50]
 
-        if persisted_count <= 0:
+                # Disk footprint of the retained run outputs (see retention.py)
+                output_bytes += sum(int(r.get('outputBytes') or 0) for r in entries if isinstance(r, dict))
+                for entry in entries:
+                    if results_count:
+                        combined.write(', ')
+                    json.dump(entry, combined)
+                    results_count += 1
+            combined.write(']')
+        if waves > 1:
+            import shutil
+            shutil.rmtree(results_dir / 'waves', ignore_errors=True)
+
+        if pending_total:
+            seconds = save_summary['elapsed_seconds']
+            save_summary['elapsed_seconds'] = round(seconds, 4)
+            save_summary['rows_per_second'] = round(save_summary['rows_written'] / seconds, 1) if seconds else None
+        else:
+            print("All worker tasks reported persisted results; skipping duplicate save")
+
+        saved_count = save_summary.get('saved', 0)
+        failed_count = save_summary.get('failed', 0)
+        # One row per run key, so workers' rows plus this save are the total without counting the table
+        persisted_count = worker_persisted + saved_count
+        has_results = SimulationResult.objects.filter(simulation_id=simulation_id).exists()
+        print(f"Result persistence summary: saved_now={saved_count}, failed={failed_count}, total_persisted={persisted_count}, "
+              f"rows_written={save_summary.get('rows_written', 0)}, elapsed={save_summary.get('elapsed_seconds', 0.0)}s, "
+              f"rows_per_second={save_summary.get('rows_per_second')}")
+        print(f"Retained output size for simulation {simulation_id}: {output_bytes} bytes")
+
+        if not has_results:
             # Do not signal completion if nothing was saved; mark as failure so the frontend keeps polling
             error_details = '; '.join(save_summary.get('errors', [])[:5])
             simulation.status = 'failed'
@@ -111,16 +182,20 @@ def aggregate_batch_results(self, task_results, simulation_id, parent_task_id, t
         except Exception as ws_err:
             print(f"Warning: Failed to send WebSocket completion: {ws_err}")
         
-        print(f"Simulation {simulation_id} completed successfully with {len(all_results)} result set(s)")
+        print(f"Simulation {simulation_id} completed successfully with {results_count} result set(s)")
 
         return {
             'status': 'completed',
             'simulation_id': str(simulation_id),
-            'results_count': len(all_results),
+            'results_count': results_count,
             'message': 'Simulation aggregation completed successfully',
             'saved_results': saved_count,
             'total_persisted': persisted_count,
             'failed_results': failed_count,
+            'rows_written': save_summary.get('rows_written', 0),
+            'persist_seconds': save_summary.get('elapsed_seconds', 0.0),
+            'persist_rows_per_second': save_summary.get('rows_per_second'),
+            'output_bytes': output_bytes,
             'errors': save_summary.get('errors', [])
         }
         
@@ -140,6 +215,100 @@ def aggregate_batch_results(self, task_results, simulation_id, parent_task_id, t
         raise
 
 
+class _VariantIdfFile:
+    """File-like stand-in for a generated variant IDF.
+
+    run_single_simulation reads `.file.path`; process_file_results reads `.file_path`.
+    """
+
+    def __init__(self, path):
+        self.file = type('File', (), {'path': path, 'name': Path(path).name})()
+        self.file_path = path
+        self.original_name = Path(path).name
+        self.file_name = Path(path).name
+
+
+def _run_variant(simulator, weather_file, variant: Dict[str, Any], progress_window) -> Optional[Dict[str, Any]]:
+    """Run, parse and cost one variant with an already prepared simulator; None if no results."""
+    log = _execute_variant(simulator, weather_file, variant, progress_window)
+    return _postprocess_variant(simulator, variant, log)
+
+
+def _execute_variant(simulator, weather_file, variant: Dict[str, Any], progress_window) -> Dict[str, Any]:
+    """Generate the variant's IDF if needed and run EnergyPlus; returns the run log for _postprocess_variant."""
+    from .variant_idf import ensure_variant_idf
+
+    ensure_variant_idf(variant)
+    # Map this variant's EnergyPlus progress onto its share of the overall bar
+    simulator.progress_window = progress_window
+    return simulator.run_single_simulation(_VariantIdfFile(variant['variant_idf_path']), weather_file,
+                                           variant['variant_dir'])
+
+
+def _postprocess_variant(simulator, variant: Dict[str, Any], log: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Parse and cost one variant's EnergyPlus outputs; None if no results."""
+    variant_idx = variant['variant_idx']
+    construction_set = variant.get('construction_set')
+    variant_idf = _VariantIdfFile(variant['variant_idf_path'])
+    output_file = Path(variant['variant_dir']) / "output"
+    file_results = simulator.process_file_results(output_file, variant_idf, run_log=log)
+    if not file_results:
+        return None
+
+    file_results["variant_idx"] = variant_idx
+    file_results["idf_idx"] = variant['idf_idx']
+    file_results["construction_set"] = construction_set
+
+    # Calculate GWP and cost from construction set and element quantities
+    try:
+        from .unified_idf_parser import UnifiedIDFParser, calculate_gwp_and_cost_from_construction_set
+
+        # Parse the variant IDF to get element quantities
+        with open(variant['variant_idf_path'], 'r', encoding='utf-8') as f:
+            variant_content = f.read()
+
+        parser = UnifiedIDFParser(variant_content, read_only=True)
+        parsed_data = parser.parse()
+        element_quantities = parsed_data.get('element_quantities', {})
+
+        if element_quantities and construction_set:
+            gwp_cost = calculate_gwp_and_cost_from_construction_set(
+                element_quantities,
+                construction_set
+            )
+            file_results['gwp_total'] = gwp_cost.get('gwp_total', 0.0)
+            file_results['cost_total'] = gwp_cost.get('cost_total', 0.0)
+            print(f"Variant {variant_idx}: GWP={gwp_cost.get('gwp_total')} kg CO2e, Cost={gwp_cost.get('cost_total')} SEK")
+        else:
+            file_results['gwp_total'] = 0.0
+            file_results['cost_total'] = 0.0
+    except Exception as calc_err:
+        print(f"Warning: Failed to calculate GWP/cost for variant {variant_idx}: {calc_err}")
+        file_results['gwp_total'] = 0.0
+        file_results['cost_total'] = 0.0
+
+    return file_results
+
+
+def _task_payload(file_results: Dict[str, Any], persisted: bool) -> Dict[str, Any]:
+    """Results as returned through Celery.
+
+    Parsed timeseries are NumPy columns. Once the worker has stored them they
+    are dropped from the task result; otherwise they travel as JSON lists so
+    aggregate_batch_results can persist them.
+    """
+    timeseries = file_results.get('hourly_timeseries')
+    if not timeseries:
+        return file_results
+    payload = dict(file_results)
+    if persisted:
+        del payload['hourly_timeseries']
+    else:
+        from .timeseries_store import jsonable_timeseries
+        payload['hourly_timeseries'] = jsonable_timeseries(timeseries)
+    return payload
+
+
 @shared_task(bind=True, name='simulation.run_single_variant')
 def run_single_variant_task(
     self,
@@ -150,7 +319,8 @@ def run_single_variant_task(
     variant_idx: int,
     idf_idx: int,
     construction_set: Optional[Dict[str, Any]] = None,
-    total_variants: Optional[int] = None
+    total_variants: Optional[int] = None,
+    base_idf_path: Optional[str] = None
 ):
     """
     Run a single EnergyPlus simulation for one variant.
@@ -158,19 +328,21 @@ def run_single_variant_task(
     
     Args:
         simulation_id: UUID of parent Simulation
-        variant_idf_path: Absolute path to the generated variant IDF file
+        variant_idf_path: Absolute path of the variant IDF file
         weather_file_path: Relative path to weather file in MEDIA_ROOT
         variant_dir: Directory to store results
         variant_idx: Index of the construction variant
         idf_idx: Index of the base IDF file
         construction_set: The construction set dictionary used for this variant
+        base_idf_path: Absolute path of the base IDF; when given, the variant IDF
+            is generated here before the run (see variant_idf.py)
         
     Returns:
         Dict with variant results
     """
     from .models import Simulation, SimulationFile
+    from .progress import record_runs
     from .services import EnergyPlusSimulator
-    from pathlib import Path
     
     try:
         print(f"Running variant {variant_idx} IDF {idf_idx} for simulation {simulation_id}")
@@ -191,58 +363,18 @@ def run_single_variant_task(
         
         # Create simulator instance
         simulator = EnergyPlusSimulator(simulation, celery_task=None)
-        
-        # Create a fake file object for the variant IDF
-        # Must have both .file.path (for run_single_simulation) and .file_path (for process_file_results)
-        class FakeFileWrapper:
-            def __init__(self, path):
-                self.file = type('File', (), {'path': path, 'name': Path(path).name})()
-                self.file_path = path  # Add this for process_file_results
-                self.original_name = Path(path).name
-                self.file_name = Path(path).name
-        
-        fake_idf = FakeFileWrapper(variant_idf_path)
-        
-        # Run single simulation
-        log = simulator.run_single_simulation(fake_idf, weather_file, variant_dir)
-        
-        # Process results
-        output_file = Path(variant_dir) / "output"
-        file_results = simulator.process_file_results(output_file, fake_idf)
+
+        start = min(simulation.progress or 0, 90)
+        file_results = _run_variant(simulator, weather_file, {
+            'variant_idf_path': variant_idf_path,
+            'variant_dir': variant_dir,
+            'variant_idx': variant_idx,
+            'idf_idx': idf_idx,
+            'construction_set': construction_set,
+            'base_idf_path': base_idf_path,
+        }, (start, min(90, start + 90.0 / max(total_variants or 35, 1))))
         
         if file_results:
-            file_results["variant_idx"] = variant_idx
-            file_results["idf_idx"] = idf_idx
-            file_results["construction_set"] = construction_set
-            
-            # Calculate GWP and cost from construction set and element quantities
-            try:
-                from .unified_idf_parser import UnifiedIDFParser, calculate_gwp_and_cost_from_construction_set
-                
-                # Parse the variant IDF to get element quantities
-                with open(variant_idf_path, 'r', encoding='utf-8') as f:
-                    variant_content = f.read()
-                
-                parser = UnifiedIDFParser(variant_content, read_only=True)
-                parsed_data = parser.parse()
-                element_quantities = parsed_data.get('element_quantities', {})
-                
-                if element_quantities and construction_set:
-                    gwp_cost = calculate_gwp_and_cost_from_construction_set(
-                        element_quantities,
-                        construction_set
-                    )
-                    file_results['gwp_total'] = gwp_cost.get('gwp_total', 0.0)
-                    file_results['cost_total'] = gwp_cost.get('cost_total', 0.0)
-                    print(f"Variant {variant_idx}: GWP={gwp_cost.get('gwp_total')} kg CO2e, Cost={gwp_cost.get('cost_total')} SEK")
-                else:
-                    file_results['gwp_total'] = 0.0
-                    file_results['cost_total'] = 0.0
-            except Exception as calc_err:
-                print(f"Warning: Failed to calculate GWP/cost for variant {variant_idx}: {calc_err}")
-                file_results['gwp_total'] = 0.0
-                file_results['cost_total'] = 0.0
-            
             persisted = False
             try:
                 save_summary = simulator.save_results_to_database([file_results], job_info={
@@ -253,54 +385,16 @@ def run_single_variant_task(
             except Exception as persist_err:
                 print(f"Warning: failed to persist variant result immediately: {persist_err}")
             
-            # Increment progress on the Simulation model
-            # This gives real-time feedback as variants complete
-            # Use atomic counter on the simulation model
-            try:
-                from django.db.models import F
-                from django.db import transaction
-                from asgiref.sync import async_to_sync
-                from channels.layers import get_channel_layer
-                
-                with transaction.atomic():
-                    # Use F() expression to atomically increment a counter
-                    # We'll track this with the progress field directly
-                    simulation = Simulation.objects.select_for_update().get(id=simulation_id)
-                    # Increment by roughly (100 / total_variants) per completion
-                    # Assuming 35 variants, each adds ~2.86%
-                    denominator = total_variants or 35
-                    increment = 90.0 / max(denominator, 1)
-                    current = simulation.progress or 0
-                    estimated = current + increment
-                    new_progress = min(90, int(max(current, estimated)))
-                    simulation.progress = new_progress
-                    simulation.save()
-                    print(f"Variant {variant_idx} completed - Progress: {simulation.progress}%")
-                    
-                    # Send WebSocket progress update
-                    try:
-                        channel_layer = get_channel_layer()
-                        async_to_sync(channel_layer.group_send)(
-                            f"simulation_progress_{simulation_id}",
-                            {
-                                'type': 'progress_update',
-                                'payload': {
-                                    'progress': new_progress,
-                                    'status': 'running'
-                                }
-                            }
-                        )
-                    except Exception as ws_err:
-                        print(f"Warning: Failed to send WebSocket update: {ws_err}")
-            except Exception as e:
-                print(f"Warning: Failed to update progress: {e}")
+            # Count the run; progress is derived from the counters (see progress.py)
+            record_runs(simulation_id, completed=1)
             
             return {
                 'status': 'success',
-                'results': file_results,
+                'results': _task_payload(file_results, persisted),
                 'persisted': persisted
             }
         else:
+            record_runs(simulation_id, failed=1)
             return {
                 'status': 'failed',
                 'error': 'No results generated',
@@ -311,6 +405,7 @@ def run_single_variant_task(
     except Exception as e:
         import traceback
         print(f"ERROR in run_single_variant_task: {traceback.format_exc()}")
+        record_runs(simulation_id, failed=1)
         return {
             'status': 'failed',
             'error': str(e),
@@ -319,6 +414,230 @@ def run_single_variant_task(
         }
 
 
+@shared_task(bind=True, name='simulation.run_variant_chunk')
+def run_variant_chunk_task(
+    self,
+    simulation_id: str,
+    weather_file_path: str,
+    variants: List[Dict[str, Any]],
+    total_variants: Optional[int] = None
+):
+    """
+    Run a slice of variants in one task.
+
+    The Simulation, weather file and EnergyPlusSimulator are set up once for the
+    whole slice, results are saved in one call and the slice's runs are counted
+    in one UPDATE instead of once per variant.
+
+    Args:
+        simulation_id: UUID of parent Simulation
+        weather_file_path: Relative path to weather file in MEDIA_ROOT
+        variants: Dicts with variant_idf_path, variant_dir, variant_idx, idf_idx, construction_set, base_idf_path
+        total_variants: Number of variants in the whole batch
+
+    Returns:
+        Dict with a per-variant result payload for each entry in `variants`
+    """
+    try:
+        simulation, weather_file, simulator = _chunk_setup(simulation_id, weather_file_path)
+    except Exception as e:
+        import traceback
+        print(f"ERROR in run_variant_chunk_task setup: {traceback.format_exc()}")
+        return _failed_chunk(simulation_id, variants, e)
+
+    print(f"Running {len(variants)} variant(s) in one task for simulation {simulation_id}")
+    share = 90.0 / max(total_variants or 35, 1)
+    start = min(simulation.progress or 0, 90)
+    items = []
+    completed = []
+    for position, variant in enumerate(variants):
+        self.update_state(
+            state='PROGRESS',
+            meta={'status': f"Running variant {variant['variant_idx']+1} ({position+1}/{len(variants)} in chunk)...",
+                  'variant_idx': variant['variant_idx']}
+        )
+        window_start = min(90, start + position * share)
+        try:
+            file_results = _run_variant(simulator, weather_file, variant, (window_start, min(90, window_start + share)))
+        except Exception as e:
+            import traceback
+            print(f"ERROR in run_variant_chunk_task (variant {variant['variant_idx']}): {traceback.format_exc()}")
+            file_results = None
+            error = str(e)
+        else:
+            error = 'No results generated'
+
+        if file_results:
+            completed.append(file_results)
+            items.append({'status': 'success', 'results': file_results, 'persisted': False})
+        else:
+            items.append({'status': 'failed', 'error': error,
+                          'variant_idx': variant['variant_idx'], 'idf_idx': variant['idf_idx']})
+
+    return _persist_chunk(simulator, simulation_id, items, completed, total_variants)
+
+
+def _chunk_setup(simulation_id: str, weather_file_path: Optional[str]):
+    """Load the Simulation, its weather file (when a path is given) and a simulator for a chunk."""
+    from .models import Simulation, SimulationFile
+    from .services import EnergyPlusSimulator
+
+    simulation = Simulation.objects.get(id=simulation_id)
+    weather_file = None
+    if weather_file_path is not None:
+        weather_file = SimulationFile.objects.get(
+            simulation=simulation,
+            file_path=weather_file_path,
+            file_type='weather'
+        )
+    return simulation, weather_file, EnergyPlusSimulator(simulation, celery_task=None)
+
+
+def _failed_chunk(simulation_id: str, variants: List[Dict[str, Any]], error) -> Dict[str, Any]:
+    from .progress import record_runs
+    record_runs(simulation_id, failed=len(variants))
+    return {'status': 'chunk', 'items': [
+        {'status': 'failed', 'error': str(error), 'variant_idx': v['variant_idx'], 'idf_idx': v['idf_idx']}
+        for v in variants
+    ]}
+
+
+def _persist_chunk(simulator, simulation_id: str, items: List[Dict[str, Any]], completed: List[Dict[str, Any]],
+                   total_variants: Optional[int]) -> Dict[str, Any]:
+    """Save a chunk's results in one call, count its runs once and build the task result."""
+    from .progress import record_runs
+
+    if completed:
+        try:
+            save_summary = simulator.save_results_to_database(completed, job_info={
+                "simulation_id": simulator.simulation.id,
+                "run_id": simulator.run_id,
+            })
+            # save_results_to_database reports counts, not which rows failed, so the
+            # chunk only counts as persisted when every row was saved
+            if save_summary.get('saved', 0) == len(completed):
+                for item in items:
+                    if item['status'] == 'success':
+                        item['persisted'] = True
+        except Exception as persist_err:
+            print(f"Warning: failed to persist variant chunk immediately: {persist_err}")
+
+    # One counter UPDATE per chunk; progress is derived from the counters (see progress.py)
+    record_runs(simulation_id, completed=len(completed), failed=len(items) - len(completed))
+
+    for item in items:
+        if item['status'] == 'success':
+            item['results'] = _task_payload(item['results'], item['persisted'])
+
+    return {'status': 'chunk', 'items': items}
+
+
+# Run log fields postprocess_variant_stage_task never reads (see process_file_results)
+_STAGE_LOG_EXCLUDED = ('stdout', 'stderr', 'docker_command')
+
+
+@shared_task(bind=True, name='simulation.run_variant_stage')
+def run_variant_stage_task(
+    self,
+    simulation_id: str,
+    weather_file_path: str,
+    variants: List[Dict[str, Any]],
+    total_variants: Optional[int] = None,
+    queued_at: Optional[float] = None
+):
+    """
+    Run stage of the variant pipeline (see pipeline.py): variant IDF generation and EnergyPlus only.
+
+    Returns the run logs for postprocess_variant_stage_task, which is chained
+    after this task on the post-process queue.
+    """
+    from .pipeline import record_stage, RUN_STAGE
+
+    started = time.time()
+    stage = {
+        'simulation_id': simulation_id,
+        'total_variants': total_variants,
+        'runs': [],
+    }
+    try:
+        simulation, weather_file, simulator = _chunk_setup(simulation_id, weather_file_path)
+    except Exception as e:
+        import traceback
+        print(f"ERROR in run_variant_stage_task setup: {traceback.format_exc()}")
+        stage['runs'] = [{'variant': variant, 'error': str(e)} for variant in variants]
+        stage['queued_at'] = time.time()
+        return stage
+
+    share = 90.0 / max(total_variants or 35, 1)
+    start = min(simulation.progress or 0, 90)
+    for position, variant in enumerate(variants):
+        self.update_state(
+            state='PROGRESS',
+            meta={'status': f"Running variant {variant['variant_idx']+1} ({position+1}/{len(variants)} in chunk)...",
+                  'variant_idx': variant['variant_idx']}
+        )
+        window_start = min(90, start + position * share)
+        try:
+            log = _execute_variant(simulator, weather_file, variant, (window_start, min(90, window_start + share)))
+            # The console text is already in run_output.log; keep it out of the chain payload
+            stage['runs'].append({'variant': variant,
+                                  'log': {k: v for k, v in log.items() if k not in _STAGE_LOG_EXCLUDED}})
+        except Exception as e:
+            import traceback
+            print(f"ERROR in run_variant_stage_task (variant {variant['variant_idx']}): {traceback.format_exc()}")
+            stage['runs'].append({'variant': variant, 'error': str(e)})
+
+    record_stage(RUN_STAGE, queued_at, started, len(variants))
+    # Start of the post-process stage's queue wait
+    stage['queued_at'] = time.time()
+    return stage
+
+
+@shared_task(bind=True, name='simulation.postprocess_variant_stage')
+def postprocess_variant_stage_task(self, stage: Dict[str, Any]):
+    """
+    Post-process stage of the variant pipeline: parse, cost and persist the runs
+    of one run_variant_stage_task. Returns the same payload as run_variant_chunk_task.
+    """
+    from .pipeline import record_stage, POSTPROCESS_STAGE
+
+    started = time.time()
+    simulation_id = stage['simulation_id']
+    runs = stage.get('runs') or []
+    try:
+        _, _, simulator = _chunk_setup(simulation_id, None)
+    except Exception as e:
+        import traceback
+        print(f"ERROR in postprocess_variant_stage_task setup: {traceback.format_exc()}")
+        return _failed_chunk(simulation_id, [run['variant'] for run in runs], e)
+
+    items = []
+    completed = []
+    for run in runs:
+        variant = run['variant']
+        file_results = None
+        error = run.get('error') or 'No results generated'
+        if 'log' in run:
+            try:
+                file_results = _postprocess_variant(simulator, variant, run['log'])
+            except Exception as e:
+                import traceback
+                print(f"ERROR in postprocess_variant_stage_task (variant {variant['variant_idx']}): "
+                      f"{traceback.format_exc()}")
+                error = str(e)
+
+        if file_results:
+            completed.append(file_results)
+            items.append({'status': 'success', 'results': file_results, 'persisted': False})
+        else:
+            items.append({'status': 'failed', 'error': error,
+                          'variant_idx': variant['variant_idx'], 'idf_idx': variant['idf_idx']})
+
+    result = _persist_chunk(simulator, simulation_id, items, completed, stage.get('total_variants'))
+    record_stage(POSTPROCESS_STAGE, stage.get('queued_at'), started, len(runs))
+    return result
+
+
 @shared_task(bind=True, name='simulation.run_single_idf')
 def run_single_simulation_task(
     self,
@@ -330,6 +649,7 @@ def run_single_simulation_task(
 ):
     """Run a single EnergyPlus simulation for a stored IDF file."""
     from .models import Simulation, SimulationFile
+    from .progress import record_runs
     from .services import EnergyPlusSimulator
     from pathlib import Path
 
@@ -342,6 +662,10 @@ def run_single_simulation_task(
 
         simulator = EnergyPlusSimulator(simulation, celery_task=None)
 
+        # Map this run's EnergyPlus progress onto its share of the overall bar
+        start = min(simulation.progress or 0, 90)
+        simulator.progress_window = (start, min(90, start + 90.0 / max(total_files, 1)))
+
         # Each IDF writes to its own sub-directory under the simulation results path
         safe_name = Path(idf_file.file_name or idf_file.original_name or f"idf_{idf_idx+1}.idf").stem
         idf_results_dir = simulator.results_dir / safe_name
@@ -349,7 +673,9 @@ def run_single_simulation_task(
 
         log = simulator.run_single_simulation(idf_file, weather_file, str(idf_results_dir))
         output_file = Path(idf_results_dir) / "output"
-        file_results = simulator.process_file_results(output_file, idf_file)
+        file_results = simulator.process_file_results(
+            output_file, idf_file, run_log=log
+        )
 
         if file_results:
             file_results["idf_idx"] = idf_idx
@@ -370,45 +696,16 @@ def run_single_simulation_task(
             except Exception as persist_err:
                 print(f"Warning: failed to persist base IDF result immediately: {persist_err}")
 
-            # Update progress, reserving the final 10% for aggregation
-            try:
-                from django.db import transaction
-                from asgiref.sync import async_to_sync
-                from channels.layers import get_channel_layer
-
-                with transaction.atomic():
-                    tracked = Simulation.objects.select_for_update().get(id=simulation_id)
-                    denominator = max(total_files, 1)
-                    increment = 90.0 / denominator
-                    current = tracked.progress or 0
-                    estimated = current + increment
-                    new_progress = min(90, int(max(current, estimated)))
-                    tracked.progress = new_progress
-                    tracked.save()
-
-                    try:
-                        channel_layer = get_channel_layer()
-                        async_to_sync(channel_layer.group_send)(
-                            f"simulation_progress_{simulation_id}",
-                            {
-                                'type': 'progress_update',
-                                'payload': {
-                                    'progress': new_progress,
-                                    'status': 'running'
-                                }
-                            }
-                        )
-                    except Exception as ws_err:
-                        print(f"Warning: Failed to send WebSocket update: {ws_err}")
-            except Exception as prog_err:
-                print(f"Warning: Failed to update progress for simulation {simulation_id}: {prog_err}")
+            # Count the run; progress (reserving the final 10% for aggregation) is derived from the counters
+            record_runs(simulation_id, completed=1)
 
             return {
                 'status': 'success',
-                'results': file_results,
+                'results': _task_payload(file_results, persisted),
                 'persisted': persisted
             }
 
+        record_runs(simulation_id, failed=1)
         return {
             'status': 'failed',
             'error': 'No results generated',
@@ -418,6 +715,7 @@ def run_single_simulation_task(
     except Exception as e:
         import traceback
         print(f"ERROR in run_single_simulation_task: {traceback.format_exc()}")
+        record_runs(simulation_id, failed=1)
         return {
             'status': 'failed',
             'error': str(e),
@@ -425,83 +723,218 @@ def run_single_simulation_task(
         }
 
 
-def run_batch_parametric_with_celery(parent_task, simulation, idf_files, construction_sets, weather_file, simulator):
+def _estimate_run_seconds(idf_files) -> Optional[float]:
+    """Predicted seconds per run for the base IDFs of a batch (None if estimation fails)."""
+    try:
+        from .runtime_estimator import estimate_batch
+        return estimate_batch([os.path.join(settings.MEDIA_ROOT, f.file_path) for f in idf_files])
+    except Exception as e:
+        print(f"Warning: failed to estimate batch runtime: {e}")
+        return None
+
+
+def variant_chunk_size(total_variants: int) -> int:
+    """Variants per Celery task for a batch.
+
+    SIMULATION_VARIANT_CHUNK_SIZE fixes the size; 0 (default) picks it so every
+    worker process gets about SIMULATION_CHUNKS_PER_WORKER chunks, which keeps
+    the load balanced while cutting per-task overhead, capped at
+    SIMULATION_VARIANT_CHUNK_MAX. A size of 1 dispatches one task per variant.
+    """
+    configured = int(getattr(settings, 'SIMULATION_VARIANT_CHUNK_SIZE', 0) or 0)
+    if configured > 0:
+        return configured
+    try:
+        from .runtime_estimator import get_worker_concurrency
+        workers = get_worker_concurrency()
+    except Exception:
+        workers = int(getattr(settings, 'SIMULATION_DEFAULT_CONCURRENCY', 4))
+    per_worker = max(int(getattr(settings, 'SIMULATION_CHUNKS_PER_WORKER', 4)), 1)
+    size = -(-total_variants // (max(workers, 1) * per_worker))  # ceil
+    return max(1, min(size, int(getattr(settings, 'SIMULATION_VARIANT_CHUNK_MAX', 25))))
+
+
+def variant_wave_size(chunk_size: int) -> int:
+    """Variants released to the workers at a time in a parametric batch.
+
+    SIMULATION_DISPATCH_WAVE_SIZE fixes the size; 0 (default) gives every
+    worker process SIMULATION_CHUNKS_PER_WORKER tasks of `chunk_size`
+    variants, so batches that fit one round of chunks are dispatched at once.
+    """
+    configured = int(getattr(settings, 'SIMULATION_DISPATCH_WAVE_SIZE', 0) or 0)
+    if configured > 0:
+        return configured
+    try:
+        from .runtime_estimator import get_worker_concurrency
+        workers = get_worker_concurrency()
+    except Exception:
+        workers = int(getattr(settings, 'SIMULATION_DEFAULT_CONCURRENCY', 4))
+    per_worker = max(int(getattr(settings, 'SIMULATION_CHUNKS_PER_WORKER', 4)), 1)
+    return max(workers, 1) * per_worker * max(chunk_size, 1)
+
+
+def _wave_results_path(results_dir, wave: int) -> Path:
+    return Path(results_dir) / 'waves' / f'wave_{wave + 1}.json'
+
+
+def _wave_variants(plan: Dict[str, Any], space, start: int, stop: int) -> List[Dict[str, Any]]:
+    """Chunk-task variant dicts for batch items `start` to `stop` (IDF-major, like the old variant map)."""
+    results_dir = Path(plan['results_dir'])
+    sets = len(space)
+    variants = []
+    # Variant IDFs are generated by the workers that run them (see variant_idf.py);
+    # dispatch only records where each one goes
+    for item in range(start, stop):
+        idf_idx, variant_idx = divmod(item, sets)
+        variant_dir = results_dir / f"variant_{variant_idx+1}_idf_{idf_idx+1}"
+        variants.append({
+            'variant_idf_path': str(variant_dir / f"idf_{idf_idx+1}_variant_{variant_idx+1}.idf"),
+            'variant_dir': str(variant_dir),
+            'variant_idx': variant_idx,
+            'idf_idx': idf_idx,
+            'construction_set': space[variant_idx],
+            'base_idf_path': plan['base_idf_paths'][idf_idx],
+        })
+    return variants
+
+
+def _dispatch_variant_wave(plan: Dict[str, Any], wave: int):
+    """Send one wave of a parametric batch as a chord.
+
+    The chord callback dispatches the next wave (advance_variant_waves_task)
+    or, after the last one, aggregates the whole batch.
+    """
+    from .construction_space import ConstructionSpace
+
+    space = ConstructionSpace.from_dict(plan['space'])
+    simulation_id = plan['simulation_id']
+    total_variants = plan['total_variants']
+    chunk_size = plan['chunk_size']
+    start = wave * plan['wave_size']
+    stop = min(start + plan['wave_size'], total_variants)
+    variants = _wave_variants(plan, space, start, stop)
+    chunks = [variants[offset:offset + chunk_size] for offset in range(0, len(variants), chunk_size)]
+
+    variant_tasks = []
+    from . import pipeline
+    if pipeline.is_enabled():
+        # Run and post-process stages on separate queues (see pipeline.py)
+        queued_at = time.time()
+        for chunk in chunks:
+            variant_tasks.append(chain(
+                run_variant_stage_task.si(
+                    simulation_id=simulation_id,
+                    weather_file_path=plan['weather_file_path'],
+                    variants=chunk,
+                    total_variants=total_variants,
+                    queued_at=queued_at
+                ).set(queue=pipeline.run_queue()),
+                postprocess_variant_stage_task.s().set(queue=pipeline.postprocess_queue())
+            ))
+    elif chunk_size > 1:
+        for chunk in chunks:
+            variant_tasks.append(run_variant_chunk_task.si(
+                simulation_id=simulation_id,
+                weather_file_path=plan['weather_file_path'],
+                variants=chunk,
+                total_variants=total_variants
+            ))
+    else:
+        for variant in variants:
+            variant_tasks.append(run_single_variant_task.si(  # Use .si() for immutable signature
+                simulation_id=simulation_id,
+                variant_idf_path=variant['variant_idf_path'],
+                weather_file_path=plan['weather_file_path'],
+                variant_dir=variant['variant_dir'],
+                variant_idx=variant['variant_idx'],
+                idf_idx=variant['idf_idx'],
+                construction_set=variant['construction_set'],
+                total_variants=total_variants,
+                base_idf_path=variant['base_idf_path']
+            ))
+
+    if stop >= total_variants:
+        callback = aggregate_batch_results.s(
+            simulation_id=simulation_id,
+            parent_task_id=plan['parent_task_id'],
+            total_items=total_variants,
+            waves=wave + 1
+        )
+    else:
+        callback = advance_variant_waves_task.s(plan=plan, wave=wave)
+
+    print(f"Dispatching variants {start + 1}-{stop} of {total_variants} as {len(variant_tasks)} Celery task(s) "
+          f"(wave {wave + 1}, chunk size {chunk_size})...")
+    return chord(variant_tasks)(callback)
+
+
+@shared_task(bind=True, name='simulation.advance_variant_waves')
+def advance_variant_waves_task(self, task_results, plan: Dict[str, Any], wave: int):
+    """
+    Chord callback between waves of a parametric batch: keeps the finished
+    wave's task results on disk for aggregate_batch_results and releases the
+    next wave, so workers never have more than one wave queued.
+    """
+    from .models import Simulation
+
+    simulation_id = plan['simulation_id']
+    try:
+        status = Simulation.objects.filter(id=simulation_id).values_list('status', flat=True).first()
+        if status in (None, 'failed'):
+            # Cancelled or failed meanwhile: do not release more variants
+            print(f"Simulation {simulation_id} is {status or 'gone'}; not dispatching wave {wave + 2}")
+            return {'status': 'stopped', 'simulation_id': simulation_id, 'wave': wave + 1}
+
+        path = _wave_results_path(plan['results_dir'], wave)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(task_results, f)
+        os.replace(tmp_path, path)
+
+        job = _dispatch_variant_wave(plan, wave + 1)
+        return {'status': 'dispatched', 'simulation_id': simulation_id, 'wave': wave + 2, 'chord_id': str(job.id)}
+    except Exception as e:
+        import traceback
+        print(f"ERROR in advance_variant_waves_task: {e}\n{traceback.format_exc()}")
+        try:
+            simulation = Simulation.objects.get(id=simulation_id)
+            simulation.status = 'failed'
+            simulation.error_message = str(e)
+            simulation.save()
+        except Exception:
+            pass
+        raise
+
+
+def run_batch_parametric_with_celery(parent_task, simulation, idf_files, construction_space, weather_file, simulator):
     """
     Run batch parametric simulation by dispatching each variant as a separate Celery task.
     This allows Celery to handle parallelism across workers instead of using ThreadPoolExecutor.
+
+    Variants are released in waves sized to the worker fleet (see
+    variant_wave_size); each wave's construction sets are decoded from the
+    space when the wave is dispatched.
     
     Args:
         parent_task: The parent Celery task instance
         simulation: Simulation model instance
         idf_files: List of SimulationFile objects (IDF files)
-        construction_sets: List of construction set dictionaries
+        construction_space: ConstructionSpace of the batch's construction sets
         weather_file: SimulationFile object (weather file)
         simulator: EnergyPlusSimulator instance
         
     Returns:
         Dict with task completion status
     """
-    from pathlib import Path
-    
-    try:
-        from .unified_idf_parser import IdfParser
-    except Exception as e:
-        raise ImportError(
-            "Parametric simulation requires `IdfParser.insert_construction_set` which is provided by `unified_idf_parser.py`. "
-            "Please ensure `backend/simulation/unified_idf_parser.py` is present and importable."
-        )
-    
-    results_dir = simulator.results_dir
-    variant_tasks = []
-    variant_map = []
-    
-    # Generate all variant IDFs
-    parent_task.update_state(
-        state='PROGRESS',
-        meta={'current': 10, 'total': 100, 'status': 'Generating variant IDF files...'}
-    )
-    
-    for idf_idx, idf_file in enumerate(idf_files):
-        idf_path = os.path.join(settings.MEDIA_ROOT, idf_file.file_path)
-        with open(idf_path, "r", encoding="utf-8") as f:
-            base_content = f.read()
-            
-        for variant_idx, construction_set in enumerate(construction_sets):
-            parser = IdfParser(base_content)
-            parser.insert_construction_set(construction_set)
-            
-            # Create variant directory
-            variant_dir = results_dir / f"variant_{variant_idx+1}_idf_{idf_idx+1}"
-            variant_dir.mkdir(parents=True, exist_ok=True)
-            idf_name = f"idf_{idf_idx+1}_variant_{variant_idx+1}.idf"
-            variant_idf_path = variant_dir / idf_name
-            
-            # Save variant IDF
-            try:
-                idf_obj = getattr(parser, 'idf', None)
-                if idf_obj is not None and hasattr(idf_obj, 'saveas'):
-                    idf_obj.saveas(str(variant_idf_path))
-                else:
-                    with open(str(variant_idf_path), 'w', encoding='utf-8') as _f:
-                        _f.write(parser.to_string())
-            except Exception:
-                with open(str(variant_idf_path), 'w', encoding='utf-8') as _f:
-                    _f.write(parser.to_string())
-            
-            variant_map.append({
-                "idf_file": idf_file,
-                "variant_idx": variant_idx,
-                "idf_idx": idf_idx,
-                "construction_set": construction_set,
-                "idf_path": str(variant_idf_path),
-                "variant_dir": str(variant_dir)
-            })
+    total_variants = len(idf_files) * len(construction_space)
     
-    # Dispatch all variants as Celery tasks
-    total_variants = len(variant_map)
-    
-    # Reset progress to 0 at start
+    # Reset progress to 0 at start and record the run count/runtime estimate for the batch ETA
     simulation.progress = 0
+    simulation.completed_count = 0
+    simulation.failed_count = 0
+    simulation.total_runs = total_variants
+    simulation.estimated_run_seconds = _estimate_run_seconds(idf_files)
     simulation.save()
     
     parent_task.update_state(
@@ -509,37 +942,28 @@ def run_batch_parametric_with_celery(parent_task, simulation, idf_files, constru
         meta={'current': 15, 'total': 100, 'status': f'Dispatching {total_variants} variant tasks to Celery workers...'}
     )
     
-    # Create a group of tasks (all run in parallel across available workers)
-    for entry in variant_map:
-        task_signature = run_single_variant_task.si(  # Use .si() for immutable signature
-            simulation_id=str(simulation.id),
-            variant_idf_path=entry["idf_path"],
-            weather_file_path=weather_file.file_path,
-            variant_dir=entry["variant_dir"],
-            variant_idx=entry["variant_idx"],
-            idf_idx=entry["idf_idx"],
-            construction_set=entry["construction_set"],
-            total_variants=total_variants
-        )
-        variant_tasks.append(task_signature)
-    
-    # Execute all variant tasks in parallel using Celery chord
-    # Chord: All tasks run in parallel, then callback collects results
-    print(f"Dispatching {total_variants} variant tasks via Celery chord...")
-    
-    # Create callback task that will aggregate results
-    callback = aggregate_batch_results.s(
-        simulation_id=str(simulation.id),
-        parent_task_id=parent_task.request.id,
-        total_items=total_variants
-    )
-    
-    # Execute group with callback (chord)
-    job = chord(variant_tasks)(callback)
+    # Large batches are dispatched in chunks so one task shares its setup across
+    # several variants (see variant_chunk_size), and in waves so the broker only
+    # ever holds about one round of chunks per worker
+    chunk_size = variant_chunk_size(total_variants)
+    wave_size = variant_wave_size(chunk_size)
+    waves = -(-total_variants // wave_size)  # ceil
+    plan = {
+        'simulation_id': str(simulation.id),
+        'parent_task_id': parent_task.request.id,
+        'weather_file_path': weather_file.file_path,
+        'base_idf_paths': [os.path.join(settings.MEDIA_ROOT, f.file_path) for f in idf_files],
+        'results_dir': str(simulator.results_dir),
+        'space': construction_space.to_dict(),
+        'total_variants': total_variants,
+        'chunk_size': chunk_size,
+        'wave_size': wave_size,
+    }
+    job = _dispatch_variant_wave(plan, 0)
     
-    # Return immediately - parent task completes, but chord continues running
-    # The callback will update the simulation status to 'completed' when done
-    print(f"Dispatched chord {job.id} with {total_variants} variants")
+    # Return immediately - parent task completes, but the chords continue running
+    # The final callback will update the simulation status to 'completed' when done
+    print(f"Dispatched chord {job.id}: {total_variants} variants in {waves} wave(s) of up to {wave_size}")
     parent_task.update_state(
         state='PROGRESS',
         meta={'current': 20, 'total': 100, 'status': f'Processing {total_variants} variants in parallel...'}
@@ -552,6 +976,9 @@ def run_batch_parametric_with_celery(parent_task, simulation, idf_files, constru
         'simulation_id': str(simulation.id),
         'message': f'Batch parametric simulation dispatched with {total_variants} variants',
         'total_variants': total_variants,
+        'chunk_size': chunk_size,
+        'wave_size': wave_size,
+        'waves': waves,
         'chord_id': str(job.id)
     }
 
@@ -565,7 +992,8 @@ def run_energyplus_batch_task(
     parallel: bool = True,
     max_workers: Optional[int] = None,
     batch_mode: bool = False,
-    construction_sets: Optional[List[Dict[str, Any]]] = None
+    construction_sets: Optional[List[Dict[str, Any]]] = None,
+    construction_space: Optional[Dict[str, Any]] = None
 ):
     """
     Celery task for running EnergyPlus batch parametric simulations.
@@ -578,6 +1006,7 @@ def run_energyplus_batch_task(
         max_workers: Number of parallel workers (None = auto-detect)
         batch_mode: Whether to use batch parametric mode
         construction_sets: List of construction set dictionaries for parametric runs
+        construction_space: ConstructionSpace spec (`to_dict`) decoded lazily instead of construction_sets
         
     Returns:
         Dict with task results including simulation_id, status, and result paths
@@ -657,14 +1086,20 @@ def run_energyplus_batch_task(
             meta={'current': 5, 'total': 100, 'status': 'Starting EnergyPlus simulation...'}
         )
         
-        # If batch_mode with construction_sets, dispatch variants as separate Celery tasks
-        if batch_mode and construction_sets:
-            print(f"Batch mode: Dispatching {len(idf_files)} × {len(construction_sets)} = {len(idf_files) * len(construction_sets)} variants as Celery tasks")
+        # If batch_mode with construction sets, dispatch variants as separate Celery tasks
+        from .construction_space import ConstructionSpace
+        space = None
+        if construction_space:
+            space = ConstructionSpace.from_dict(construction_space)
+        elif construction_sets:
+            space = ConstructionSpace.explicit(construction_sets)
+        if batch_mode and space:
+            print(f"Batch mode: Dispatching {len(idf_files)} × {len(space)} = {len(idf_files) * len(space)} variants as Celery tasks")
             return run_batch_parametric_with_celery(
                 self,
                 simulation,
                 idf_files,
-                construction_sets,
+                space,
                 weather_file,
                 simulator
             )
@@ -683,7 +1118,12 @@ def run_energyplus_batch_task(
 
         # Reset progress tracking before dispatching worker tasks
         simulation.progress = 0
-        simulation.save(update_fields=['progress', 'updated_at'])
+        simulation.completed_count = 0
+        simulation.failed_count = 0
+        simulation.total_runs = total_files
+        simulation.estimated_run_seconds = _estimate_run_seconds(idf_files)
+        simulation.save(update_fields=['progress', 'completed_count', 'failed_count', 'total_runs',
+                                       'estimated_run_seconds', 'updated_at'])
 
         self.update_state(
             state='PROGRESS',
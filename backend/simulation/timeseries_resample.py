@@ -0,0 +1,196 @@
+"""
+Server-side downsampling of stored timeseries for charts.
+
+The results page used to receive every point of every variable of every
+variant (8,760+ values each) and decimate them in the browser. The endpoints
+built on this module return one variable at a chosen resolution instead:
+
+- fixed aggregations: `daily`, `weekly` or `monthly` with `mean`, `sum`,
+  `max` or `min` per period;
+- `lttb`: Largest-Triangle-Three-Buckets decimation to `points` values, which
+  keeps peaks and troughs that plain striding would drop;
+- `raw`: the stored values unchanged.
+
+Aggregations are vectorised (period starts from the datetime64 index, then
+`np.add.reduceat` / `np.fmax.reduceat` over each period's rows). EnergyPlus stamps are period-ending
+(`01/01 24:00:00` closes day 1), so a stamp is assigned to the period that
+contains the instant just before it.
+
+Results are cached in the Django cache per (timeseries row, variable,
+resolution, aggregation, points, range) for
+`SIMULATION_TIMESERIES_CACHE_TIMEOUT` seconds. A row is never updated in
+place: re-saving a result replaces its timeseries with a new row, so the
+cached entries of the old one are simply no longer looked up.
+"""
+import hashlib
+from typing import Optional
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics
+from .timeseries_store import read_timeseries, series_to_json
+
+
+AGGREGATE_RESOLUTIONS = ('daily', 'weekly', 'monthly')
+RESOLUTIONS = ('raw', 'lttb') + AGGREGATE_RESOLUTIONS
+AGGREGATIONS = ('mean', 'sum', 'max', 'min')
+DEFAULT_POINTS = 1000
+MAX_POINTS = 20000
+
+# Rows written before the time axis was stored are hourly values of a nominal year
+LEGACY_START = '2001-01-01T01:00:00'
+LEGACY_INTERVAL = 3600
+
+CACHE_KEY_PREFIX = 'epsm:timeseries:row:'
+HITS_COUNTER = 'timeseries_cache.hits'
+MISSES_COUNTER = 'timeseries_cache.misses'
+
+
+def time_axis(start: Optional[str], interval_seconds: Optional[int], rows: int) -> np.ndarray:
+    """datetime64[s] stamps of `rows` values starting at `start`."""
+    start = np.datetime64(start or LEGACY_START, 's')
+    step = int(interval_seconds or LEGACY_INTERVAL)
+    return start + (np.arange(rows, dtype=np.int64) * step).astype('timedelta64[s]')
+
+
+def period_starts(stamps: np.ndarray, resolution: str) -> np.ndarray:
+    """Start of the daily/weekly/monthly period containing each period-ending stamp."""
+    instants = stamps - np.timedelta64(1, 's')
+    if resolution == 'daily':
+        return instants.astype('datetime64[D]')
+    if resolution == 'weekly':
+        # Weeks start on Monday; 1970-01-01 was a Thursday
+        days = instants.astype('datetime64[D]').astype(np.int64)
+        return ((days + 3) // 7 * 7 - 3).astype('datetime64[D]')
+    if resolution == 'monthly':
+        return instants.astype('datetime64[M]').astype('datetime64[D]')
+    raise ValueError(f"Unknown resolution '{resolution}'")
+
+
+def aggregate(stamps: np.ndarray, values: np.ndarray, resolution: str, how: str = 'mean') -> tuple:
+    """Aggregate `values` per period; returns (period starts, values). NaN values are ignored."""
+    if how not in AGGREGATIONS:
+        raise ValueError(f"Unknown aggregation '{how}'")
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return np.empty(0, dtype='datetime64[D]'), np.empty(0)
+    periods = period_starts(stamps, resolution)
+    # Stamps are in time order, so each period is one contiguous run of rows
+    boundaries = np.flatnonzero(periods[1:] != periods[:-1]) + 1
+    starts = np.concatenate(([0], boundaries))
+    valid = ~np.isnan(values)
+    counts = np.add.reduceat(valid.astype(np.int64), starts)
+
+    if how in ('mean', 'sum'):
+        sums = np.add.reduceat(np.where(valid, values, 0.0), starts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result = sums / counts if how == 'mean' else sums
+    elif how == 'max':
+        result = np.fmax.reduceat(values, starts)
+    else:
+        result = np.fmin.reduceat(values, starts)
+    result = np.where(counts > 0, result, np.nan)
+    return periods[starts], result
+
+
+def lttb(values: np.ndarray, points: int) -> np.ndarray:
+    """Row positions selected by Largest-Triangle-Three-Buckets decimation to `points` values.
+
+    NaN values are skipped. Each bucket's point is the one forming the largest
+    triangle with the previously selected point and the mean of the next
+    bucket; the area computation is vectorised within each bucket.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    positions = np.flatnonzero(~np.isnan(values))
+    if len(positions) <= max(points, 2):
+        return positions
+    points = max(points, 3)
+
+    x = positions.astype(np.float64)
+    y = values[positions]
+    # Interior buckets split rows 1..n-2; the first and last points are always kept
+    edges = np.linspace(1, len(positions) - 1, points - 1).astype(np.int64)
+    selected = np.empty(points, dtype=np.int64)
+    selected[0] = 0
+    previous = 0
+    for bucket in range(points - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        next_lo, next_hi = hi, edges[bucket + 2] if bucket + 2 < len(edges) else len(positions)
+        if next_hi <= next_lo:
+            next_hi = next_lo + 1
+        mean_x = x[next_lo:next_hi].mean()
+        mean_y = y[next_lo:next_hi].mean()
+        areas = np.abs((x[previous] - mean_x) * (y[lo:hi] - y[previous])
+                       - (x[previous] - x[lo:hi]) * (mean_y - y[previous]))
+        previous = lo + int(np.argmax(areas)) if hi > lo else lo
+        selected[bucket + 1] = previous
+    selected[-1] = len(positions) - 1
+    return positions[np.unique(selected)]
+
+
+def downsample(row, variable: str, resolution: str = 'lttb', how: str = 'mean',
+               points: int = DEFAULT_POINTS, start=None, end=None) -> dict:
+    """One variable of a timeseries row at `resolution`, as a JSON-ready dict.
+
+    Raises KeyError when the row has no such variable and ValueError for an
+    unknown resolution or aggregation.
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown resolution '{resolution}'; use one of {', '.join(RESOLUTIONS)}")
+    data = read_timeseries(row, [variable], start, end)
+    if variable not in data['series']:
+        raise KeyError(variable)
+    values = data['series'][variable]
+    stamps = time_axis(data['start'], data['interval_seconds'], len(values))
+
+    payload = {
+        'variable': variable,
+        'resolution': resolution,
+        'source_rows': len(values),
+        'interval_seconds': data['interval_seconds'] or LEGACY_INTERVAL,
+    }
+    if resolution in AGGREGATE_RESOLUTIONS:
+        periods, aggregated = aggregate(stamps, values, resolution, how)
+        payload['aggregation'] = how
+        payload['timestamps'] = [str(p) for p in periods]
+        payload['values'] = series_to_json(aggregated)
+    else:
+        keep = lttb(values, min(max(int(points), 3), MAX_POINTS)) if resolution == 'lttb' else np.arange(len(values))
+        payload['points'] = len(keep)
+        payload['timestamps'] = [str(s) for s in stamps[keep]]
+        payload['values'] = series_to_json(values[keep])
+    return payload
+
+
+def _cache_key(row_id, variable: str, resolution: str, how: str, points: int, start, end) -> str:
+    # Variable names contain spaces and brackets, which memcached rejects in keys
+    digest = hashlib.sha1(f'{variable}|{how}|{points}|{start}|{end}'.encode('utf-8')).hexdigest()[:16]
+    return f'{CACHE_KEY_PREFIX}{row_id}:{resolution}:{digest}'
+
+
+def cached_downsample(row, variable: str, resolution: str = 'lttb', how: str = 'mean',
+                      points: int = DEFAULT_POINTS, start=None, end=None) -> dict:
+    """`downsample` through the Django cache, keyed by the timeseries row."""
+    if resolution in AGGREGATE_RESOLUTIONS:
+        points = 0
+    else:
+        how = ''
+    key = _cache_key(row.pk, variable, resolution, how, points, start, end)
+    try:
+        payload = cache.get(key)
+    except Exception as e:
+        print(f"Timeseries cache read failed: {e}")
+        payload = None
+    if payload is not None:
+        metrics.incr(HITS_COUNTER)
+        return payload
+
+    metrics.incr(MISSES_COUNTER)
+    payload = downsample(row, variable, resolution, how or 'mean', points or DEFAULT_POINTS, start, end)
+    try:
+        cache.set(key, payload, getattr(settings, 'SIMULATION_TIMESERIES_CACHE_TIMEOUT', 3600))
+    except Exception as e:
+        print(f"Timeseries cache write failed: {e}")
+    return payload
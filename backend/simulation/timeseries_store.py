@@ -0,0 +1,189 @@
+"""
+Compact storage for simulation timeseries.
+
+`SimulationHourlyTimeseries` rows used to hold the whole parsed ReadVars
+payload (`{'is_hourly', 'rows', 'series': {var: [values]}}`) as JSON. Rows are
+now written in a compact columnar format:
+
+- every variable is a float32 array (NaN for missing values), compressed
+  separately with zlib and concatenated into `values_blob` (a bytea column);
+- `variables` lists `[name, offset, length]` of each compressed column, so a
+  read only decompresses the variables it asks for;
+- `row_count`, `start_time` and `interval_seconds` describe the time axis.
+
+`read_timeseries` returns selected variables over a row or time range.
+Legacy JSON rows are converted the first time they are read.
+"""
+import zlib
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+FORMAT_JSON = 'json'
+FORMAT_F32_ZLIB = 'f32-zlib'
+
+COMPACT_FIELDS = ['storage_format', 'values_blob', 'variables', 'row_count', 'start_time', 'interval_seconds',
+                  'hourly_values']
+
+
+def pack_series(series: Dict[str, Iterable]) -> tuple:
+    """Compress `{name: values}` into (blob, [[name, offset, length], ...], row_count)."""
+    chunks: List[bytes] = []
+    variables = []
+    offset = 0
+    row_count = 0
+    for name, values in series.items():
+        column = np.asarray([np.nan if v is None else v for v in values] if isinstance(values, list) else values,
+                            dtype=np.float32)
+        row_count = max(row_count, len(column))
+        chunk = zlib.compress(column.tobytes(), 6)
+        variables.append([name, offset, len(chunk)])
+        chunks.append(chunk)
+        offset += len(chunk)
+    return b''.join(chunks), variables, row_count
+
+
+def unpack_column(blob: bytes, offset: int, length: int) -> np.ndarray:
+    return np.frombuffer(zlib.decompress(bytes(blob[offset:offset + length])), dtype=np.float32)
+
+
+def compact_fields(payload: dict) -> dict:
+    """Model field values storing a parsed ReadVars payload compactly."""
+    blob, variables, row_count = pack_series(payload.get('series') or {})
+    return {
+        'storage_format': FORMAT_F32_ZLIB,
+        'values_blob': blob,
+        'variables': variables,
+        'row_count': payload.get('rows') or row_count,
+        'start_time': payload.get('start') or '',
+        'interval_seconds': payload.get('interval_seconds'),
+        'hourly_values': None,
+    }
+
+
+def timeseries_row(simulation_result, payload: dict):
+    """Unsaved compact timeseries row for a result from a parsed timeseries payload."""
+    from .models import SimulationHourlyTimeseries
+    return SimulationHourlyTimeseries(
+        simulation_result=simulation_result,
+        has_hourly=bool(payload.get('is_hourly')),
+        **compact_fields(payload)
+    )
+
+
+def store_timeseries(simulation_result, payload: dict):
+    """Create the compact timeseries row for a result from a parsed timeseries payload."""
+    row = timeseries_row(simulation_result, payload)
+    row.save()
+    return row
+
+
+def migrate_row(row) -> bool:
+    """Convert a legacy JSON row to the compact format in place; True if it was converted."""
+    if row.storage_format != FORMAT_JSON:
+        return False
+    payload = row.hourly_values if isinstance(row.hourly_values, dict) else {}
+    for field, value in compact_fields(payload).items():
+        setattr(row, field, value)
+    row.save(update_fields=COMPACT_FIELDS)
+    return True
+
+
+def _row_slice(row, start, end) -> slice:
+    """Row slice for `start`/`end` given as row numbers or ISO timestamps (end exclusive)."""
+    def position(value, default):
+        if value is None or value == '':
+            return default
+        if isinstance(value, (int, np.integer)) or (isinstance(value, str) and value.lstrip('-').isdigit()):
+            return int(value)
+        if not row.start_time or not row.interval_seconds:
+            raise ValueError('Timeseries has no time index; use row numbers')
+        delta = np.datetime64(str(value), 's') - np.datetime64(row.start_time, 's')
+        return int(np.ceil(delta.astype(np.int64) / row.interval_seconds))
+
+    return slice(max(position(start, 0), 0), max(position(end, row.row_count), 0))
+
+
+def read_timeseries(row, variables: Optional[List[str]] = None, start=None, end=None) -> dict:
+    """Read selected variables of a timeseries row as float32 arrays.
+
+    `variables` defaults to all. `start`/`end` are row numbers or ISO
+    timestamps on the stored time axis. Returns `{'variables', 'rows',
+    'start', 'interval_seconds', 'series': {name: ndarray}}`.
+    """
+    migrate_row(row)
+    window = _row_slice(row, start, end)
+    wanted = set(variables) if variables else None
+    series = {}
+    for name, offset, length in row.variables or []:
+        if wanted is None or name in wanted:
+            series[name] = unpack_column(row.values_blob, offset, length)[window]
+
+    first = window.start or 0
+    window_start = row.start_time or None
+    if window_start and row.interval_seconds and first:
+        window_start = str(np.datetime64(row.start_time, 's') + np.timedelta64(first * row.interval_seconds, 's'))
+    return {
+        'variables': [name for name, _, _ in row.variables or []],
+        'rows': len(next(iter(series.values()))) if series else 0,
+        'start': window_start,
+        'interval_seconds': row.interval_seconds,
+        'series': series,
+    }
+
+
+def float32_to_json(values: np.ndarray) -> np.ndarray:
+    """Round float32 values to 7 significant digits as float64.
+
+    Without this 21.3 stored as float32 would be sent as 21.299999237060547.
+    Scaling by an exact power of ten, rounding and scaling back yields the
+    double nearest to the 7-digit decimal.
+    """
+    values = values.astype(np.float64)
+    magnitude = np.zeros_like(values)
+    finite = np.isfinite(values) & (values != 0)
+    magnitude[finite] = np.floor(np.log10(np.abs(values[finite])))
+    shift = (6 - magnitude).astype(np.int64)
+    up = shift >= 0
+    result = np.empty_like(values)
+    scale = 10.0 ** np.abs(shift)
+    result[up] = np.round(values[up] * scale[up]) / scale[up]
+    result[~up] = np.round(values[~up] / scale[~up]) * scale[~up]
+    return result
+
+
+def series_to_json(values) -> list:
+    """A timeseries column as a JSON list (None for NaN)."""
+    values = np.asarray(values, dtype=np.float32)
+    missing = np.isnan(values)
+    cleaned = float32_to_json(values).tolist()
+    if missing.any():
+        cleaned = [None if m else v for v, m in zip(cleaned, missing.tolist())]
+    return cleaned
+
+
+def json_default(obj):
+    """`json.dump` default for parsed results whose timeseries columns are NumPy arrays."""
+    if isinstance(obj, np.ndarray):
+        return series_to_json(obj)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def jsonable_timeseries(payload: dict) -> dict:
+    """Copy of a timeseries payload with its columns converted to JSON lists."""
+    return {**payload, 'series': {name: values if isinstance(values, list) else series_to_json(values)
+                                  for name, values in (payload.get('series') or {}).items()}}
+
+
+def timeseries_payload(row, variables: Optional[List[str]] = None, start=None, end=None) -> dict:
+    """JSON form of read_timeseries, shaped like the original ReadVars payload (None for NaN)."""
+    data = read_timeseries(row, variables, start, end)
+    series = {}
+    for name, values in data.pop('series').items():
+        series[name] = series_to_json(values)
+    data['is_hourly'] = row.has_hourly
+    data['series'] = series
+    return data
@@ -8,7 +8,10 @@ robust implementation that supports both read-only inspection and full editing.
 Goals
 -----
 - Provide a single import point to **parse**, **inspect**, and **edit** IDF
-  files (via *eppy* under the hood when available).
+  files. Read-only parsing uses *eppy* under the hood when available; edits
+  run on the tokenised `IdfModel` (idf_model.py), which keeps comments and
+  layout and serialises without temp files. Eppy is only loaded for edits
+  when the text cannot be tokenised, and for `validate()`.
 - Maintain backwards compatibility with existing callers:
   - `views.py` used `EnergyPlusIDFParser` → now an alias of this class in
     read-only mode.
@@ -37,7 +40,7 @@ from unified_idf_parser import UnifiedIDFParser, generate_parametric_idfs
 parser = UnifiedIDFParser(content_string, read_only=True)
 summary = parser.parse()
 
-# Full edit (requires eppy and a valid Energy+.idd)
+# Full edit (no eppy needed)
 editor = UnifiedIDFParser(content_string, read_only=False)
 editor.insert_construction_set({
     "wall": {"name": "epsm_Wall", "layers": ["Insulation Fiberglass", "Gypsum Board"]},
@@ -65,6 +68,8 @@ import os
 import re
 import tempfile
 
+from .idf_model import IdfModel, IdfSyntaxError
+
 # --------------------------- Optional eppy import ----------------------------
 try:
     from eppy.modeleditor import IDF  # type: ignore
@@ -105,6 +110,31 @@ class Zone:
     ceiling_height: Optional[float] = None
 
 
+# Element types of a construction set that use opaque MATERIAL layers
+OPAQUE_ELEMENT_TYPES = ("wall", "roof", "floor")
+
+# BUILDINGSURFACE:DETAILED surface types -> construction set element type
+SURFACE_ELEMENT_TYPES = {
+    "WALL": "wall",
+    "WALL:EXTERIOR": "wall",
+    "WALL:INTERIOR": "wall",
+    "ROOF": "roof",
+    "ROOFCEILING": "roof",
+    "CEILING": "roof",
+    "FLOOR": "floor",
+}
+
+WINDOW_MATERIAL_CLASSES = (
+    "WINDOWMATERIAL:SIMPLEGLAZINGSYSTEM",
+    "WINDOWMATERIAL:GLAZING",
+    "WINDOWMATERIAL:GAS",
+    "WINDOWMATERIAL:GLAZINGGROUP:THERMOCHROMIC",
+    "WINDOWMATERIAL:SHADE",
+    "WINDOWMATERIAL:BLIND",
+    "WINDOWMATERIAL:SCREEN",
+)
+
+
 # ------------------------------- Utilities ----------------------------------
 
 def _get_energyplus_path() -> str:
@@ -184,8 +214,10 @@ class UnifiedIDFParser:
         Raw IDF text content.
     read_only : bool, default True
         If True, the parser can operate without eppy/IDD and provides a summary
-        view only. If False, it requires eppy + a valid Energy+.idd and enables
-        editing utilities (construction set insertion, saving, etc.).
+        view only. If False, the content is loaded into an `IdfModel` and the
+        editing utilities (construction set insertion, saving, etc.) are
+        enabled; eppy + a valid Energy+.idd are only needed when the content
+        cannot be tokenised.
     idd_dir : Optional[str]
         Directory that contains `Energy+.idd`. If not provided, we resolve via
         `_get_energyplus_path()`.
@@ -201,8 +233,19 @@ class UnifiedIDFParser:
         self._idf = None  # type: ignore
         self._temp_path = None  # type: ignore
         self._eppy_ready = False
+        # Tokenised model backing `_idf` in edit mode (None when eppy is used)
+        self._model: Optional[IdfModel] = None
 
-        # Attempt to initialize eppy context when in edit mode (or when available)
+        if not read_only:
+            from .idf_cache import get_model
+            try:
+                # Copy of the cached parse of this content (see idf_cache.py)
+                self._model = get_model(self.content)
+                self._idf = self._model
+                return
+            except IdfSyntaxError as e:
+                print(f"Warning: IDF could not be tokenised ({e}); editing through eppy")
+        # Attempt to initialize eppy context (read-only, or edit fallback)
         self._init_eppy_if_possible()
 
     # --- Method stubs (real implementations are attached at module scope) ---
@@ -268,6 +311,12 @@ class UnifiedIDFParser:
         In read-only fallback mode (no eppy), a best-effort simple parse is
         returned using regex heuristics.
         """
+        if self._model is not None:
+            # Summaries need the IDD: read the edited text through eppy
+            reader = UnifiedIDFParser(self._model.to_string(), read_only=True, idd_dir=self._idd_dir)
+            summary = reader.parse()
+            self.materials, self.constructions, self.zones = reader.materials, reader.constructions, reader.zones
+            return summary
         if self._eppy_ready:
             self._parse_materials_eppy()
             self._parse_constructions_eppy()
@@ -328,7 +377,7 @@ class UnifiedIDFParser:
             "element_quantities": element_quantities,
         }
 
-    # Editing helpers (require eppy)
+    # Editing helpers (IdfModel, or eppy as a fallback)
     def insert_construction_set(self, construction_set: Dict[str, Dict[str, Any]]) -> None:
         """Insert or replace a construction set (wall/window/floor/roof).
 
@@ -339,7 +388,20 @@ class UnifiedIDFParser:
         - Ensures unique construction names and remaps references.
         """
         self._require_eppy()
+        self._add_construction_set_objects(construction_set)
 
+        # 5) Assign to surfaces
+        self._assign_constructions_to_surfaces(construction_set)
+
+        # 6) Ensure uniqueness & remap stray references
+        self._ensure_unique_construction_names()
+
+    def _add_construction_set_objects(self, construction_set: Dict[str, Dict[str, Any]]) -> None:
+        """Steps 1-4 of `insert_construction_set`: the materials and constructions, without touching surfaces.
+
+        Updates `construction_set` in place with the construction names (and
+        resolved window layers) used.
+        """
         # 1) Make sure we have the current state
         if not self.materials:
             self._parse_materials_eppy()
@@ -347,8 +409,7 @@ class UnifiedIDFParser:
             self._parse_constructions_eppy()
 
         # 2) Create opaque materials on demand
-        opaque_types = {"wall", "roof", "floor"}
-        for ctype in opaque_types:
+        for ctype in OPAQUE_ELEMENT_TYPES:
             cdef = construction_set.get(ctype)
             if not cdef:
                 continue
@@ -385,15 +446,11 @@ class UnifiedIDFParser:
             self._ensure_construction_exact(cname, layers)
             cdef["name"] = cname
 
-        # 5) Assign to surfaces
-        self._assign_constructions_to_surfaces(construction_set)
-
-        # 6) Ensure uniqueness & remap stray references
-        self._ensure_unique_construction_names()
-
     def to_string(self) -> str:
-        """Serialize the current IDF to string (requires eppy)."""
+        """Serialize the current IDF to string."""
         self._require_eppy()
+        if self._model is not None:
+            return self._model.to_string()
         with tempfile.NamedTemporaryFile(delete=False, suffix=".idf", mode="w", encoding="utf-8") as tmp:
             self._idf.saveas(tmp.name)
             tmp.close()
@@ -405,6 +462,29 @@ class UnifiedIDFParser:
             pass
         return s
 
+    def validate(self) -> Optional[str]:
+        """Load the current IDF through eppy; returns the error, or None if it loads.
+
+        Returns None without checking when eppy or Energy+.idd is unavailable.
+        """
+        if self._eppy_ready:
+            return None
+        return validate_idf(self.to_string(), self._idd_dir)
+
+    @classmethod
+    def _for_model(cls, model: IdfModel, idd_dir: Optional[str] = None) -> "UnifiedIDFParser":
+        """An edit-mode parser over an existing `IdfModel` (used by idf_template.py)."""
+        parser = cls.__new__(cls)
+        parser.content = ""
+        parser.read_only = False
+        parser.materials, parser.constructions, parser.zones = {}, {}, {}
+        parser._idd_dir = idd_dir or _get_energyplus_path()
+        parser._temp_path = None
+        parser._eppy_ready = False
+        parser._model = model
+        parser._idf = model
+        return parser
+
     # -------------------------- Parametric helper ----------------------------
     @staticmethod
     def _verify_and_repair(idf_text: str, idd_dir: Optional[str]) -> str:
@@ -419,6 +499,24 @@ class UnifiedIDFParser:
             return idf_text
 
 
+def validate_idf(idf_text: str, idd_dir: Optional[str] = None) -> Optional[str]:
+    """Load `idf_text` through eppy; returns the error, or None if it loads.
+
+    Returns None without checking when eppy or Energy+.idd is unavailable.
+    """
+    idd_dir = idd_dir or _get_energyplus_path()
+    if not _EPPY_AVAILABLE or not os.path.exists(os.path.join(idd_dir, "Energy+.idd")):
+        return None
+    try:
+        import io
+        from .idf_cache import ensure_idd
+        ensure_idd(idd_dir)
+        IDF(io.StringIO(idf_text))  # type: ignore[operator]
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+
 # Public function – keep the **same signature** used by callers
 
 def generate_parametric_idfs(base_idf_content: str, construction_sets: List[Dict[str, Any]]) -> List[Tuple[str, Dict[str, Any]]]:
@@ -430,16 +528,28 @@ def generate_parametric_idfs(base_idf_content: str, construction_sets: List[Dict
     results: List[Tuple[str, Dict[str, Any]]] = []
     idd_dir = _get_energyplus_path()
 
+    try:
+        from .idf_cache import get_template
+        template = get_template(base_idf_content)
+    except Exception:
+        template = None
+
     for cset in construction_sets:
         try:
-            editor = UnifiedIDFParser(base_idf_content, read_only=False, idd_dir=idd_dir)
-            editor.insert_construction_set(cset)
-            idf_text = editor.to_string()
+            if template is not None:
+                # Spliced from the analysed base; same text as the editor path below
+                idf_text = template.render(cset)
+            else:
+                # Each editor starts from a copy of the cached base model
+                editor = UnifiedIDFParser(base_idf_content, read_only=False, idd_dir=idd_dir)
+                editor.insert_construction_set(cset)
+                # Verification/repair pass for surface references & duplicates,
+                # on the edited model rather than a re-parse of its text
+                editor._ensure_unique_construction_names()
+                idf_text = editor.to_string()
         except Exception:
-            # Fallback: if editing failed (e.g., no eppy), pass through original
-            idf_text = base_idf_content
-        # Verification/repair pass for surface references & duplicates
-        idf_text = UnifiedIDFParser._verify_and_repair(idf_text, idd_dir)
+            # Fallback: if editing failed, pass through the repaired original
+            idf_text = UnifiedIDFParser._verify_and_repair(base_idf_content, idd_dir)
         results.append((idf_text, cset))
 
     return results
@@ -459,14 +569,10 @@ def _init_eppy_if_possible(self) -> None:
     tmp.close()
     self._temp_path = tmp.name
 
-    # install paths and set IDD
+    # set the IDD (loaded once per process, see idf_cache.py)
     try:
-        if install_paths is not None:
-            install_paths(self._idd_dir, None)
-        idd_path = os.path.join(self._idd_dir, "Energy+.idd")
-        if os.path.exists(idd_path):
-            IDF.setiddname(idd_path)  # type: ignore[attr-defined]
-        else:
+        from .idf_cache import ensure_idd
+        if not ensure_idd(self._idd_dir):
             # If Energy+.idd is not present, bail out to fallback mode
             self._eppy_ready = False
             return
@@ -476,8 +582,8 @@ def _init_eppy_if_possible(self) -> None:
         self._eppy_ready = False
 
 def _require_eppy(self) -> None:
-    if not self._eppy_ready or self._idf is None:
-        raise RuntimeError("Editing requires eppy and a valid Energy+.idd. Parser is in read-only mode.")
+    if self._idf is None or not (self._eppy_ready or self._model is not None):
+        raise RuntimeError("Editing requires edit mode (read_only=False), or eppy and a valid Energy+.idd. Parser is in read-only mode.")
 
 def _parse_lightweight(self) -> None:
     self.materials.clear()
@@ -832,15 +938,7 @@ def _ensure_opaque_material(self, name: str) -> None:
         pass
 
 def _window_material_exists(self, name: str) -> bool:
-    for t in (
-        "WINDOWMATERIAL:SIMPLEGLAZINGSYSTEM",
-        "WINDOWMATERIAL:GLAZING",
-        "WINDOWMATERIAL:GAS",
-        "WINDOWMATERIAL:GLAZINGGROUP:THERMOCHROMIC",
-        "WINDOWMATERIAL:SHADE",
-        "WINDOWMATERIAL:BLIND",
-        "WINDOWMATERIAL:SCREEN",
-    ):
+    for t in WINDOW_MATERIAL_CLASSES:
         for obj in self._idf.idfobjects.get(t, []):
             if getattr(obj, "Name", None) == name:
                 return True
@@ -1034,15 +1132,7 @@ def _repair_construction_layers(const_obj: Any) -> None:
         return
 
 def _assign_constructions_to_surfaces(self, cset: Dict[str, Dict[str, Any]]) -> None:
-    surf_map = {
-        "WALL": "wall",
-        "WALL:EXTERIOR": "wall",
-        "WALL:INTERIOR": "wall",
-        "ROOF": "roof",
-        "ROOFCEILING": "roof",
-        "CEILING": "roof",
-        "FLOOR": "floor",
-    }
+    surf_map = SURFACE_ELEMENT_TYPES
     for s in self._idf.idfobjects.get("BUILDINGSURFACE:DETAILED", []):
         st = (getattr(s, "Surface_Type", "") or "").upper()
         et = surf_map.get(st)
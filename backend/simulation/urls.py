@@ -11,8 +11,10 @@ urlpatterns = [
     path('<uuid:simulation_id>/results/', views.simulation_results, name='simulation_results'),
     path('<uuid:simulation_id>/parallel-results/', views.parallel_simulation_results, name='parallel_simulation_results'),
     path('<uuid:simulation_id>/download/', views.simulation_download, name='simulation_download'),
+    path('<uuid:simulation_id>/timeseries/', views.simulation_timeseries, name='simulation_timeseries'),
     # Top-level listing endpoint for aggregated results
     path('results/', views.list_simulation_results, name='list_simulation_results'),
+    path('results/<int:result_id>/timeseries/', views.result_timeseries, name='result_timeseries'),
     
     # Celery task status endpoints
     path('task/<str:task_id>/status/', views.celery_task_status, name='celery_task_status'),
@@ -85,82 +85,54 @@ def get_system_resources():
     except Exception as e:
         system_info['error'] = f"Error fetching system resources: {str(e)}"
     
-    # Check Docker and EnergyPlus container availability
+    # Check EnergyPlus availability for the configured runner (docker / native / fake)
     try:
-        import subprocess
-        
-        # Check if Docker is available
-        docker_available = False
-        energyplus_info = {
-            'docker_available': False,
-            'container_image': 'nrel/energyplus:23.2.0',
-            'status': 'Docker not available'
-        }
-        
-        try:
-            # Check Docker availability
-            result = subprocess.run(['docker', '--version'], 
-                                  capture_output=True, text=True, timeout=10)
-            if result.returncode == 0:
-                docker_available = True
-                
-                # Check if EnergyPlus container image is available
-                result = subprocess.run(['docker', 'images', 'nrel/energyplus:23.2.0', '--format', '{{.Repository}}:{{.Tag}}'], 
-                                      capture_output=True, text=True, timeout=10)
-                
-                if 'nrel/energyplus:23.2.0' in result.stdout:
-                    # Test if EnergyPlus actually works
-                    try:
-                        test_result = subprocess.run(['docker', 'run', '--rm', 'nrel/energyplus:23.2.0', 'energyplus', '--version'], 
-                                                   capture_output=True, text=True, timeout=30)
-                        if test_result.returncode == 0 and 'EnergyPlus' in test_result.stdout:
-                            energyplus_info = {
-                                'docker_available': True,
-                                'container_image': 'nrel/energyplus:23.2.0',
-                                'status': 'Available and working',
-                                'exists': True,  # Add this for frontend compatibility
-                                'version': test_result.stdout.strip().split('\n')[-1] if test_result.stdout else 'Unknown'
-                            }
-                        else:
-                            energyplus_info = {
-                                'docker_available': True,
-                                'container_image': 'nrel/energyplus:23.2.0',
-                                'status': 'Image available but test failed',
-                                'exists': False  # Add this for frontend compatibility
-                            }
-                    except (subprocess.TimeoutExpired, subprocess.CalledProcessError):
-                        energyplus_info = {
-                            'docker_available': True,
-                            'container_image': 'nrel/energyplus:23.2.0',
-                            'status': 'Image available but executable test failed',
-                            'exists': False  # Add this for frontend compatibility
-                        }
-                else:
-                    energyplus_info = {
-                        'docker_available': True,
-                        'container_image': 'nrel/energyplus:23.2.0',
-                        'status': 'Container image not found locally',
-                        'exists': False  # Add this for frontend compatibility
-                    }
-                    
-        except (subprocess.TimeoutExpired, FileNotFoundError, subprocess.CalledProcessError):
-            energyplus_info = {
-                'docker_available': False,
-                'container_image': 'nrel/energyplus:23.2.0',
-                'status': 'Docker not available or accessible',
-                'exists': False  # Add this for frontend compatibility
-            }
-
-        system_info['energyplus'] = energyplus_info
-        
+        from .runners import get_runner
+        system_info['energyplus'] = get_runner().availability()
     except Exception as e:
         system_info['energyplus'] = {
+            'runner': getattr(settings, 'SIMULATION_RUNNER', 'docker'),
             'docker_available': False,
-            'container_image': 'nrel/energyplus:23.2.0',
-            'status': f'Error checking Docker: {str(e)}',
+            'container_image': getattr(settings, 'SIMULATION_DOCKER_IMAGE', 'nrel/energyplus:23.2.0'),
+            'status': f'Error checking EnergyPlus: {str(e)}',
             'exists': False  # Add this for frontend compatibility
         }
     
+    # Result cache size and hit/miss counters
+    try:
+        from .result_cache import ResultCache
+        system_info['result_cache'] = ResultCache().stats()
+    except Exception as e:
+        system_info['result_cache'] = {'error': f'Error reading result cache stats: {str(e)}'}
+    
+    # Simulation slots per worker host (see host_slots.py)
+    try:
+        from .host_slots import slot_usage
+        system_info['simulation_slots'] = slot_usage()
+    except Exception as e:
+        system_info['simulation_slots'] = {'error': f'Error reading simulation slots: {str(e)}'}
+    
+    # Run / post-process stage queues (see pipeline.py)
+    try:
+        from .pipeline import stage_stats
+        system_info['pipeline'] = stage_stats()
+    except Exception as e:
+        system_info['pipeline'] = {'error': f'Error reading pipeline stats: {str(e)}'}
+    
+    # Result ingestion rate per mode (see result_persistence.py)
+    try:
+        from .result_persistence import ingest_stats
+        system_info['ingest'] = ingest_stats()
+    except Exception as e:
+        system_info['ingest'] = {'error': f'Error reading ingest stats: {str(e)}'}
+    
+    # Parsed IDF model and IDD cache hit rates (see idf_cache.py)
+    try:
+        from .idf_cache import stats as idf_cache_stats
+        system_info['idf_cache'] = idf_cache_stats()
+    except Exception as e:
+        system_info['idf_cache'] = {'error': f'Error reading IDF cache stats: {str(e)}'}
+    
     # Add platform information
     system_info['platform'] = {
         'system': platform.system(),
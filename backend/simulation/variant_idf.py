@@ -0,0 +1,73 @@
+"""
+Variant IDF generation on the workers.
+
+`run_batch_parametric_with_celery` used to parse the base IDF and insert each
+construction set in the parent task, one variant after another, before any
+worker started simulating. Dispatch now only sends each variant's base IDF
+path and construction set; the worker running a variant generates its IDF
+right before EnergyPlus starts (`ensure_variant_idf`), so generation is spread
+over the worker fleet.
+
+The IDF is written to a temporary name and renamed into place, so an existing
+variant IDF is always complete and a retried task reuses it. Variants are
+rendered from the cached template of their base (idf_template.py), or with
+`SIMULATION_VARIANT_IDF_TEMPLATE=False` by editing a copy of the parsed base
+model (idf_model.py); with `SIMULATION_VARIANT_IDF_VALIDATE` the result is
+also loaded through eppy before it is written.
+"""
+import os
+from pathlib import Path
+from typing import Any, Dict
+
+from django.conf import settings
+
+
+def write_variant_idf(base_content: str, construction_set: Dict[str, Any], path) -> None:
+    """Insert `construction_set` into the base IDF and save the result to `path`.
+
+    `construction_set` is updated in place with the construction names used in
+    the IDF, as `insert_construction_set` does.
+    """
+    text = None
+    if getattr(settings, 'SIMULATION_VARIANT_IDF_TEMPLATE', True):
+        from .idf_cache import get_template
+        from .idf_model import IdfSyntaxError
+        try:
+            text = get_template(base_content).render(construction_set)
+        except IdfSyntaxError as e:
+            print(f"Warning: Base IDF could not be tokenised ({e}); editing through eppy")
+    if text is None:
+        from .unified_idf_parser import IdfParser
+        parser = IdfParser(base_content)
+        parser.insert_construction_set(construction_set)
+        text = parser.to_string()
+
+    if getattr(settings, 'SIMULATION_VARIANT_IDF_VALIDATE', False):
+        from .unified_idf_parser import validate_idf
+        error = validate_idf(text)
+        if error:
+            raise ValueError(f"Generated variant IDF failed validation: {error}")
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def ensure_variant_idf(variant: Dict[str, Any]) -> str:
+    """Generate a dispatched variant's IDF unless it already exists; returns its path.
+
+    `variant` holds `base_idf_path`, `construction_set`, `variant_dir` and
+    `variant_idf_path`. Variants dispatched with a pre-generated IDF have no
+    `base_idf_path` and are returned as they are.
+    """
+    path = variant['variant_idf_path']
+    Path(variant['variant_dir']).mkdir(parents=True, exist_ok=True)
+    base_path = variant.get('base_idf_path')
+    if not base_path or os.path.exists(path):
+        return path
+
+    with open(base_path, 'r', encoding='utf-8') as f:
+        base_content = f.read()
+    write_variant_idf(base_content, variant.get('construction_set') or {}, path)
+    return path
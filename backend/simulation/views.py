@@ -450,20 +450,42 @@ def run_simulation(request):
         except Exception:
             max_workers = 4
 
+        # use_cache=false bypasses the content-addressed result cache for this request
+        use_cache_param = request.POST.get('use_cache') or (request.data.get('use_cache') if hasattr(request, 'data') else None)
+        use_cache = str(use_cache_param).lower() != 'false' if use_cache_param is not None else True
+        # output_retention selects which EnergyPlus outputs are kept per run (minimal/analysis/full)
+        output_retention = request.POST.get('output_retention') or (request.data.get('output_retention') if hasattr(request, 'data') else None)
+        simulation.run_options = {'use_cache': use_cache}
+        if output_retention:
+            from .retention import RETENTION_PROFILES
+            if output_retention not in RETENTION_PROFILES:
+                error = f"Unknown output_retention '{output_retention}'. Choose one of: {', '.join(RETENTION_PROFILES)}"
+                simulation.status = 'failed'
+                simulation.error_message = error
+                simulation.save()
+                return JsonResponse({'error': error}, status=400)
+            simulation.run_options['output_retention'] = output_retention
+        # readvars=false skips ReadVarsESO (no output.csv); timeseries are read from the ESO either way
+        readvars_param = request.POST.get('readvars') or (request.data.get('readvars') if hasattr(request, 'data') else None)
+        if readvars_param is not None:
+            simulation.run_options['readvars'] = str(readvars_param).lower() != 'false'
+        simulation.save(update_fields=['run_options'])
+
         # If a scenario_id was provided, construct a list of construction_sets
         scenario_id = request.POST.get('scenario_id') or (request.data.get('scenario_id') if hasattr(request, 'data') else None)
         # construction_mode controls how construction_sets are generated. Supported values:
         # - None or 'combinatorial' (default): build Cartesian product across element types
         # - 'per_construction': create one construction_set per element type (choose first construction for that type)
         construction_mode = request.POST.get('construction_mode') or (request.data.get('construction_mode') if hasattr(request, 'data') else None)
-        construction_sets = None
+        construction_space = None
         if scenario_id:
             try:
                 from database.models import ScenarioConstruction, Layer, Scenario
-                import itertools
+                from .construction_space import ConstructionSpace
 
                 sc_qs = ScenarioConstruction.objects.filter(scenario_id=scenario_id)
                 groups = {}
+                rows = []
                 for sc in sc_qs:
                     c = sc.construction
                     if not c:
@@ -476,11 +498,13 @@ def run_simulation(request):
                         elif getattr(L, 'window', None):
                             layers.append(L.window.name)
 
-                    groups.setdefault(sc.element_type, []).append({
+                    option = {
                         'id': str(c.id),  # Include construction ID for GWP/cost lookups
                         'name': c.name,
                         'layers': layers
-                    })
+                    }
+                    groups.setdefault(sc.element_type, []).append(option)
+                    rows.append({sc.element_type: option})
 
                 scenario_expected_total = None
                 scenario_obj = None
@@ -495,64 +519,27 @@ def run_simulation(request):
                 if groups:
                     # Two supported modes for creating construction sets:
                     # 1) combinatorial (default) -- build Cartesian product across element types
-                    # 2) per_construction -- create one construction_set per element type (pick the first construction)
+                    # 2) per_construction -- create one construction_set per ScenarioConstruction row (preserve element type)
+                    # Sets are decoded by index when variants are dispatched (see construction_space.py);
+                    # only the options travel to the batch task.
                     if construction_mode == 'per_construction':
-                        # Create one construction_set per ScenarioConstruction row (preserve element type)
-                        construction_sets = []
-                        for sc in sc_qs:
-                            c = sc.construction
-                            if not c:
-                                continue
-                            layers = []
-                            for L in Layer.objects.filter(construction=c).order_by('layer_order'):
-                                if getattr(L, 'material', None):
-                                    layers.append(L.material.name)
-                                elif getattr(L, 'window', None):
-                                    layers.append(L.window.name)
-                            construction_sets.append({
-                                sc.element_type: {
-                                    'id': str(c.id),  # Include construction ID for GWP/cost lookups
-                                    'name': c.name,
-                                    'layers': layers
-                                }
-                            })
+                        space = ConstructionSpace.explicit(rows)
                     else:
-                        # build cartesian product across element types to create construction_sets
                         # NOTE: frontend combinatorics counts (1 + count_per_type) - 1 to allow
-                        # omitting a type (no-change). To match that, include a None option
-                        # for each element type and skip the all-none case.
-                        keys = list(groups.keys())
-                        lists = [[None] + groups[k] for k in keys]
-                        combos = list(itertools.product(*lists))
-                        construction_sets = []
-                        for combo in combos:
-                            cs = {}
-                            for k, chosen in zip(keys, combo):
-                                if chosen is None:
-                                    continue
-                                cs[k] = {
-                                    'id': chosen.get('id'),  # Include construction ID for GWP/cost lookups
-                                    'name': chosen['name'],
-                                    'layers': chosen['layers']
-                                }
-                            # skip the empty combination (all None) which represents baseline/no-change
-                            if not cs:
-                                continue
-                            construction_sets.append(cs)
+                        # omitting a type (no-change). The space includes a "no change" option
+                        # for each element type and skips the all-unchanged combination.
+                        space = ConstructionSpace.product(list(groups.items()))
 
                     # If we found construction_sets, ensure batch_mode is enabled
-                    if construction_sets:
-                        if (
-                            scenario_expected_total is not None and
-                            scenario_expected_total > 0 and
-                            len(construction_sets) > scenario_expected_total
-                        ):
+                    if len(space):
+                        if scenario_expected_total is not None and 0 < scenario_expected_total < len(space):
                             # Trim to the number of simulations the scenario explicitly expects
                             print(
                                 f"Scenario {scenario_id} expected {scenario_expected_total} simulations, "
-                                f"but generated {len(construction_sets)} construction sets; trimming the list."
+                                f"but has {len(space)} construction sets; using the first {scenario_expected_total}."
                             )
-                            construction_sets = construction_sets[:scenario_expected_total]
+                            space.limit = scenario_expected_total
+                        construction_space = space.to_dict()
                         batch_mode = True
             except Exception as e:
                 print(f"Warning: failed to build construction_sets for scenario {scenario_id}: {e}")
@@ -587,7 +574,7 @@ def run_simulation(request):
             parallel=parallel,
             max_workers=max_workers,
             batch_mode=batch_mode,
-            construction_sets=construction_sets
+            construction_space=construction_space
         )
         
         # Store the Celery task ID on the simulation for tracking
@@ -672,12 +659,25 @@ def simulation_status(request, simulation_id):
             except Exception:
                 # Non-fatal; if this fails, we will simply return null error fields
                 error_msg = None
+        # Batch ETA from the per-run runtime estimate and current worker concurrency
+        eta = None
+        if simulation.status == 'running':
+            try:
+                from .runtime_estimator import batch_eta
+                eta = batch_eta(simulation, (simulation.completed_count or 0) + (simulation.failed_count or 0))
+            except Exception as eta_err:
+                print(f"Warning: failed to compute ETA for simulation {simulation_id}: {eta_err}")
+
         response = JsonResponse({
             'status': simulation.status,
             'progress': progress,
             'simulationId': simulation_id,
             'error': error_msg,
             'error_message': error_msg,
+            'eta': eta,
+            'completed_runs': simulation.completed_count,
+            'failed_runs': simulation.failed_count,
+            'total_runs': simulation.total_runs,
         })
         # Add CORS headers here to ensure browser requests from the frontend
         # receive the Access-Control-Allow-Origin header even if middleware
@@ -889,7 +889,9 @@ def parallel_simulation_results(request, simulation_id):
                 'idf_idx': result.idf_idx,
                 'construction_set': result.construction_set_data,
                 'created_at': result.created_at.isoformat(),
-                'raw_json': result.raw_json,
+                # Older rows still carry the timeseries inside raw_json; it is returned once below
+                'raw_json': ({k: v for k, v in result.raw_json.items() if k != 'hourly_timeseries'}
+                             if isinstance(result.raw_json, dict) else result.raw_json),
                 'zones': [
                     {
                         'name': zone.zone_name,
@@ -914,9 +916,11 @@ def parallel_simulation_results(request, simulation_id):
                 # Prefer DB-stored hourly timeseries
                 from .models import SimulationHourlyTimeseries
                 hourly_qs = SimulationHourlyTimeseries.objects.filter(simulation_result=result)
-                if hourly_qs.exists():
-                    ht = hourly_qs.order_by('-created_at').first()
-                    result_dict['hourly_timeseries'] = ht.hourly_values
+                ht = hourly_qs.order_by('-created_at').first()
+                if ht is not None:
+                    # Compact rows are decoded here; legacy JSON rows are migrated on this first read
+                    from .timeseries_store import timeseries_payload
+                    result_dict['hourly_timeseries'] = timeseries_payload(ht)
                 else:
                     # Fallback: check on-disk output.json in the variant folder
                     try:
@@ -963,6 +967,137 @@ def parallel_simulation_results(request, simulation_id):
         }, status=500)
 
 
+def _timeseries_query(request):
+    """Downsampling options from the query string (see timeseries_resample)."""
+    from .timeseries_resample import DEFAULT_POINTS
+    params = request.GET
+    try:
+        points = int(params.get('points') or DEFAULT_POINTS)
+    except ValueError:
+        points = DEFAULT_POINTS
+    return {
+        'resolution': params.get('resolution') or 'lttb',
+        'how': params.get('agg') or 'mean',
+        'points': points,
+        'start': params.get('start') or None,
+        'end': params.get('end') or None,
+    }
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def result_timeseries(request, result_id):
+    """
+    One timeseries variable of a SimulationResult at a chosen resolution.
+
+    Query: variable, resolution (raw | lttb | daily | weekly | monthly),
+    agg (mean | sum | max | min, aggregated resolutions), points (lttb),
+    start/end (row numbers or ISO timestamps). Without `variable` the stored
+    variable names are listed.
+    """
+    try:
+        from .models import SimulationHourlyTimeseries
+        from .timeseries_store import migrate_row
+        from .timeseries_resample import cached_downsample
+
+        row = (SimulationHourlyTimeseries.objects
+               .filter(simulation_result_id=result_id)
+               .order_by('-created_at').first())
+        if row is None:
+            return JsonResponse({'error': 'No timeseries stored for this result'}, status=404)
+
+        variable = request.GET.get('variable')
+        if not variable:
+            migrate_row(row)
+            return JsonResponse({
+                'result_id': result_id,
+                'variables': [name for name, _, _ in row.variables or []],
+                'rows': row.row_count,
+                'start': row.start_time or None,
+                'interval_seconds': row.interval_seconds,
+            })
+
+        try:
+            payload = cached_downsample(row, variable, **_timeseries_query(request))
+        except KeyError:
+            return JsonResponse({'error': f"Variable '{variable}' not found"}, status=404)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        return JsonResponse({'result_id': result_id, **payload})
+
+    except Exception as e:
+        traceback.print_exc()
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+def _result_order(result):
+    """Sort key placing base results (no idf/variant index) before variants."""
+    return (
+        result.idf_idx if result.idf_idx is not None else -1,
+        result.variant_idx if result.variant_idx is not None else -1,
+    )
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def simulation_timeseries(request, simulation_id):
+    """
+    One timeseries variable for every variant of a simulation at a chosen resolution.
+
+    Takes the same query parameters as result_timeseries; `variable` is
+    required. Variants without the variable are listed under `missing`.
+    """
+    try:
+        from .models import SimulationResult, SimulationHourlyTimeseries
+        from .timeseries_resample import cached_downsample
+
+        variable = request.GET.get('variable')
+        if not variable:
+            return JsonResponse({'error': 'variable is required'}, status=400)
+        query = _timeseries_query(request)
+
+        results = {r.id: r for r in SimulationResult.objects.filter(simulation_id=simulation_id)}
+        rows = {}
+        # Latest row per result
+        for row in (SimulationHourlyTimeseries.objects
+                    .filter(simulation_result_id__in=list(results))
+                    .order_by('simulation_result_id', '-created_at')):
+            rows.setdefault(row.simulation_result_id, row)
+
+        variants = []
+        missing = []
+        for result_id, result in sorted(results.items(), key=lambda item: _result_order(item[1])):
+            row = rows.get(result_id)
+            try:
+                if row is None:
+                    raise KeyError(variable)
+                payload = cached_downsample(row, variable, **query)
+            except KeyError:
+                missing.append(result_id)
+                continue
+            except ValueError as e:
+                return JsonResponse({'error': str(e)}, status=400)
+            variants.append({
+                'result_id': result_id,
+                'idf_idx': result.idf_idx,
+                'variant_idx': result.variant_idx,
+                'file_name': result.file_name,
+                **payload,
+            })
+
+        return JsonResponse({
+            'simulation_id': str(simulation_id),
+            'variable': variable,
+            'resolution': query['resolution'],
+            'variants': variants,
+            'missing': missing,
+        })
+
+    except Exception as e:
+        traceback.print_exc()
+        return JsonResponse({'error': str(e)}, status=500)
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def simulation_download(request, simulation_id):